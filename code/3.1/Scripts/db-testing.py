@@ -1,13 +1,59 @@
 import csv
+import json
+import os
 import re
-from SPARQLWrapper import SPARQLWrapper, JSON
+import sys
+import threading
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+# code/, for the HTTP transport shared with the rest of the code
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from queryDBpediaProps import get_http_transport
+
 DATA_TYPE = "dbo"      # Can be "dbo" or "dbp" → selects ontology namespace
 SECTION = "Eile"       # Used to filter rows in input CSV
 PARAMETER = ""         # Optional: filter pages by incoming property
 
 FOLDER = "code/3.1"    # Base folder path for I/O files
+CACHE_FOLDER = f"{FOLDER}/Cache"    # Files generated by the script to speed up the next runs (not tracked by git)
+HIERARCHY_FILE = f"{CACHE_FOLDER}/dbo_class_hierarchy.json"    # Local copy of the dbo class hierarchy (created on first run)
+RANGES_CACHE_FILE = f"{CACHE_FOLDER}/{DATA_TYPE}_property_ranges.json"    # Property ranges saved between runs
+PREFETCH_RANGES = False    # If True, fetch the ranges of all properties in PROPS_COUNT_FILE before validating
+PROPS_COUNT_FILE = "resources/dico_count_occurrences_dbp_props.json"
+RANGES_CHUNK_SIZE = 50     # Number of properties per prefetch query
+TYPES_CHUNK_SIZE = 50      # Number of resources per rdf:type query in validate_resource
+NUM_WORKERS = 1            # Number of pages validated at the same time (1 = one after the other)
+MAX_IN_FLIGHT_PAGES = 16   # Maximum number of pages being validated or waiting to be written
+RESUME = False             # If True, pages already in the score CSV are skipped and new rows are appended (a plain rerun overwrites the CSVs)
+
+INVALID_FIELDNAMES = [
+    'page_name', 'property', 'target_resource', 'direction',
+    'expected_ranges', 'actual_types'
+]    # Columns of the invalid instances CSV
+
+COMBINED_FETCH = False     # If True, the outgoing and incoming properties of a page are fetched with one (paged) query
+PAGE_DATA_PAGE_SIZE = 10000    # Rows per page of the combined query (DBpedia returns at most 10000 rows per query)
+
+# Outgoing dbo properties that are not validated (descriptive strings, images, etc.)
+EXCLUDED_OUTGOING_PROPERTIES = """
+    dbo:abstract, dbo:bicycleInformation, dbo:boilerPressure, dbo:carNumber, dbo:careerStation, dbo:collection,
+    dbo:damage, dbo:depictionDescription, dbo:description, dbo:event, dbo:imageSize, dbo:impactFactorAsOf,
+    dbo:isHandicappedAccessible, dbo:leaderFunction, dbo:lengthReference, dbo:liberationDate, dbo:logo,
+    dbo:mapCaption, dbo:militaryService, dbo:minister, dbo:name, dbo:note, dbo:notes,
+    dbo:numberOfVisitorsAsOf, dbo:orderInOffice, dbo:other, dbo:parkingInformation,
+    dbo:personFunction, dbo:picture, dbo:politicalLeader, dbo:projectKeyword, dbo:pronunciation,
+    dbo:quote, dbo:reference, dbo:restingPlacePosition, dbo:restriction, dbo:sales, dbo:selection,
+    dbo:signature, dbo:soundRecording, dbo:speaker, dbo:statisticLabel, dbo:strength,
+    dbo:termPeriod, dbo:thumbnail, dbo:title, dbo:tournamentRecord,
+    dbo:visitorStatisticsAsOf, dbo:winsAtAsia, dbo:winsAtAus, dbo:winsAtChallenges,
+    dbo:winsAtChampionships, dbo:winsAtJapan, dbo:winsAtLET, dbo:winsAtNWIDE,
+    dbo:winsAtOtherTournaments, dbo:winsAtPGA, dbo:winsAtSenEuro, dbo:winsInEurope
+"""
+
+SPARQL_ENDPOINT = os.environ.get("DBPEDIA_SPARQL_ENDPOINT", "http://dbpedia.org/sparql")    # Can point to a local stand-in server (see code/fixture_server.py)
 
 
 # ------------------------------------------------------------
@@ -79,11 +125,30 @@ class DBpediaValidator:
     - incoming dbo properties
     - correctness of object type vs expected rdfs:range
     """
-    def __init__(self, data_type):
-        self.sparql = SPARQLWrapper("http://dbpedia.org/sparql")
-        self.sparql.setReturnFormat(JSON)
-        self.invalid_instances = []   # Logged invalid type checks
+    def __init__(self, data_type, endpoint=SPARQL_ENDPOINT, hierarchy_file=None, ranges_cache_file=None, combined_fetch=False):
+        self.endpoint = endpoint
+        self.combined_fetch = combined_fetch    # One paged query per page for outgoing and incoming properties (see get_page_data)
+        self.page_data = {}    # page → get_page_data result, kept by filtering mode until the page is validated
+        self.invalid_instances = []   # Logged invalid type checks (when no per-page list is given)
         self.data_type = data_type    # "dbo" or "dbp"
+        self.hierarchy_file = hierarchy_file    # Optional JSON file with the dbo class hierarchy
+        self.direct_superclasses = None    # dbo class → its direct dbo superclasses, loaded on first use
+        self.hierarchy_lock = threading.Lock()
+        self.superclass_closure = {}       # dbo class → all its dbo superclasses
+        self.property_ranges_cache = {}    # property → expected ranges, shared by all pages
+        self.ranges_cache_file = ranges_cache_file
+        if ranges_cache_file and os.path.exists(ranges_cache_file):
+            with open(ranges_cache_file, 'r', encoding='utf-8') as f:
+                self.property_ranges_cache = json.load(f)
+
+
+    def run_query(self, query_string):
+        """
+        Sends a SPARQL query through the shared HTTP transport (kept-alive
+        connections, safe to use from the worker threads).
+        Returns JSON results list; errors are raised.
+        """
+        return get_http_transport().sparql_query(self.endpoint, query_string)
 
 
     def clean_name(self, name):
@@ -101,13 +166,13 @@ class DBpediaValidator:
     # ------------------------------------------------------------
 
     def get_dbo_property_ranges(self, prop):
-        """Fetches rdfs:range for dbo:property."""
+        """Fetches rdfs:range for dbo:property (query errors are raised)."""
         query = f"""
         PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
         PREFIX dbo: <http://dbpedia.org/ontology/>
         SELECT DISTINCT ?range WHERE {{ dbo:{prop} rdfs:range ?range . }}
         """
-        return [r["range"]["value"] for r in self.query(query)]
+        return [r["range"]["value"] for r in self.run_query(query)]
         
 
     def get_dbp_property_ranges(self, prop):
@@ -116,6 +181,7 @@ class DBpediaValidator:
         Attempts:
         1. Look for owl:equivalentProperty mapping
         2. Fallback: try dbo:property with same name
+        Query errors are raised.
         """
         query = f"""
         PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
@@ -134,11 +200,94 @@ class DBpediaValidator:
             }}
         }}
         """
-        results = self.query(query)
+        results = self.run_query(query)
         ranges = [r["range"]["value"] for r in results if "range" in r]
         return ranges or []
 
 
+    def get_property_ranges(self, prop):
+        """
+        Returns the ranges of a dbo or dbp property (depending on
+        data_type), cached across pages. If the query fails, no ranges
+        are returned and nothing is cached, so that the error is not saved
+        to the ranges cache file.
+        """
+        if prop not in self.property_ranges_cache:
+            try:
+                if self.data_type == "dbo":
+                    ranges = self.get_dbo_property_ranges(prop)
+                else:
+                    ranges = self.get_dbp_property_ranges(prop)
+            except Exception as e:
+                print(f"Could not fetch ranges for {prop}: {e}")
+                return []
+            self.property_ranges_cache[prop] = ranges
+        return self.property_ranges_cache[prop]
+
+
+    def prefetch_property_ranges(self, props_count_file=PROPS_COUNT_FILE, chunk_size=RANGES_CHUNK_SIZE):
+        """
+        Fetches the ranges of all properties listed in props_count_file
+        (keys are dbo property URIs) that are not cached yet, with one
+        VALUES query per chunk_size properties.
+        """
+        with open(props_count_file, 'r', encoding='utf-8') as f:
+            props = [key.split("/")[-1] for key in json.load(f)]
+        props = [prop for prop in props if prop not in self.property_ranges_cache and re.fullmatch(r"[\w\-.%()]+", prop)]
+
+        for i in range(0, len(props), chunk_size):
+            chunk = props[i:i + chunk_size]
+            if self.data_type == "dbo":
+                values = " ".join(f'("{prop}" <http://dbpedia.org/ontology/{prop}>)' for prop in chunk)
+                query = f"""
+                PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+                SELECT DISTINCT ?name ?range WHERE {{
+                    VALUES (?name ?dboProp) {{ {values} }}
+                    ?dboProp rdfs:range ?range .
+                }}
+                """
+            else:
+                values = " ".join(f'("{prop}" <http://dbpedia.org/property/{prop}> <http://dbpedia.org/ontology/{prop}>)' for prop in chunk)
+                query = f"""
+                PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+                PREFIX owl: <http://www.w3.org/2002/07/owl#>
+                SELECT DISTINCT ?name ?range WHERE {{
+                    VALUES (?name ?dbpProp ?dboProp) {{ {values} }}
+                    {{
+                        ?dbpProp owl:equivalentProperty ?equivalentProp .
+                        ?equivalentProp rdfs:range ?range .
+                    }}
+                    UNION
+                    {{
+                        ?dboProp rdfs:range ?range .
+                    }}
+                }}
+                """
+
+            # Unlike self.query, failures are not turned into empty results, which would be cached
+            try:
+                results = self.run_query(query)
+            except Exception as e:
+                print(f"Could not prefetch ranges for {len(chunk)} properties: {e}")
+                continue
+
+            chunk_ranges = {prop: [] for prop in chunk}
+            for r in results:
+                chunk_ranges[r["name"]["value"]].append(r["range"]["value"])
+            self.property_ranges_cache.update(chunk_ranges)
+
+        print(f"Prefetched ranges for {len(props)} properties.")
+
+
+    def save_property_ranges_cache(self, filename=None):
+        """Writes the property ranges cache to JSON, to reuse it in the next run."""
+        filename = filename or self.ranges_cache_file
+        if not filename:
+            return
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.property_ranges_cache, f, indent=1)
+
+
     def get_resource_types(self, resource_name):
         """
         Returns all rdf:type values under dbo: namespace for a resource.
@@ -153,10 +302,107 @@ class DBpediaValidator:
         return [r["type"]["value"] for r in self.query(query)]
 
 
+    def get_resource_types_batch(self, resource_names, chunk_size=TYPES_CHUNK_SIZE):
+        """
+        Returns a dict resource name → dbo rdf:type values, with one VALUES
+        query per chunk_size resources. Names that cannot be written as an
+        IRI are looked up one by one with get_resource_types.
+        """
+        prefix = "http://dbpedia.org/resource/"
+        resource_names = list(dict.fromkeys(resource_names))
+        types = {name: [] for name in resource_names}
+        batchable = []
+        for name in resource_names:
+            if re.search(r'[\s<>"{}|^`\\]', name):
+                types[name] = self.get_resource_types(name)
+            else:
+                batchable.append(name)
+
+        for i in range(0, len(batchable), chunk_size):
+            values = " ".join(f"<{prefix}{name}>" for name in batchable[i:i + chunk_size])
+            query = f"""
+            PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+            SELECT DISTINCT ?resource ?type WHERE {{
+                VALUES ?resource {{ {values} }}
+                ?resource rdf:type ?type .
+                FILTER(STRSTARTS(STR(?type), "http://dbpedia.org/ontology/"))
+            }}
+            """
+            for r in self.query(query):
+                name = r["resource"]["value"][len(prefix):]
+                if name in types:
+                    types[name].append(r["type"]["value"])
+
+        return types
+
+
+    def load_class_hierarchy(self):
+        """
+        Loads the direct rdfs:subClassOf links between dbo classes, from
+        hierarchy_file if it exists, else with a single query (then saved
+        to hierarchy_file if one is set).
+        """
+        if self.hierarchy_file and os.path.exists(self.hierarchy_file):
+            with open(self.hierarchy_file, 'r', encoding='utf-8') as f:
+                self.direct_superclasses = json.load(f)
+        else:
+            self.direct_superclasses = self.query_class_hierarchy()
+            if self.hierarchy_file and self.direct_superclasses:
+                with open(self.hierarchy_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.direct_superclasses, f, indent=1)
+
+        # Precompute the closure table for all classes
+        for class_url in self.direct_superclasses:
+            self.get_superclass_closure(class_url)
+
+
+    def query_class_hierarchy(self):
+        """Fetches all direct rdfs:subClassOf links between dbo classes."""
+
+        query = """
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        SELECT DISTINCT ?class ?superclass WHERE {
+            ?class rdfs:subClassOf ?superclass .
+            FILTER(STRSTARTS(STR(?class), "http://dbpedia.org/ontology/"))
+            FILTER(STRSTARTS(STR(?superclass), "http://dbpedia.org/ontology/"))
+        }
+        """
+        direct_superclasses = {}
+        for r in self.query(query):
+            direct_superclasses.setdefault(r["class"]["value"], []).append(r["superclass"]["value"])
+        return direct_superclasses
+
+
+    def get_superclass_closure(self, class_url):
+        """
+        Returns the set of all dbo superclasses of a class (transitive
+        closure of the loaded hierarchy), memoized per class.
+        """
+        if class_url not in self.superclass_closure:
+            superclasses = set()
+            to_visit = list(self.direct_superclasses.get(class_url, []))
+            while to_visit:
+                superclass = to_visit.pop()
+                if superclass not in superclasses and superclass != class_url:
+                    superclasses.add(superclass)
+                    to_visit.extend(self.direct_superclasses.get(superclass, []))
+            self.superclass_closure[class_url] = superclasses
+        return self.superclass_closure[class_url]
+
+
     def get_superclasses(self, resource_url):
         """
         Returns all superclasses via rdfs:subClassOf*.
+        Answered from the in-memory class hierarchy; the query is only
+        sent if the hierarchy could not be loaded.
         """
+        if self.direct_superclasses is None:
+            with self.hierarchy_lock:
+                if self.direct_superclasses is None:
+                    self.load_class_hierarchy()
+        if self.direct_superclasses:
+            return list(self.get_superclass_closure(resource_url))
+
         query = f"""
         PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
         SELECT ?superclass WHERE {{
@@ -172,10 +418,12 @@ class DBpediaValidator:
     # PROPERTY FETCHERS (OUTGOING / INCOMING)
     # ------------------------------------------------------------
 
-    def get_all_outgoing_properties(self, page_name):
+    def get_all_outgoing_properties(self, page_name, uri_targets=None):
         """
         Returns all dbo:* outgoing properties for a resource.
         Filters out irrelevant or string-descriptive properties.
+        If uri_targets is a set, the names of the targets that are
+        resources (not literals) are added to it.
         """
         query = f"""
         PREFIX dbo: <http://dbpedia.org/ontology/>
@@ -183,38 +431,28 @@ class DBpediaValidator:
             <http://dbpedia.org/resource/{page_name}> ?property ?value .
             FILTER(STRSTARTS(STR(?property), "http://dbpedia.org/ontology/"))
             FILTER(!CONTAINS(STR(?property), "wikiPage"))
-            FILTER(?property NOT IN (
-                dbo:abstract, dbo:bicycleInformation, dbo:boilerPressure, dbo:carNumber, dbo:careerStation, dbo:collection,
-                dbo:damage, dbo:depictionDescription, dbo:description, dbo:event, dbo:imageSize, dbo:impactFactorAsOf,
-                dbo:isHandicappedAccessible, dbo:leaderFunction, dbo:lengthReference, dbo:liberationDate, dbo:logo,
-                dbo:mapCaption, dbo:militaryService, dbo:minister, dbo:name, dbo:note, dbo:notes,
-                dbo:numberOfVisitorsAsOf, dbo:orderInOffice, dbo:other, dbo:parkingInformation,
-                dbo:personFunction, dbo:picture, dbo:politicalLeader, dbo:projectKeyword, dbo:pronunciation,
-                dbo:quote, dbo:reference, dbo:restingPlacePosition, dbo:restriction, dbo:sales, dbo:selection,
-                dbo:signature, dbo:soundRecording, dbo:speaker, dbo:statisticLabel, dbo:strength,
-                dbo:termPeriod, dbo:thumbnail, dbo:title, dbo:tournamentRecord,
-                dbo:visitorStatisticsAsOf, dbo:winsAtAsia, dbo:winsAtAus, dbo:winsAtChallenges,
-                dbo:winsAtChampionships, dbo:winsAtJapan, dbo:winsAtLET, dbo:winsAtNWIDE,
-                dbo:winsAtOtherTournaments, dbo:winsAtPGA, dbo:winsAtSenEuro, dbo:winsInEurope
-            ))
+            FILTER(?property NOT IN ({EXCLUDED_OUTGOING_PROPERTIES}))
         }}
         ORDER BY ?property ?value
         """
 
-        results = []
-        for r in self.query(query):
-            prop = r["property"]["value"].split("/")[-1]
+        return [self.parse_outgoing_row(r, uri_targets) for r in self.query(query)]
 
-            # If URI resource, extract name; else literal
-            value = r["value"]["value"]
-            if value.startswith("http://"):
-                resource = value.split("/")[-1]
-            else:
-                resource = value
 
-            results.append((prop, resource))
+    def parse_outgoing_row(self, r, uri_targets=None):
+        """Returns (property, target) for one ?property ?value result row."""
+        prop = r["property"]["value"].split("/")[-1]
 
-        return results
+        # If URI resource, extract name; else literal
+        value = r["value"]["value"]
+        if value.startswith("http://"):
+            resource = value.split("/")[-1]
+            if uri_targets is not None:
+                uri_targets.add(resource)
+        else:
+            resource = value
+
+        return prop, resource
 
 
     def get_all_incoming_properties(self, page_name):
@@ -230,23 +468,93 @@ class DBpediaValidator:
         }}
         ORDER BY ?property ?subject
         """
-        results = []
-        for r in self.query(query):
-            subject = r["subject"]["value"]
-            if subject.startswith("http://"):
-                subject = subject.split("/")[-1]
+        return [self.parse_incoming_row(r) for r in self.query(query)]
 
-            prop = r["property"]["value"].split("/")[-1]
-            results.append((subject, prop))
 
-        return results
+    def parse_incoming_row(self, r):
+        """Returns (subject, property) for one ?subject ?property result row."""
+        subject = r["subject"]["value"]
+        if subject.startswith("http://"):
+            subject = subject.split("/")[-1]
+
+        prop = r["property"]["value"].split("/")[-1]
+        return subject, prop
+
+
+    def get_page_data(self, page_name, page_size=PAGE_DATA_PAGE_SIZE):
+        """
+        Fetches the outgoing and incoming properties of a resource with one
+        query: the two patterns are joined with UNION, and ?part tells which
+        one each row comes from. DBpedia returns at most 10000 rows per
+        query, so the rows are read in pages of page_size (LIMIT/OFFSET)
+        until a page is not full. The dbo types are fetched with their own
+        small query, so that they are never cut off on pages with many links.
+        If a page fails, the properties are fetched again with the two
+        separate fetchers. Returns (outgoing, incoming, page_types,
+        uri_targets), with the same values and order as the separate fetchers.
+        """
+        query = f"""
+        PREFIX dbo: <http://dbpedia.org/ontology/>
+        SELECT ?part ?property ?value ?subject WHERE {{
+            {{
+                <http://dbpedia.org/resource/{page_name}> ?property ?value .
+                FILTER(STRSTARTS(STR(?property), "http://dbpedia.org/ontology/"))
+                FILTER(!CONTAINS(STR(?property), "wikiPage"))
+                FILTER(?property NOT IN ({EXCLUDED_OUTGOING_PROPERTIES}))
+                BIND("1-out" AS ?part)
+            }}
+            UNION
+            {{
+                ?subject ?property <http://dbpedia.org/resource/{page_name}> .
+                FILTER(STRSTARTS(STR(?property), "http://dbpedia.org/ontology/"))
+                FILTER(!CONTAINS(STR(?property), "wikiPage"))
+                BIND("2-in" AS ?part)
+            }}
+        }}
+        ORDER BY ?part ?property ?value ?subject
+        """
+        outgoing, incoming, uri_targets = [], [], set()
+        offset = 0
+        # Unlike self.query, a failed page is not turned into an empty one, which would silently cut the lists short
+        try:
+            while True:
+                rows = self.run_query(f"{query}LIMIT {page_size} OFFSET {offset}")
+                for r in rows:
+                    if r["part"]["value"] == "1-out":
+                        outgoing.append(self.parse_outgoing_row(r, uri_targets))
+                    else:
+                        incoming.append(self.parse_incoming_row(r))
+                if len(rows) < page_size:
+                    break
+                offset += page_size
+        except Exception as e:
+            print(f"Combined query failed for {page_name}, using the separate queries: {e}")
+            uri_targets = set()
+            outgoing = self.get_all_outgoing_properties(page_name, uri_targets)
+            incoming = self.get_all_incoming_properties(page_name)
+        page_types = self.get_resource_types(page_name)
+        return outgoing, incoming, page_types, uri_targets
+
+
+    def get_page_data_cached(self, page_name):
+        """
+        Returns get_page_data(page_name) and keeps it in self.page_data,
+        so that filtering mode and validate_resource share one query.
+        """
+        if page_name not in self.page_data:
+            self.page_data[page_name] = self.get_page_data(page_name)
+        return self.page_data[page_name]
 
 
     def get_just_incoming_properties(self, page_name):
         """
         Returns only incoming property names as a simple list.
-        Used for filtering mode.
+        Used for filtering mode. With combined_fetch, the result of the
+        combined query is kept for validate_resource.
         """
+        if self.combined_fetch:
+            return [prop for subject, prop in self.get_page_data_cached(page_name)[1]]
+
         query = f"""
         PREFIX dbo: <http://dbpedia.org/ontology/>
         SELECT ?subject ?property WHERE {{
@@ -267,12 +575,14 @@ class DBpediaValidator:
     # VALIDATION LOGIC
     # ------------------------------------------------------------
 
-    def is_valid_type(self, resource_types, expected_ranges, target_resource, page_name=None, property_name=None, direction=None):
+    def is_valid_type(self, resource_types, expected_ranges, target_resource, page_name=None, property_name=None, direction=None, invalid_instances=None):
         """
         Validates that:
         - the target resource type matches expected range
         - OR superclass matches
         - OR literal value satisfies XSD type rules
+        Invalid checks are logged to invalid_instances if given, else to
+        self.invalid_instances.
         """
         if not expected_ranges:
             return 0.5   # Unknown → partial credit
@@ -282,9 +592,10 @@ class DBpediaValidator:
             return 1.0
 
         # Check superclass inheritance
+        expected_set = set(expected_ranges)
         for rtype in resource_types:
             superclasses = self.get_superclasses(rtype)
-            if set(superclasses) & set(expected_ranges):
+            if expected_set.intersection(superclasses):
                 return 1.0
 
         # Literal validators for xsd:* datatypes
@@ -312,7 +623,9 @@ class DBpediaValidator:
                 return 1.0
 
         # If reached here: invalid → record it
-        self.invalid_instances.append({
+        if invalid_instances is None:
+            invalid_instances = self.invalid_instances
+        invalid_instances.append({
             'page_name': page_name or '',
             'property': property_name or '',
             'target_resource': target_resource or '',
@@ -330,8 +643,7 @@ class DBpediaValidator:
         Returns JSON results list.
         """
         try:
-            self.sparql.setQuery(query_string)
-            return self.sparql.query().convert()["results"]["bindings"]
+            return self.run_query(query_string)
         except:
             return []
 
@@ -368,10 +680,7 @@ class DBpediaValidator:
             return
 
         with open(filename, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=[
-                'page_name', 'property', 'target_resource', 'direction',
-                'expected_ranges', 'actual_types'
-            ])
+            writer = csv.DictWriter(f, fieldnames=INVALID_FIELDNAMES)
             writer.writeheader()
             writer.writerows(self.invalid_instances)
 
@@ -382,125 +691,192 @@ class DBpediaValidator:
     # MAIN VALIDATOR FOR ONE RESOURCE
     # ------------------------------------------------------------
 
-    def validate_resource(self, page_name):
+    def validate_resource(self, page_name, invalid_instances=None, verbose=True):
         """
         Validates:
         - outgoing dbo:* property values
         - incoming dbo:* property references
-        Computes scores and prints detailed report.
+        Computes scores and prints detailed report (if verbose).
+        Invalid checks go to invalid_instances if given, else to
+        self.invalid_instances.
         """
+        log = print if verbose else lambda *args, **kwargs: None
         clean_page = self.clean_name(page_name)
         score = total = 0
         out_score = out_total = 0
         in_score = in_total = 0
 
-        print(f"\nValidating: {page_name}")
-        print("=" * 50)
+        log(f"\nValidating: {page_name}")
+        log("=" * 50)
 
-        outgoing = self.get_all_outgoing_properties(clean_page)
-        incoming = self.get_all_incoming_properties(clean_page)
-        page_types = self.get_resource_types(clean_page)
+        if self.combined_fetch:
+            outgoing, incoming, page_types, uri_targets = self.page_data.pop(clean_page, None) or self.get_page_data(clean_page)
+        else:
+            uri_targets = set()
+            outgoing = self.get_all_outgoing_properties(clean_page, uri_targets)
+            incoming = self.get_all_incoming_properties(clean_page)
+            page_types = self.get_resource_types(clean_page)
 
         if outgoing == [] and incoming == []:
             return "N/A", "", "", "", "", ""
 
-        print("\n--- Outgoing Properties ---")
-        property_ranges_cache = {}
+        # Literals (dates, numbers, strings) have no rdf:type: only the resources are looked up, in chunks
+        target_types = self.get_resource_types_batch([target for prop, target in outgoing if target in uri_targets])
 
-        for prop, target_resource in outgoing:
+        log("\n--- Outgoing Properties ---")
 
-            # Cache property ranges
-            if prop not in property_ranges_cache:
-                if self.data_type == "dbo":
-                    property_ranges_cache[prop] = self.get_dbo_property_ranges(prop)
-                else:
-                    property_ranges_cache[prop] = self.get_dbp_property_ranges(prop)
+        for prop, target_resource in outgoing:
 
-            ranges = property_ranges_cache[prop]
-            target_types = self.get_resource_types(target_resource)
+            ranges = self.get_property_ranges(prop)
 
-            validity = self.is_valid_type(target_types, ranges, target_resource, page_name, prop, 'outgoing')
+            validity = self.is_valid_type(target_types.get(target_resource, []), ranges, target_resource, page_name, prop, 'outgoing', invalid_instances)
             score += validity
             total += 1
             out_score += validity
             out_total += 1
 
             status = "✅" if validity == 1 else "❓" if validity == 0.5 else "❌"
-            print(f"{prop} → {target_resource} {status}")
+            log(f"{prop} → {target_resource} {status}")
 
-        print("\n--- Incoming Properties ---")
+        log("\n--- Incoming Properties ---")
 
         for subject, prop in incoming:
 
-            if prop not in property_ranges_cache:
-                if self.data_type == "dbo":
-                    property_ranges_cache[prop] = self.get_dbo_property_ranges(prop)
-                else:
-                    property_ranges_cache[prop] = self.get_dbp_property_ranges(prop)
-
-            ranges = property_ranges_cache[prop]
+            ranges = self.get_property_ranges(prop)
 
-            validity = self.is_valid_type(page_types, ranges, page_name, page_name, prop, 'incoming')
+            validity = self.is_valid_type(page_types, ranges, page_name, page_name, prop, 'incoming', invalid_instances)
             score += validity
             total += 1
             in_score += validity
             in_total += 1
 
             status = "✅" if validity == 1 else "❓" if validity == 0.5 else "❌"
-            print(f"{subject} ({prop}) → {page_name} {status}")
+            log(f"{subject} ({prop}) → {page_name} {status}")
 
         # Compute percentages
         percentage = round(score / total * 100) if total > 0 else 0
         out_percentage = round(out_score / out_total * 100) if out_total > 0 else 0
         in_percentage = round(in_score / in_total * 100) if in_total > 0 else 0
 
-        print(f"\nScore: {percentage}% ({score}/{total})")
-        print(f"Outgoing: {out_percentage}% ({out_score}/{out_total})")
-        print(f"Incoming: {in_percentage}% ({in_score}/{in_total})")
+        log(f"\nScore: {percentage}% ({score}/{total})")
+        log(f"Outgoing: {out_percentage}% ({out_score}/{out_total})")
+        log(f"Incoming: {in_percentage}% ({in_score}/{in_total})")
 
         return percentage, total, out_percentage, out_total, in_percentage, in_total
 
 
+    def validate_page(self, page, verbose=True):
+        """
+        Validates one page with its own invalid-instance list, so that
+        several pages can be validated at the same time.
+        Returns (scores, invalid_instances).
+        """
+        invalid_instances = []
+        scores = self.validate_resource(page, invalid_instances, verbose)
+        return scores, invalid_instances
+
+
+    def iter_validated_pages(self, pages, num_workers=1, max_in_flight=None):
+        """
+        Yields (page, scores, invalid_instances) in the order of pages.
+        With num_workers > 1, pages are validated by a thread pool, with at
+        most max_in_flight pages submitted but not yet yielded.
+        """
+        if num_workers <= 1:
+            for page in pages:
+                scores, invalid_instances = self.validate_page(page)
+                yield page, scores, invalid_instances
+            return
+
+        max_in_flight = max(max_in_flight or 2 * num_workers, num_workers)
+        pages = iter(pages)
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            in_flight = deque((page, executor.submit(self.validate_page, page, False)) for page in islice(pages, max_in_flight))
+            while in_flight:
+                page, future = in_flight.popleft()
+                scores, invalid_instances = future.result()
+                # Refill the window before handing the page to the writer
+                next_page = next(pages, None)
+                if next_page is not None:
+                    in_flight.append((next_page, executor.submit(self.validate_page, next_page, False)))
+                yield page, scores, invalid_instances
+
+
+    def read_written_pages(self, output, invalid):
+        """
+        Returns the pages already in the score CSV, and removes from the
+        fails CSV the rows of pages that are not in it (pages interrupted
+        between the two writes).
+        """
+        if not os.path.exists(output):
+            return set()
+
+        with open(output, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            written_pages = {row[0] for row in reader if row}
+
+        if os.path.exists(invalid):
+            with open(invalid, 'r', encoding='utf-8', newline='') as f:
+                rows = [row for row in csv.DictReader(f) if row['page_name'] in written_pages]
+            with open(invalid, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=INVALID_FIELDNAMES)
+                writer.writeheader()
+                writer.writerows(rows)
+
+        return written_pages
+
+
     # ------------------------------------------------------------
     # MAIN CSV WRITER
     # ------------------------------------------------------------
 
-    def write_to_file(self, output, invalid, pages):
+    def write_to_file(self, output, invalid, pages, num_workers=1, max_in_flight=None, resume=False):
         """
         Validates all pages and writes:
         - main score CSV
         - invalid instances CSV
-        """
-        with open(output, 'w', encoding='utf-8', newline='') as out_f, \
-             open(invalid, 'w', encoding='utf-8', newline='') as fail_f:
+        Rows are written in the order of pages, by this thread only, even
+        when num_workers > 1. With resume, pages already in the score CSV
+        are skipped and the new rows are appended.
+        """
+        written_pages = self.read_written_pages(output, invalid) if resume else set()
+        append = bool(written_pages)
+        if append:
+            num_pages = len(pages)
+            pages = [page for page in pages if page not in written_pages]
+            print(f"Resuming: {num_pages - len(pages)} pages skipped (already in {output}), {len(pages)} left")
+
+        # The fails CSV can be missing even if the score CSV has rows (e.g. deleted by hand): its header is then written
+        append_invalid = append and os.path.exists(invalid)
+        with open(output, 'a' if append else 'w', encoding='utf-8', newline='') as out_f, \
+             open(invalid, 'a' if append_invalid else 'w', encoding='utf-8', newline='') as fail_f:
 
             valid_writer = csv.writer(out_f)
-            invalid_writer = csv.DictWriter(fail_f, fieldnames=[
-                'page_name', 'property', 'target_resource', 'direction',
-                'expected_ranges', 'actual_types'
-            ])
-
-            valid_writer.writerow([
-                "Page Name", "Score", "Datapoints",
-                "Properties Score", "Properties Checked",
-                "Incoming Score", "Incoming Checked"
-            ])
-            invalid_writer.writeheader()
-
-            for page in pages:
-                score, datapoints, propscore, proptotal, isofscore, isoftotal = self.validate_resource(page)
+            invalid_writer = csv.DictWriter(fail_f, fieldnames=INVALID_FIELDNAMES)
+
+            if not append:
+                valid_writer.writerow([
+                    "Page Name", "Score", "Datapoints",
+                    "Properties Score", "Properties Checked",
+                    "Incoming Score", "Incoming Checked"
+                ])
+            if not append_invalid:
+                invalid_writer.writeheader()
+
+            for page, scores, invalid_instances in self.iter_validated_pages(pages, num_workers, max_in_flight):
+                score, datapoints, propscore, proptotal, isofscore, isoftotal = scores
+
+                # Write invalid instances first, so that a page in the score CSV always has all its fails written
+                if invalid_instances:
+                    invalid_writer.writerows(invalid_instances)
+                    fail_f.flush()
+                    print(f"  → {len(invalid_instances)} invalid instances written for {page}")
 
                 # Write scores
                 valid_writer.writerow([page, score, datapoints, propscore, proptotal, isofscore, isoftotal])
                 out_f.flush()
 
-                # Write invalid instances
-                if self.invalid_instances:
-                    invalid_writer.writerows(self.invalid_instances)
-                    fail_f.flush()
-                    print(f"  → {len(self.invalid_instances)} invalid instances written for {page}")
-                    self.invalid_instances.clear()
-
                 print(f"Written {page} to CSV")
                 print("=" * 100)
 
@@ -510,7 +886,10 @@ class DBpediaValidator:
 # ------------------------------------------------------------
 
 def main():
-    validator = DBpediaValidator(DATA_TYPE)
+    os.makedirs(CACHE_FOLDER, exist_ok=True)
+    validator = DBpediaValidator(DATA_TYPE, hierarchy_file=HIERARCHY_FILE, ranges_cache_file=RANGES_CACHE_FILE, combined_fetch=COMBINED_FETCH)
+    if PREFETCH_RANGES:
+        validator.prefetch_property_ranges()
 
     input_file = f'{FOLDER}/Input/files-sorted.csv'
     output_file = f'{FOLDER}/Output/Scores/{SECTION}_{DATA_TYPE}_scores.csv'
@@ -531,13 +910,17 @@ def main():
             print(f"Checking pages for {PARAMETER} property...")
             for i, page in enumerate(pages):
                 print(f"\t{round(i / len(pages) * 100)}% completed ({page})", end="\r")
-                just_incoming_props = set(validator.get_just_incoming_properties(validator.clean_name(page)))
+                clean_page = validator.clean_name(page)
+                just_incoming_props = set(validator.get_just_incoming_properties(clean_page))
                 if PARAMETER in just_incoming_props:
                     filtered_pages.append(page)
+                else:
+                    validator.page_data.pop(clean_page, None)
         else:
             filtered_pages = pages
 
-    validator.write_to_file(output_file, invalid_file, filtered_pages)
+    validator.write_to_file(output_file, invalid_file, filtered_pages, NUM_WORKERS, MAX_IN_FLIGHT_PAGES, RESUME)
+    validator.save_property_ranges_cache()
 
 
 if __name__ == "__main__":
@@ -1,23 +1,27 @@
-import requests
+import os
+import sys
 import time
 
-def get_random_titles(total=10, batch_size=50):
+# code/, for the HTTP transport shared with the rest of the code (keep-alive connections, User-Agent)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from queryDBpediaProps import get_http_transport
+
+# Can point to a local stand-in server (see code/fixture_server.py)
+WIKIPEDIA_API_ENDPOINT = os.environ.get("WIKIPEDIA_API_ENDPOINT", "https://en.wikipedia.org/w/api.php")
+
+def get_random_titles(total=10, batch_size=50, endpoint=None):
     titles = []
-    endpoint = "https://en.wikipedia.org/w/api.php"
-    headers = {
-        "User-Agent": "eSTÓR-DCU"
-    }
+    if endpoint is None:
+        endpoint = WIKIPEDIA_API_ENDPOINT
+    transport = get_http_transport()
 
     while len(titles) < total:
-        response = requests.get(endpoint, params={
+        data = transport.get_json(endpoint, params={
             "action": "query",
             "list": "random",
             "rnlimit": batch_size,
             "format": "json"
-        }, headers=headers)
-
-        response.raise_for_status()
-        data = response.json()
+        })
         
         # Filter out non-article titles (those containing :)
         batch_titles = [
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Benchmarks for the data-preparation functions of utils.py, run on synthetic WebNLG-style inputs.
+# Usage (from the root of the repository):
+#   python code/benchmark_utils.py --save benchmark_baseline.json
+#   python code/benchmark_utils.py --compare benchmark_baseline.json --threshold 0.25
+# Each function is timed (best of --repeats runs) and its peak memory is measured with tracemalloc; with --compare, the script lists the
+# measurements that are more than --threshold above the baseline and exits with code 1 if there are any.
+import os
+import sys
+import io
+import json
+import time
+import random
+import codecs
+import argparse
+import tempfile
+import platform
+import tracemalloc
+import contextlib
+from utils import Triple_withID, get_first_n_instances_of_props, sort_WebNLG_XMLs, split_XMLs, create_xml, balanced_split_with_max, extract_info_from_WebNLG_XML, clear_files
+
+resources_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'resources')
+path_DBprops_count = os.path.join(resources_folder, 'dico_count_occurrences_dbp_props.json')
+path_props_once_only = os.path.join(resources_folder, 'list_props_that_can_happen_once_only.json')
+
+# Number of triples in the generated inputs
+SCALES = [10, 1000, 100000]
+# 'hub': a few triple sets (up to 3) around one main entity each; 'small': many triple sets of 5 triples
+SHAPES = ['hub', 'small']
+
+def get_property_labels():
+  dico_count_occurrences_dbp_props = json.loads(codecs.open(path_DBprops_count, 'r', 'utf-8').read())
+  return [key.rsplit('/', 1)[1] for key in dico_count_occurrences_dbp_props if key.startswith('http://dbpedia.org/ontology/') and 'wikiPage' not in key]
+
+def make_triple_sets(num_triples, shape, seed = 0):
+  """ Returns a list of triple sets (lists of [subject, property, object]) with num_triples triples in total. """
+  rng = random.Random(seed)
+  property_labels = get_property_labels()[:60]
+  if shape == 'hub':
+    num_sets = min(3, num_triples)
+  else:
+    num_sets = max(1, num_triples // 5)
+  triple_sets = []
+  for set_number in range(num_sets):
+    set_size = num_triples // num_sets + (1 if set_number < num_triples % num_sets else 0)
+    main_entity = f'Entity_{set_number}'
+    other_entities = [f'Entity_{set_number}_{i}' for i in range(max(2, set_size // 4))]
+    triples = []
+    for i in range(set_size):
+      prop = rng.choice(property_labels)
+      draw = rng.random()
+      if draw < 0.6:
+        triples.append([main_entity, prop, rng.choice(other_entities)])
+      elif draw < 0.9:
+        triples.append([rng.choice(other_entities), prop, main_entity])
+      else:
+        triples.append([rng.choice(other_entities), prop, rng.choice(other_entities)])
+    triple_sets.append(triples)
+  return triple_sets
+
+def write_WebNLG_XML(triple_sets, path_XML):
+  with codecs.open(path_XML, 'w', 'utf-8') as fo:
+    fo.write('<?xml version="1.0" ?>\n<benchmark>\n  <entries>\n')
+    for eid, triples in enumerate(triple_sets):
+      fo.write(f'    <entry category="Cat{eid % 3}" eid="Id{eid+1}" shape="(X (X) (X))" shape-type="sibling" size="{len(triples)}">\n')
+      for tripleset_tag, triple_tag in [['originaltripleset', 'otriple'], ['modifiedtripleset', 'mtriple']]:
+        fo.write(f'      <{tripleset_tag}>\n')
+        for subj, prop, obj in triples:
+          fo.write(f'        <{triple_tag}>{subj} | {prop} | {obj}</{triple_tag}>\n')
+        fo.write(f'      </{tripleset_tag}>\n')
+      fo.write('    </entry>\n')
+    fo.write('  </entries>\n</benchmark>\n')
+
+def measure(function, repeats):
+  """ Returns the best run time (seconds) of function() over repeats runs, and its peak memory (bytes) measured on a separate run. """
+  best_time = None
+  for _ in range(repeats):
+    with contextlib.redirect_stdout(io.StringIO()):
+      start = time.perf_counter()
+      function()
+      elapsed = time.perf_counter() - start
+    if best_time is None or elapsed < best_time:
+      best_time = elapsed
+  tracemalloc.start()
+  with contextlib.redirect_stdout(io.StringIO()):
+    function()
+  peak_memory = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  return best_time, peak_memory
+
+def run_benchmarks(scales, shapes, repeats, work_folder):
+  properties_that_can_happen_once_only = json.loads(codecs.open(path_props_once_only, 'r', 'utf-8').read())
+  results = {}
+  for num_triples in scales:
+    for shape in shapes:
+      triple_sets = make_triple_sets(num_triples, shape)
+      path_XML = os.path.join(work_folder, f'{shape}_{num_triples}.xml')
+      write_WebNLG_XML(triple_sets, path_XML)
+      all_triples = [Triple_withID(prop, subj, obj, i) for i, [subj, prop, obj] in enumerate([triple for triples in triple_sets for triple in triples])]
+      xml_folder = os.path.join(work_folder, 'create_xml')
+      split_folder = os.path.join(work_folder, 'split')
+      os.makedirs(xml_folder, exist_ok=True)
+      benchmarks = {
+        'extract_info_from_WebNLG_XML': lambda: extract_info_from_WebNLG_XML(path_XML),
+        'sort_WebNLG_XMLs': lambda: sort_WebNLG_XMLs(path_XML, path_DBprops_count),
+        'split_XMLs': lambda: split_XMLs(path_XML, path_DBprops_count, 10, split_folder),
+        'create_xml': lambda: create_xml(all_triples, range(len(all_triples)), 'Cat0', xml_folder),
+        'get_first_n_instances_of_props': lambda: get_first_n_instances_of_props(all_triples, 3, properties_that_can_happen_once_only),
+        'balanced_split_with_max': lambda: balanced_split_with_max(num_triples, min(10, num_triples)),
+      }
+      for function_name, function in benchmarks.items():
+        best_time, peak_memory = measure(function, repeats)
+        key = f'{function_name}[{shape}-{num_triples}]'
+        results[key] = {'time': best_time, 'peak_memory': peak_memory}
+        print(f'{key:<50} {best_time*1000:>10.2f} ms {peak_memory/1024:>12.0f} KiB')
+      clear_files(xml_folder)
+  return results
+
+def compare_to_baseline(results, baseline, threshold):
+  """ Returns the list of measurements that are more than threshold (e.g. 0.25 for 25%) above the baseline. """
+  regressions = []
+  for key, measurement in results.items():
+    if key not in baseline['results']:
+      continue
+    for metric in ['time', 'peak_memory']:
+      baseline_value = baseline['results'][key][metric]
+      if baseline_value > 0 and measurement[metric] > baseline_value * (1 + threshold):
+        regressions.append(f'{key} {metric}: {measurement[metric]:.6g} vs {baseline_value:.6g} (+{(measurement[metric]/baseline_value-1)*100:.0f}%)')
+  return regressions
+
+def main():
+  parser = argparse.ArgumentParser(description='Benchmark the data-preparation functions of utils.py.')
+  parser.add_argument('--scales', default=','.join([str(scale) for scale in SCALES]), help='comma-separated numbers of triples')
+  parser.add_argument('--shapes', default=','.join(SHAPES), help='comma-separated input shapes (hub, small)')
+  parser.add_argument('--repeats', type=int, default=3)
+  parser.add_argument('--save', help='path of a JSON file in which to save the results as a baseline')
+  parser.add_argument('--compare', help='path of a baseline JSON file to compare the results to')
+  parser.add_argument('--threshold', type=float, default=0.25, help='relative increase above which a measurement is flagged as a regression')
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as work_folder:
+    results = run_benchmarks([int(scale) for scale in args.scales.split(',')], args.shapes.split(','), args.repeats, work_folder)
+
+  if args.save:
+    with codecs.open(args.save, 'w', 'utf-8') as fo:
+      json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'results': results}, fo, indent=2)
+    print(f'Saved baseline to {args.save}')
+  if args.compare:
+    baseline = json.loads(codecs.open(args.compare, 'r', 'utf-8').read())
+    regressions = compare_to_baseline(results, baseline, args.threshold)
+    if regressions:
+      print(f'\n{len(regressions)} regressions above {args.threshold*100:.0f}%:')
+      for regression in regressions:
+        print(f'  {regression}')
+      sys.exit(1)
+    print(f'\nNo regressions above {args.threshold*100:.0f}%.')
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Local stand-in for the DBpedia and Wikidata SPARQL endpoints and the Wikidata and Wikipedia APIs, for load and benchmark tests of the fetch code on one machine.
+# Responses are served from a JSON fixture file, with configurable latency, error rate and throttling (HTTP 429 with a Retry-After header).
+# With --record, queries that are not in the fixtures are forwarded to the real services and their answers are added to the fixture file.
+#
+# Start the server:
+#   python code/fixture_server.py --fixtures fixtures.json --port 8890 --latency-ms 50 --error-rate 0.02 --max-rps 20
+# Then point the code to it:
+#   export DBPEDIA_SPARQL_ENDPOINT=http://localhost:8890/dbpedia/sparql
+#   export WIKIDATA_SPARQL_ENDPOINT=http://localhost:8890/wikidata/sparql
+#   export WIKIDATA_API_ENDPOINT=http://localhost:8890/wikidata/api
+#   export WIKIPEDIA_API_ENDPOINT=http://localhost:8890/wikipedia/api
+import os
+import sys
+import json
+import time
+import codecs
+import random
+import argparse
+import threading
+import urllib.parse
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Path served by the stand-in server -> real service it replaces
+UPSTREAM_URLS = {
+  '/dbpedia/sparql': 'https://dbpedia.org/sparql',
+  '/wikidata/sparql': 'https://query.wikidata.org/sparql',
+  '/wikidata/api': 'https://www.wikidata.org/w/api.php',
+  '/wikipedia/api': 'https://en.wikipedia.org/w/api.php',
+}
+SPARQL_PATHS = ['/dbpedia/sparql', '/wikidata/sparql']
+# Request parameters that do not change the answer, and are left out of the fixture keys
+IGNORED_PARAMS = ['format', 'output', 'results', 'callback']
+
+def get_fixture_key(path, params):
+  """ SPARQL queries are identified by their normalised text (whitespace collapsed), API requests by their sorted parameters. """
+  if path in SPARQL_PATHS:
+    return ' '.join(params.get('query', '').split())
+  return json.dumps({name: value for name, value in sorted(params.items()) if name not in IGNORED_PARAMS}, sort_keys=True)
+
+class FixtureStore:
+  """ Recorded responses, stored in a JSON file as {path: {fixture key: response}}. """
+  def __init__(self, fixtures_path):
+    self.fixtures_path = fixtures_path
+    self.lock = threading.Lock()
+    self.fixtures = {path: {} for path in UPSTREAM_URLS}
+    if os.path.exists(fixtures_path):
+      for path, responses in json.loads(codecs.open(fixtures_path, 'r', 'utf-8').read()).items():
+        self.fixtures.setdefault(path, {}).update(responses)
+
+  def get(self, path, key):
+    with self.lock:
+      return self.fixtures[path].get(key)
+
+  def add(self, path, key, response):
+    with self.lock:
+      self.fixtures[path][key] = response
+      with codecs.open(self.fixtures_path, 'w', 'utf-8') as fo:
+        json.dump(self.fixtures, fo, ensure_ascii=False, indent=1)
+
+class Throttle:
+  """ Allows at most max_rps requests per second over a sliding one-second window; max_rps = 0 means no limit. """
+  def __init__(self, max_rps):
+    self.max_rps = max_rps
+    self.request_times = []
+    self.lock = threading.Lock()
+
+  def retry_after(self):
+    """ Returns 0 if the request can be served, otherwise the number of seconds after which the client should retry. """
+    if not self.max_rps:
+      return 0
+    with self.lock:
+      now = time.monotonic()
+      self.request_times = [request_time for request_time in self.request_times if request_time > now - 1]
+      if len(self.request_times) >= self.max_rps:
+        return max(1, int(self.request_times[0] + 1 - now + 0.999))
+      self.request_times.append(now)
+      return 0
+
+def make_random_titles_response(params, counter):
+  """ Deterministic answer to Wikipedia's list=random requests, which cannot be replayed from fixtures. """
+  limit = int(params.get('rnlimit', 10))
+  titles = []
+  for _ in range(limit):
+    number = next(counter)
+    titles.append({'id': number, 'ns': 0, 'title': f'Article {number}'})
+  return {'batchcomplete': '', 'query': {'random': titles}}
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+  # Keep-alive connections, as with the real services (every answer has a Content-Length); without TCP_NODELAY, the headers and body
+  # written separately on a kept-alive connection are delayed by about 40 ms (Nagle's algorithm and delayed ACKs)
+  protocol_version = 'HTTP/1.1'
+  disable_nagle_algorithm = True
+  # Set by make_server
+  store = None
+  settings = None
+  throttle = None
+  rng = None
+  rng_lock = threading.Lock()
+  title_counter = None
+
+  def log_message(self, format, *args):
+    if not self.settings.quiet:
+      super().log_message(format, *args)
+
+  def do_GET(self):
+    url = urllib.parse.urlsplit(self.path)
+    self.handle_request(url.path, dict(urllib.parse.parse_qsl(url.query)))
+
+  def do_POST(self):
+    url = urllib.parse.urlsplit(self.path)
+    params = dict(urllib.parse.parse_qsl(url.query))
+    body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8')
+    # SPARQL queries can be posted either as a form or directly as the body
+    if self.headers.get('Content-Type', '').startswith('application/sparql-query'):
+      params['query'] = body
+    else:
+      params.update(dict(urllib.parse.parse_qsl(body)))
+    self.handle_request(url.path, params)
+
+  def send_json(self, status, response, content_type, extra_headers = None):
+    body = json.dumps(response).encode('utf-8')
+    self.send_response(status)
+    self.send_header('Content-Type', content_type)
+    self.send_header('Content-Length', str(len(body)))
+    for name, value in (extra_headers or {}).items():
+      self.send_header(name, value)
+    self.end_headers()
+    self.wfile.write(body)
+
+  def handle_request(self, path, params):
+    if path not in UPSTREAM_URLS:
+      self.send_json(404, {'error': f'Unknown path {path}'}, 'application/json')
+      return
+    content_type = 'application/sparql-results+json' if path in SPARQL_PATHS else 'application/json'
+    retry_after = self.throttle.retry_after()
+    if retry_after > 0:
+      self.send_json(429, {'error': 'Too many requests'}, 'application/json', {'Retry-After': str(retry_after)})
+      return
+    with self.rng_lock:
+      latency = max(0, self.settings.latency_ms + self.rng.uniform(-self.settings.jitter_ms, self.settings.jitter_ms)) / 1000
+      fail = self.rng.random() < self.settings.error_rate
+    time.sleep(latency)
+    if fail:
+      self.send_json(500, {'error': 'Simulated server error'}, 'application/json')
+      return
+    key = get_fixture_key(path, params)
+    response = self.store.get(path, key)
+    if response is None and path == '/wikipedia/api' and params.get('list') == 'random':
+      response = make_random_titles_response(params, self.title_counter)
+    if response is None and self.settings.record:
+      response = fetch_upstream(path, params)
+      self.store.add(path, key, response)
+    if response is None:
+      if self.settings.missing == '404':
+        self.send_json(404, {'error': 'No fixture for this request'}, 'application/json')
+        return
+      # Same as an answer with no results
+      response = {'head': {'vars': []}, 'results': {'bindings': []}} if path in SPARQL_PATHS else {}
+    self.send_json(200, response, content_type)
+
+def fetch_upstream(path, params):
+  """ Sends the request to the real service and returns its JSON answer. """
+  upstream_params = dict(params)
+  upstream_params['format'] = 'json'
+  request = urllib.request.Request(UPSTREAM_URLS[path]+'?'+urllib.parse.urlencode(upstream_params), headers={'User-Agent': 'WikipediaPage_Generator fixture recorder', 'Accept': 'application/sparql-results+json, application/json'})
+  with urllib.request.urlopen(request, timeout=60) as response:
+    return json.loads(response.read().decode('utf-8'))
+
+def make_server(fixtures_path, host = 'localhost', port = 8890, latency_ms = 0, jitter_ms = 0, error_rate = 0, max_rps = 0, record = False, missing = 'empty', seed = 0, quiet = True):
+  """ Returns a ThreadingHTTPServer (not started; call serve_forever) that serves the fixtures in fixtures_path. """
+  settings = argparse.Namespace(latency_ms=latency_ms, jitter_ms=jitter_ms, error_rate=error_rate, record=record, missing=missing, quiet=quiet)
+  handler = type('ConfiguredFixtureRequestHandler', (FixtureRequestHandler,), {
+    'store': FixtureStore(fixtures_path),
+    'settings': settings,
+    'throttle': Throttle(max_rps),
+    'rng': random.Random(seed),
+    'title_counter': iter(range(1, sys.maxsize)),
+  })
+  return ThreadingHTTPServer((host, port), handler)
+
+def main():
+  parser = argparse.ArgumentParser(description='Local stand-in for the DBpedia/Wikidata SPARQL endpoints and the Wikidata/Wikipedia APIs.')
+  parser.add_argument('--fixtures', required=True, help='JSON file with the recorded responses (created if it does not exist)')
+  parser.add_argument('--host', default='localhost')
+  parser.add_argument('--port', type=int, default=8890)
+  parser.add_argument('--latency-ms', type=float, default=0, help='delay added to each answer')
+  parser.add_argument('--jitter-ms', type=float, default=0, help='random variation of the delay, in both directions')
+  parser.add_argument('--error-rate', type=float, default=0, help='proportion of requests answered with HTTP 500')
+  parser.add_argument('--max-rps', type=float, default=0, help='requests per second above which HTTP 429 is returned (0: no limit)')
+  parser.add_argument('--missing', choices=['empty', '404'], default='empty', help='answer to requests that are not in the fixtures')
+  parser.add_argument('--record', action='store_true', help='forward requests that are not in the fixtures to the real services and save the answers')
+  parser.add_argument('--seed', type=int, default=0, help='seed for the latency and error draws')
+  parser.add_argument('--verbose', action='store_true', help='log each request')
+  args = parser.parse_args()
+  server = make_server(args.fixtures, args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.max_rps, args.record, args.missing, args.seed, quiet=not args.verbose)
+  print(f'Serving {", ".join(UPSTREAM_URLS)} on http://{args.host}:{args.port}')
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    server.server_close()
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Headless batch version of the generation steps of Wikipedia_generator.ipynb, for many entities at a time.
+# Each entity gets its own working folder, laid out like the notebook's root folder (triples2predArg, FORGe/structures, FORGe/log, FORGe-out, morph),
+# so that several entities can go through the stages at the same time; the tools installed by the notebook's first cell are shared.
+# A manifest (manifest.json in the work folder) records the stages completed by each entity, so that a restarted batch skips completed work.
+# A fingerprint of the selected triples, language, category and resource versions is saved next to each generated text; when the properties of an entity
+# are fetched again (e.g. with --refresh) and the fingerprint has not changed, the other stages are skipped.
+# Usage (after running the notebook's "Prepare repo" cell, from the root folder of that cell):
+#   python WikipediaPage_Generator/code/generate_pages.py --entities entities.txt --category Scientist --language EN --work-folder batch --output-folder pages --workers 4
+# entities.txt has one entity per line, optionally followed by a tab and a category (to override --category).
+import os
+import sys
+import json
+import time
+import codecs
+import pickle
+import shutil
+import argparse
+import threading
+import subprocess
+import concurrent.futures
+from queryDBpediaProps import get_dbpedia_properties
+from utils import get_prop_index_from_table, get_first_n_instances_of_props, get_selected_triples_text, get_file_version, get_generation_fingerprint, removeReservedCharsFileName, create_xml, create_GPT_Prompt, create_jsons_SubjAndObj, prepare_variables_xml2CoNLL_conversion, count_expected_texts, check_postProcessed_outputs, concatenate_files_UI, clear_files, clear_folder
+
+# Modules of the FORGe pipeline, in the order expected by M-FleNS.py (only FORGe is supported, see the notebook)
+FORGE_MODULES = ['FORGe', 'None', 'FORGe', 'FORGe', 'FORGe', 'FORGe', 'FORGe', 'FORGe', 'FORGe', 'FORGe', 'FORGe']
+STRUCTURE_FOLDERS = ['00-PredArg', '01-PredArgNorm', '02-PredArgAggMark', '03-PredArgAgg', '04-PredArgPoS', '05-PredArgComm', '06-DSynt', '07-SSynt', '08-SSyntAgg', '09-REG', '10-DMorphLin', '11-SMorphText']
+MORPH_FOLDER_NAME = 'test_irish_morph_gen_v5.0'
+path_props_once_only = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'resources', 'list_props_that_can_happen_once_only.json')
+# Repositories cloned by the notebook, whose commits are part of the resource versions
+RESOURCE_REPOSITORIES = ['WikipediaPage_Generator', 'M-FleNS_NLG-Pipeline', 'DCU_TCD_FORGe_WebNLG23']
+
+class EntityJob:
+  """ An entity to generate, with the paths of its working folder (same layout as the notebook's root folder). """
+  def __init__(self, name, category, work_folder, output_folder, language):
+    self.name = name
+    self.entity_name = ('_').join(name.split(' '))
+    self.category = category
+    self.folder = os.path.join(work_folder, removeReservedCharsFileName(self.entity_name))
+    self.triple2predArg = os.path.join(self.folder, 'triples2predArg')
+    self.structures = os.path.join(self.folder, 'FORGe', 'structures')
+    self.str_PredArg_folder = os.path.join(self.structures, STRUCTURE_FOLDERS[0])
+    self.str_SMorphText_folder = os.path.join(self.structures, STRUCTURE_FOLDERS[-1])
+    self.log_folder = os.path.join(self.folder, 'FORGe', 'log')
+    self.FORGe_input_folder = os.path.join(self.folder, 'FORGe', 'buddy_project', 'struct')
+    self.path_props = os.path.join(self.folder, 'FORGe', 'mate.properties')
+    self.temp_input_folder_morph = os.path.join(self.folder, 'FORGe-out')
+    self.morph_input_folder = os.path.join(self.folder, 'morph', 'Inputs')
+    self.morph_output_folder = os.path.join(self.folder, 'morph', 'Outputs')
+    self.stage_logs = os.path.join(self.folder, 'stage_logs')
+    self.path_triples = os.path.join(self.folder, 'triples.pickle')
+    self.path_fingerprint = os.path.join(self.folder, 'fingerprint.txt')
+    # Same name as the text written by concatenate_files_UI
+    self.path_output = os.path.join(output_folder, self.entity_name+'_'+language+'.txt')
+    self.path_output_fingerprint = os.path.join(output_folder, self.entity_name+'_'+language+'.fingerprint')
+
+def get_tool_paths(root_folder):
+  """ Paths of the tools installed by the notebook's "Prepare repo" cell. """
+  return argparse.Namespace(
+    root_folder = root_folder,
+    triple2predArg = os.path.join(root_folder, 'triples2predArg'),
+    triple2Conll_jar = os.path.join(root_folder, 'triples2predArg', 'webNLG_triples2conll.jar'),
+    props_list_path = os.path.join(root_folder, 'DCU_TCD_FORGe_WebNLG23', 'code', 'sorted_properties.txt'),
+    path_MFleNS = os.path.join(root_folder, 'M-FleNS_NLG-Pipeline', 'code', 'M-FleNS.py'),
+    path_checkOutputs = os.path.join(root_folder, 'M-FleNS_NLG-Pipeline', 'code', 'M-FleNS-checkOutputs.py'),
+    path_postProc = os.path.join(root_folder, 'M-FleNS_NLG-Pipeline', 'code', 'postProcess.py'),
+    path_FORGe2Morph = os.path.join(root_folder, 'DCU_TCD_FORGe_WebNLG23', 'code', 'FORGe2Morph.py'),
+    path_concatenate = os.path.join(root_folder, 'M-FleNS_NLG-Pipeline', 'code', 'concatenate_files.py'),
+    path_getClassGenderDBp = os.path.join(root_folder, 'M-FleNS_NLG-Pipeline', 'code', 'getClassGenderDBpedia.py'),
+    path_MATE = os.path.join(root_folder, 'FORGe', 'buddy-patched.jar'),
+    path_props_resources_template = os.path.join(root_folder, 'FORGe', 'mateColabDrive.properties'),
+    path_props_levels = os.path.join(root_folder, 'FORGe', 'mateLevels.properties'),
+  )
+
+def get_git_version(repository_folder):
+  """ Returns the commit checked out in a cloned repository (read from .git, without calling git), or None. """
+  path_head = os.path.join(repository_folder, '.git', 'HEAD')
+  if not os.path.isfile(path_head):
+    return None
+  head = codecs.open(path_head, 'r', 'utf-8').read().strip()
+  if not head.startswith('ref: '):
+    return head
+  ref = head[len('ref: '):]
+  path_ref = os.path.join(repository_folder, '.git', ref)
+  if os.path.isfile(path_ref):
+    return codecs.open(path_ref, 'r', 'utf-8').read().strip()
+  path_packed_refs = os.path.join(repository_folder, '.git', 'packed-refs')
+  if os.path.isfile(path_packed_refs):
+    for line in codecs.open(path_packed_refs, 'r', 'utf-8'):
+      if line.strip().endswith(' '+ref):
+        return line.split(' ')[0]
+  return None
+
+def get_resource_versions(tools):
+  """ Versions of the resources the generated texts depend on: the commits of the cloned repositories and the hashes of the tools and templates. """
+  resource_versions = {repository: get_git_version(os.path.join(tools.root_folder, repository)) for repository in RESOURCE_REPOSITORIES}
+  for path in [tools.props_list_path, tools.triple2Conll_jar, tools.path_MATE, tools.path_props_resources_template, tools.path_props_levels, path_props_once_only]:
+    resource_versions[os.path.basename(path)] = get_file_version(path)
+  for filename in sorted(os.listdir(tools.triple2predArg)) if os.path.isdir(tools.triple2predArg) else []:
+    if filename.endswith('.conll') or filename.endswith('.txt'):
+      resource_versions[filename] = get_file_version(os.path.join(tools.triple2predArg, filename))
+  return resource_versions
+
+def is_unchanged(job):
+  """ True if the entity's text exists and was generated from the same fingerprint as the one just computed. """
+  if not (os.path.exists(job.path_output) and os.path.exists(job.path_output_fingerprint)):
+    return False
+  return codecs.open(job.path_output_fingerprint, 'r', 'utf-8').read().strip() == codecs.open(job.path_fingerprint, 'r', 'utf-8').read().strip()
+
+def run_command(job, stage, command):
+  """ Runs an external step of the pipeline from the entity's folder, with its output saved in stage_logs/<stage>.log. """
+  with codecs.open(os.path.join(job.stage_logs, stage+'.log'), 'a', 'utf-8') as log:
+    subprocess.run([str(arg) for arg in command], cwd=job.folder, stdout=log, stderr=subprocess.STDOUT, check=True)
+
+def prepare_work_folder(job, tools):
+  """ Creates the entity's folder; the triples2predArg resources are copied, except the jar and the output folder. """
+  if not os.path.exists(job.triple2predArg):
+    shutil.copytree(tools.triple2predArg, job.triple2predArg, ignore=shutil.ignore_patterns('out', '*.jar', '*.png'))
+  for folder in [job.log_folder, job.FORGe_input_folder, job.temp_input_folder_morph, job.morph_input_folder, job.morph_output_folder, job.stage_logs, os.path.join(job.triple2predArg, 'out'), os.path.join(job.triple2predArg, 'classMembership')]:
+    os.makedirs(folder, exist_ok=True)
+  for structure_folder in STRUCTURE_FOLDERS:
+    os.makedirs(os.path.join(job.structures, structure_folder), exist_ok=True)
+
+def load_triples(job):
+  with open(job.path_triples, 'rb') as fh:
+    return pickle.load(fh)
+
+# Stages: each one reads what the previous ones wrote in the entity's folder, and clears its own outputs before running, so it can be re-run after a failure.
+def stage_properties(job, tools, settings):
+  list_triple_objects, list_propObj, list_obj = get_dbpedia_properties(tools.props_list_path, job.entity_name, settings.triple_source, settings.ignore_properties)
+  if len(list_triple_objects) == 0:
+    raise ValueError(f'No triples found for {job.entity_name}')
+  if settings.max_instances_per_property > 0:
+    properties_that_can_happen_once_only = json.loads(codecs.open(path_props_once_only, 'r', 'utf-8').read())
+    properties_selected_by_user = get_first_n_instances_of_props(list_triple_objects, settings.max_instances_per_property, properties_that_can_happen_once_only)
+  else:
+    # All retrieved properties are used, as when nothing is selected in the notebook's property selector
+    properties_selected_by_user = get_prop_index_from_table(list(range(len(list_triple_objects))), list_triple_objects)
+  with open(job.path_triples, 'wb') as fh:
+    pickle.dump((list_triple_objects, list_propObj, list_obj, properties_selected_by_user), fh)
+  fingerprint = get_generation_fingerprint(get_selected_triples_text(list_triple_objects, properties_selected_by_user), settings.language, job.category, settings.resource_versions)
+  with codecs.open(job.path_fingerprint, 'w', 'utf-8') as fo:
+    fo.write(fingerprint)
+
+def stage_xml(job, tools, settings):
+  list_triple_objects, list_propObj, list_obj, properties_selected_by_user = load_triples(job)
+  list_triples_text = create_xml(list_triple_objects, properties_selected_by_user, job.category, job.triple2predArg)
+  create_GPT_Prompt(job.entity_name, settings.language, list_triples_text, job.folder)
+
+def stage_class_gender(job, tools, settings):
+  list_triple_objects, list_propObj, list_obj, properties_selected_by_user = load_triples(job)
+  filepath_subj, filepath_obj = create_jsons_SubjAndObj(job.entity_name, list_obj, job.triple2predArg)
+  run_command(job, 'class_gender', [sys.executable, tools.path_getClassGenderDBp, filepath_subj, filepath_obj, job.folder])
+
+def stage_conll(job, tools, settings):
+  new_triple2predArg, name_conll_templates, path_t2p_out, language_t2p, newEntityName = prepare_variables_xml2CoNLL_conversion(job.str_PredArg_folder, settings.language, job.entity_name, job.triple2predArg)
+  run_command(job, 'conll', ['java', '-jar', tools.triple2Conll_jar, new_triple2predArg, name_conll_templates, '230528-WebNLG23_EN-GA_properties.txt', path_t2p_out, language_t2p, newEntityName])
+  shutil.copy(os.path.join(path_t2p_out, newEntityName+'_'+language_t2p+'.conll'), job.str_PredArg_folder)
+
+def stage_forge(job, tools, settings):
+  for structure_folder in STRUCTURE_FOLDERS[1:]:
+    clear_files(os.path.join(job.structures, structure_folder))
+  clear_files(job.log_folder)
+  clear_files(job.temp_input_folder_morph)
+  group_modules_prm = 'yes' if settings.group_modules else 'no'
+  run_command(job, 'forge', [sys.executable, tools.path_MFleNS, settings.language, settings.split, group_modules_prm] + FORGE_MODULES + [job.FORGe_input_folder, tools.path_MATE, tools.path_props_resources_template, tools.path_props_levels, job.path_props] + [os.path.join(job.structures, structure_folder) for structure_folder in STRUCTURE_FOLDERS] + [job.log_folder])
+  run_command(job, 'forge', [sys.executable, tools.path_checkOutputs, job.str_PredArg_folder, job.str_SMorphText_folder, job.log_folder, job.temp_input_folder_morph, settings.language])
+  if not settings.language == 'GA':
+    clear_folder(os.path.join(job.temp_input_folder_morph, settings.split))
+    run_command(job, 'forge', [sys.executable, tools.path_concatenate, job.str_SMorphText_folder, job.temp_input_folder_morph, settings.split])
+
+def stage_morph(job, tools, settings):
+  if not settings.language == 'GA':
+    return
+  # Only needed for Irish; the GA_inflect module comes with the DCU_TCD_FORGe_WebNLG23 repository
+  if tools.root_folder not in sys.path:
+    sys.path.insert(0, tools.root_folder)
+  from DCU_TCD_FORGe_WebNLG23.code.GA_inflect import run_GA_morphGen
+  clear_files(job.morph_input_folder)
+  clear_files(job.morph_output_folder)
+  run_command(job, 'morph', [sys.executable, tools.path_FORGe2Morph, settings.language, job.temp_input_folder_morph, job.morph_input_folder])
+  run_GA_morphGen(tools.root_folder, MORPH_FOLDER_NAME, job.morph_input_folder, job.morph_output_folder, count_expected_texts(job.folder), False)
+
+def get_prefinal_output_folder(job, settings):
+  if settings.language == 'GA':
+    return job.morph_output_folder
+  return os.path.join(job.temp_input_folder_morph, settings.split)
+
+def stage_postprocess(job, tools, settings):
+  prefinal_output_folder = get_prefinal_output_folder(job, settings)
+  run_command(job, 'postprocess', [sys.executable, tools.path_postProc, settings.language, prefinal_output_folder])
+  check_postProcessed_outputs(job.folder, prefinal_output_folder, count_expected_texts(job.folder))
+
+def stage_concatenate(job, tools, settings):
+  if os.path.exists(job.path_output_fingerprint):
+    os.remove(job.path_output_fingerprint)
+  concatenate_files_UI(job.folder, job.morph_output_folder, job.temp_input_folder_morph, settings.split, settings.language, count_expected_texts(job.folder), job.entity_name, settings.output_folder)
+  # Saved next to the text once it is complete
+  shutil.copy(job.path_fingerprint, job.path_output_fingerprint)
+
+STAGES = [
+  ('properties', stage_properties),
+  ('xml', stage_xml),
+  ('class_gender', stage_class_gender),
+  ('conll', stage_conll),
+  ('forge', stage_forge),
+  ('morph', stage_morph),
+  ('postprocess', stage_postprocess),
+  ('concatenate', stage_concatenate),
+]
+
+class Manifest:
+  """ Stages completed by each entity, with their duration in seconds (None for stages skipped because the fingerprint did not change):
+  {entity name: {'stages': {stage: seconds}, 'error': message}}. Saved after each stage, so that an interrupted batch can be restarted. """
+  def __init__(self, path_manifest):
+    self.path_manifest = path_manifest
+    self.lock = threading.Lock()
+    self.entities = {}
+    if os.path.exists(path_manifest):
+      self.entities = json.loads(codecs.open(path_manifest, 'r', 'utf-8').read())
+
+  def is_done(self, entity_name, stage):
+    with self.lock:
+      return stage in self.entities.get(entity_name, {}).get('stages', {})
+
+  def reset(self, entity_name):
+    """ Forgets the stages completed by an entity, so that they are all run again. """
+    with self.lock:
+      self.entities.pop(entity_name, None)
+      self.save()
+
+  def record(self, entity_name, stage = None, seconds = None, error = None):
+    with self.lock:
+      entry = self.entities.setdefault(entity_name, {'stages': {}, 'error': None})
+      if stage is not None:
+        entry['stages'][stage] = seconds
+      entry['error'] = error
+      self.save()
+
+  def save(self):
+    """ Called with the lock held. """
+    # Written to a temporary file first, so that an interruption cannot leave a truncated manifest
+    with codecs.open(self.path_manifest+'.tmp', 'w', 'utf-8') as fo:
+      json.dump(self.entities, fo, indent=1)
+    os.replace(self.path_manifest+'.tmp', self.path_manifest)
+
+def run_entity(job, tools, settings, manifest, stage_names):
+  """
+  Runs the stages of stage_names that the entity has not completed yet. If the properties are fetched and the fingerprint matches the one of the
+  existing text, the other stages are skipped. Returns ({stage: seconds} for the stages run, True if the stages were skipped).
+  """
+  if settings.refresh:
+    manifest.reset(job.entity_name)
+  prepare_work_folder(job, tools)
+  timings = {}
+  is_skipped = False
+  for stage, stage_function in STAGES:
+    if stage not in stage_names or manifest.is_done(job.entity_name, stage):
+      continue
+    if is_skipped:
+      manifest.record(job.entity_name, stage, None)
+      continue
+    start = time.perf_counter()
+    try:
+      stage_function(job, tools, settings)
+    except Exception as e:
+      manifest.record(job.entity_name, error = f'{stage}: {e}')
+      raise
+    timings[stage] = time.perf_counter() - start
+    manifest.record(job.entity_name, stage, round(timings[stage], 3))
+    if stage == 'properties':
+      is_skipped = is_unchanged(job)
+  return timings, is_skipped
+
+def read_entities(path_entities, default_category):
+  """ Returns a list of (name, category) from a file with one entity per line, optionally followed by a tab and a category. """
+  entities = {}
+  with codecs.open(path_entities, 'r', 'utf-8') as f:
+    for line in f:
+      if line.strip() == '' or line.startswith('#'):
+        continue
+      fields = line.rstrip('\n').split('\t')
+      # An entity listed twice would be processed twice in the same folder: only the first line is kept
+      entities.setdefault(fields[0].strip(), fields[1].strip() if len(fields) > 1 and fields[1].strip() else default_category)
+  return list(entities.items())
+
+def print_timings(all_timings):
+  """ Prints the number of entities, total, mean and maximum duration of each stage run in this batch. """
+  print(f'\n{"stage":<14} {"entities":>8} {"total s":>10} {"mean s":>10} {"max s":>10}')
+  for stage, stage_function in STAGES:
+    durations = [timings[stage] for timings in all_timings if stage in timings]
+    if durations:
+      print(f'{stage:<14} {len(durations):>8} {sum(durations):>10.2f} {sum(durations)/len(durations):>10.2f} {max(durations):>10.2f}')
+
+def run_batch(entities, tools, settings, work_folder, num_workers = 1, stage_names = None):
+  """ Runs the stages for all (name, category) entities, num_workers entities at a time; returns the names of the entities that failed. """
+  os.makedirs(work_folder, exist_ok=True)
+  manifest = Manifest(os.path.join(work_folder, 'manifest.json'))
+  stage_names = stage_names or [stage for stage, stage_function in STAGES]
+  all_timings = []
+  failed = []
+  unchanged = []
+  with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+    futures = {executor.submit(run_entity, EntityJob(name, category, work_folder, settings.output_folder, settings.language), tools, settings, manifest, stage_names): name for name, category in entities}
+    for future in concurrent.futures.as_completed(futures):
+      try:
+        timings, is_skipped = future.result()
+        all_timings.append(timings)
+        if is_skipped:
+          unchanged.append(futures[future])
+          print(f'Unchanged: {futures[future]}')
+        else:
+          print(f'Done: {futures[future]}')
+      except Exception as e:
+        failed.append(futures[future])
+        print(f'Failed: {futures[future]} ({e})')
+  print_timings(all_timings)
+  if unchanged:
+    print(f'\n{len(unchanged)} entities unchanged since their last generation (skipped).')
+  return failed
+
+def main():
+  parser = argparse.ArgumentParser(description='Generate Wikipedia pages for a list of entities, with checkpoints.')
+  parser.add_argument('--entities', required=True, help='file with one entity name per line, optionally followed by a tab and a category')
+  parser.add_argument('--category', default='Unknown', help='category of the entities that have none in the entities file')
+  parser.add_argument('--language', choices=['EN', 'ES', 'GA'], default='EN')
+  parser.add_argument('--triple-source', choices=['Ontology', 'Infobox', 'Wikidata'], default='Ontology')
+  parser.add_argument('--ignore-properties', default='width, title', help='comma-separated properties to discard')
+  parser.add_argument('--split', choices=['dev', 'test', 'train', 'ukn'], default='test')
+  parser.add_argument('--intermediate-representations', action='store_true', help='call each FORGe module separately to keep all intermediate representations')
+  parser.add_argument('--root-folder', default='.', help='folder in which the notebook\'s "Prepare repo" cell was run')
+  parser.add_argument('--work-folder', required=True, help='folder for the entity working folders and the manifest')
+  parser.add_argument('--output-folder', required=True, help='folder for the generated texts')
+  parser.add_argument('--workers', type=int, default=1, help='number of entities processed at the same time')
+  parser.add_argument('--max-instances-per-property', type=int, default=0, help='keep at most this number of triples with the same property (get_first_n_instances_of_props; 0: keep all)')
+  parser.add_argument('--refresh', action='store_true', help='fetch the properties of all entities again, including completed ones, and regenerate the texts whose fingerprint changed')
+  parser.add_argument('--stages', default=','.join([stage for stage, stage_function in STAGES]), help='comma-separated stages to run')
+  args = parser.parse_args()
+
+  settings = argparse.Namespace(language=args.language, triple_source=args.triple_source, ignore_properties=args.ignore_properties, split=args.split, group_modules=not args.intermediate_representations, output_folder=os.path.abspath(args.output_folder), max_instances_per_property=args.max_instances_per_property, refresh=args.refresh)
+  tools = get_tool_paths(os.path.abspath(args.root_folder))
+  settings.resource_versions = get_resource_versions(tools)
+  failed = run_batch(read_entities(args.entities, args.category), tools, settings, os.path.abspath(args.work_folder), args.workers, args.stages.split(','))
+  if failed:
+    print(f'\n{len(failed)} entities failed (see manifest.json and the stage_logs folders): {", ".join(failed)}')
+    sys.exit(1)
+
+if __name__ == "__main__":
+  main()
@@ -3,38 +3,216 @@
 
 # Query DBpedia for a given entity
 # From ChatGPT. Prompt: "Thanks! Now please write a sparql query that can be used in Python to get all the properties related to Olga Bondareva on DBpedia. For example, birthDate, birthPlace, etc."
-from SPARQLWrapper import SPARQLWrapper, JSON
 import os
 import re
 import codecs
 import sys
 import pickle
 import requests
+import urllib3
+import sqlite3
+import hashlib
+import json
+import time
+import asyncio
+import threading
+import itertools
+import concurrent.futures
+import urllib.parse
+import email.utils
+# NumPy is optional: without it, get_triples_seen always processes the results row by row
+try:
+  import numpy
+except ImportError:
+  numpy = None
+# aiohttp is optional: without it, the async functions send their requests with the sync transport, in worker threads
+try:
+  import aiohttp
+except ImportError:
+  aiohttp = None
+
+# Endpoints used by the query functions; they can be set with environment variables or configure_endpoints, e.g. to use a local stand-in server (see fixture_server.py).
+DBPEDIA_SPARQL_ENDPOINT = os.environ.get('DBPEDIA_SPARQL_ENDPOINT', 'https://dbpedia.org/sparql')
+WIKIDATA_SPARQL_ENDPOINT = os.environ.get('WIKIDATA_SPARQL_ENDPOINT', 'https://query.wikidata.org/sparql')
+WIKIDATA_API_ENDPOINT = os.environ.get('WIKIDATA_API_ENDPOINT', 'https://www.wikidata.org/w/api.php')
+
+def configure_endpoints(dbpedia_sparql = None, wikidata_sparql = None, wikidata_api = None):
+  """ Changes the URLs of the endpoints used by the query functions; the ones that are None are left unchanged. """
+  global DBPEDIA_SPARQL_ENDPOINT, WIKIDATA_SPARQL_ENDPOINT, WIKIDATA_API_ENDPOINT
+  if dbpedia_sparql is not None:
+    DBPEDIA_SPARQL_ENDPOINT = dbpedia_sparql
+  if wikidata_sparql is not None:
+    WIKIDATA_SPARQL_ENDPOINT = wikidata_sparql
+  if wikidata_api is not None:
+    WIKIDATA_API_ENDPOINT = wikidata_api
+
+# User-Agent sent with every request; the Wikimedia services ask for one that identifies the tool (https://meta.wikimedia.org/wiki/User-Agent_policy)
+HTTP_USER_AGENT = os.environ.get('HTTP_USER_AGENT', 'WikipediaPage_Generator/eSTÓR-DCU (https://github.com/mille-s/WikipediaPage_Generator)')
+# Upper bounds (in seconds) of the latency histogram buckets kept for each host; slower requests go in a last bucket
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+# Longer SPARQL queries are posted instead of being sent in the URL (see get_sparql_request)
+MAX_GET_QUERY_LENGTH = 2000
+
+def get_sparql_request(query_string):
+  """ Returns the HTTP method and the arguments of a SPARQL query request; long queries (e.g. with big VALUES blocks) are posted instead of being put in the URL. """
+  headers = {'Accept': 'application/sparql-results+json'}
+  if len(query_string) > MAX_GET_QUERY_LENGTH:
+    return 'POST', {'data': {'query': query_string, 'format': 'json'}, 'headers': headers}
+  return 'GET', {'params': {'query': query_string, 'format': 'json'}, 'headers': headers}
+
+class HostStatsRecorder:
+  """ Request counts, errors and latency histogram of each host, for the sync and async transports. """
+  def __init__(self):
+    self.host_stats = {}
+    self.lock = threading.Lock()
+
+  def record(self, host, elapsed, is_error):
+    with self.lock:
+      if host not in self.host_stats:
+        self.host_stats[host] = {'requests': 0, 'errors': 0, 'total_seconds': 0.0, 'latency_histogram': [0] * (len(LATENCY_BUCKETS) + 1)}
+      host_stats = self.host_stats[host]
+      host_stats['requests'] += 1
+      host_stats['errors'] += int(is_error)
+      host_stats['total_seconds'] += elapsed
+      bucket = 0
+      while bucket < len(LATENCY_BUCKETS) and elapsed > LATENCY_BUCKETS[bucket]:
+        bucket += 1
+      host_stats['latency_histogram'][bucket] += 1
+
+  def stats(self):
+    """ Returns {host: {requests, errors, total_seconds, latency_histogram}}, the histogram being a {bucket label: number of requests} dict. """
+    bucket_labels = [f'<={upper_bound}s' for upper_bound in LATENCY_BUCKETS] + [f'>{LATENCY_BUCKETS[-1]}s']
+    with self.lock:
+      return {host: dict(host_stats, latency_histogram=dict(zip(bucket_labels, host_stats['latency_histogram']))) for host, host_stats in self.host_stats.items()}
+
+  def print_stats(self):
+    for host, host_stats in self.stats().items():
+      mean_ms = host_stats['total_seconds'] / host_stats['requests'] * 1000
+      print(f"{host}: {host_stats['requests']} requests, {host_stats['errors']} errors, mean {mean_ms:.0f} ms")
+      print('  ' + ', '.join(f'{label}: {count}' for label, count in host_stats['latency_histogram'].items() if count > 0))
+
+class HTTPTransport(HostStatsRecorder):
+  """
+  HTTP session shared by all the DBpedia, Wikidata and Wikipedia calls, so that TCP/TLS connections are kept alive and reused.
+  urllib3 keeps one connection pool per host (up to pool_maxsize connections each, for the concurrent calls of get_dbpedia_properties_bulk); responses are
+  compressed with all the encodings urllib3 can decode. Requests counts, errors and a latency histogram are recorded for each host (see stats).
+  """
+  def __init__(self, user_agent = HTTP_USER_AGENT, connect_timeout = 10, read_timeout = 120, pool_maxsize = 16, max_hosts = 10):
+    super().__init__()
+    self.timeout = (connect_timeout, read_timeout)
+    self.session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=max_hosts, pool_maxsize=pool_maxsize)
+    self.session.mount('http://', adapter)
+    self.session.mount('https://', adapter)
+    self.session.headers.update({'User-Agent': user_agent, 'Accept-Encoding': urllib3.util.make_headers(accept_encoding=True)['accept-encoding']})
+
+  def request(self, method, url, **kwargs):
+    """ Sends a request through the shared session and returns the response; HTTP errors are raised as requests.HTTPError. """
+    kwargs.setdefault('timeout', self.timeout)
+    start = time.perf_counter()
+    is_error = True
+    try:
+      response = self.session.request(method, url, **kwargs)
+      is_error = response.status_code >= 400
+      response.raise_for_status()
+      return response
+    finally:
+      self.record(get_host(url), time.perf_counter() - start, is_error)
+
+  def get_json(self, url, params = None):
+    return self.request('GET', url, params=params).json()
+
+  def sparql_query(self, endpoint, query_string):
+    """ Sends a SPARQL query and returns the list of JSON bindings. """
+    method, request_arguments = get_sparql_request(query_string)
+    return self.request(method, endpoint, **request_arguments).json()["results"]["bindings"]
+
+  def close(self):
+    self.session.close()
+
+# Transport used by all query functions of this module and by the scripts in code/3.1/Scripts
+http_transport = HTTPTransport()
+
+def configure_http_transport(user_agent = HTTP_USER_AGENT, connect_timeout = 10, read_timeout = 120, pool_maxsize = 16):
+  """ Replaces the shared transport, e.g. to change the timeouts or to allow more concurrent connections per host. Returns the new HTTPTransport. """
+  global http_transport
+  http_transport.close()
+  http_transport = HTTPTransport(user_agent, connect_timeout, read_timeout, pool_maxsize)
+  return http_transport
+
+def get_http_transport():
+  return http_transport
 
 # print('There are '+str(len(list_properties))+' different property labels.')
 # print(sorted(list_properties))
 
 # The following mapping list was obtained from this post: https://stackoverflow.com/questions/39850833/how-i-can-know-the-equivalent-dbpedia-and-wikidata-properties.
-# I haven't checked all mappings yet.
-dico_map_dbp_wkd = {'P743': 'abbreviation', 'P1457': 'absoluteMagnitude', 'P106': 'activity', 'P969': 'address', 'P742': 'alias', 'P69': 'almaMater', 'P1562': 'amgid', 'P85': 'anthem', 'P1215': 'apparentMagnitude', 'P84': 'architect', 'P149': 'architecturalStyle', 'P473': 'areaCode', 'P2046': 'areaTotal', 'P175': 'artist', 'P1086': 'atomicNumber', 'P50': 'author', 'P166': 'award', 'P1432': 'bSide', 'P144': 'basedOn', 'P607': 'battle', 'P1015': 'bibsysId', 'P569': 'birthDate', 'P1477': 'birthName', 'P19': 'birthPlace', 'P569': 'birthYear', 'P268': 'bnfId', 'P2769': 'budget', 'P176': 'builder', 'P36': 'capital', 'P509': 'causeOfDeath', 'P169': 'ceo', 'P40': 'child', 'P1057': 'chromosome', 'P344': 'cinematography', 'P27': 'citizenship', 'P131': 'city', 'P77': 'classis', 'P94': 'coatOfArms', 'P1159': 'coden', 'P462': 'colour', 'P86': 'composer', 'P1247': 'compressionRatio', 'P400': 'computingPlatform', 'P59': 'constellation', 'P186': 'constructionMaterial', 'P30': 'continent', 'P247': 'cosparId', 'P17': 'country', 'P131': 'county', 'P736': 'coverArtist', 'P880': 'cpu', 'P170': 'creator', 'P1029': 'crewMember', 'P177': 'crosses', 'P38': 'currency', 'P498': 'currencyCode', 'P585': 'date', 'P1036': 'dcc', 'P509': 'deathCause', 'P570': 'deathDate', 'P20': 'deathPlace', 'P287': 'designer', 'P178': 'developer', 'P2386': 'diameter', 'P708': 'diocese', 'P57': 'director', 'P746': 'disappearanceDate', 'P101': 'discipline', 'P575': 'discovered', 'P61': 'discoverer', 'P557': 'diseasesDb', 'P750': 'distributor', 'P131': 'district', 'P184': 'doctoralAdvisor', 'P185': 'doctoralStudent', 'P591': 'ecNumber', 'P1040': 'editing', 'P98': 'editor', 'P69': 'education', 'P232': 'einecsNumber', 'P2044': 'elevation', 'P1087': 'elo', 'P158': 'emblem', 'P108': 'employer', 'P582': 'endDate', 'P2348': 'era', 'P172': 'ethnicity', 'P1340': 'eyeColor', 'P53': 'family', 'P22': 'father', 'P41': 'flag', 'P156': 'followedBy', 'P155': 'follows', 'P571': 'formationDate', 'P112': 'foundedBy', 'P112': 'founder', 'P571': 'foundingDate', 'P1211': 'fuelSystem', 'P2031': 'functionStartYear', 'P408': 'gameEngine', 'P505': 'generalManager', 'P136': 'genre', 'P74': 'genus', 'P1125': 'giniCoefficient', 'P2139': 'gross', 'P1884': 'hairColor', 'P552': 'handedness', 'P159': 'headquarter', 'P2048': 'height', 'P610': 'highestPoint', 'P16': 'highwaySystem', 'P504': 'homeport', 'P229': 'iataAirlineCode', 'P238': 'iataLocationIdentifier', 'P230': 'icaoAirlineCode', 'P239': 'icaoLocationIdentifier', 'P494': 'icd10', 'P493': 'icd9', 'P1142': 'ideology', 'P110': 'illustrator', 'P345': 'imdbId', 'P227': 'individualisedGnd', 'P452': 'industry', 'P200': 'inflow', 'P374': 'inseeCode', 'P2109': 'installedCapacity', 'P1303': 'instrument', 'P361': 'isPartOf', 'P212': 'isbn', 'P957': 'isbn', 'P791': 'isil', 'P213': 'isniId', 'P297': 'iso31661Code', 'P298': 'iso31661Code', 'P299': 'iso31661Code', 'P218': 'iso6391Code', 'P219': 'iso6392Code', 'P220': 'iso6393Code', 'P635': 'istat', 'P157': 'killedBy', 'P75': 'kingdom', 'P620': 'landingDate', 'P619': 'launchDate', 'P448': 'launchSite', 'P375': 'launchVehicle', 'P244': 'lccnId', 'P118': 'league', 'P2043': 'length', 'P275': 'license', 'P131': 'locatedInArea', 'P126': 'maintainedBy', 'P286': 'manager', 'P176': 'manufacturer', 'P463': 'member', 'P486': 'meshId', 'P7779': 'militaryBranch', 'P25': 'mother', 'P135': 'movement', 'P434': 'musicBrainzArtistId', 'P86': 'musicBy', 'P175': 'musicalArtist', 'P138': 'namedAfter', 'P27': 'nationality', 'P1395': 'nciId', 'P349': 'ndlId', 'P2295': 'netIncome', 'P1567': 'nisCode', 'P409': 'nlaId', 'P800': 'notableWork', 'P649': 'nrhpReferenceNumber', 'P1128': 'numberOfEmployees', 'P2196': 'numberOfStudents', 'P605': 'nutsCode', 'P106': 'occupation', 'P771': 'ofsCode', 'P721': 'okatoCode', 'P3362': 'operatingIncome', 'P496': 'orcidId', 'P70': 'order', 'P91': 'orientation', 'P364': 'originalLanguage', 'P127': 'owner', 'P1830': 'owningOrganisation', 'P102': 'party', 'P638': 'pdb', 'P1448': 'personName', 'P119': 'placeOfBurial', 'P1082': 'populationTotal', 'P413': 'position', 'P281': 'postalCode', 'P6': 'primeMinister', 'P443': 'pronunciation', 'P131': 'province', 'P742': 'pseudonym', 'P264': 'recordLabel', 'P577': 'releaseDate', 'P140': 'religion', 'P551': 'residence', 'P2139': 'revenue', 'P650': 'rkdArtistsId', 'P2047': 'runtime', 'P906': 'selibrId', 'P131': 'settlement', 'P21': 'sex', 'P3373': 'sibling', 'P109': 'signature', 'P26': 'spouse', 'P161': 'starring', 'P580': 'startDate', 'P269': 'sudocId', 'P5973': 'synonym', 'P6': 'taoiseach', 'P54': 'team', 'P1653': 'terytCode', 'P245': 'ulanId', 'P1937': 'unloCode', 'P214': 'viafId', 'P990': 'voice', 'P2067': 'weight', 'P3039': 'wheelbase', 'P2049': 'width', 'P2257': 'year', 'P281': 'zipCode'}
+# I haven't checked all mappings yet. Several DBpedia properties can correspond to one Wikidata property (e.g. P131: settlement, province, city, etc.).
+# Wikidata property (PID) -> DBpedia properties it can be mapped to, in order of preference (see get_mapped_property); loaded once, at import.
+path_map_wkd_dbp = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'resources', 'dico_map_wkd_dbp_props.json')
+
+def load_property_mapping(mapping_path):
+  """ Returns the {PID: tuple of DBpedia properties} mapping stored in mapping_path, and the reverse index {DBpedia property: tuple of PIDs}. """
+  dico_map = {pid: tuple(dbpedia_props) for pid, dbpedia_props in json.loads(codecs.open(mapping_path, 'r', 'utf-8').read()).items()}
+  dico_reverse_map = {}
+  for pid, dbpedia_props in dico_map.items():
+    for dbpedia_prop in dbpedia_props:
+      dico_reverse_map[dbpedia_prop] = dico_reverse_map.get(dbpedia_prop, ()) + (pid,)
+  return dico_map, dico_reverse_map
+
+dico_map_dbp_wkd, dico_map_wkd_from_dbp = load_property_mapping(path_map_wkd_dbp)
+
+def get_mapped_property(pid, list_properties, ignore_properties_list, dico_map_dbp_wkd = dico_map_dbp_wkd):
+  """ Returns the first DBpedia property mapped to pid that is in list_properties and not ignored; otherwise the first one (unmapped PIDs are returned as they are). """
+  candidates = dico_map_dbp_wkd.get(pid, (pid,))
+  for candidate in candidates:
+    if candidate in list_properties and not candidate in ignore_properties_list:
+      return candidate
+  return candidates[0]
+
+def intern_string(value):
+  """ Property and entity names are repeated across many triples: interned, all the copies share one string object. """
+  return sys.intern(value) if type(value) is str else value
 
 class Triple:
+  # No per-instance __dict__, to keep millions of triples in memory
+  __slots__ = ('DBprop', 'DBsubj', 'DBobj')
+
   def __init__(self, prop, subj_value, obj_value):
-    self.DBprop = prop
-    self.DBsubj = subj_value
-    self.DBobj = obj_value
+    self.DBprop = intern_string(prop)
+    self.DBsubj = intern_string(subj_value)
+    self.DBobj = intern_string(obj_value)
+
+  def __setstate__(self, state):
+    # Triples pickled before __slots__ was added have a plain dict as state
+    if isinstance(state, tuple):
+      state = state[1]
+    for name, value in state.items():
+      setattr(self, name, value)
 
 class CheckedTriple(Triple):
-  def __init__(self, prop, subj_value, obj_value, expected_ranges, actual_ranges=[], expected_domain=[], actual_domain=[]):
+  __slots__ = ('expected_ranges', 'actual_ranges', 'expected_domain', 'actual_domain')
+
+  def __init__(self, prop, subj_value, obj_value, expected_ranges, actual_ranges = None, expected_domain = None, actual_domain = None):
     super().__init__(prop, subj_value, obj_value)
     self.expected_ranges = expected_ranges
-    self.actual_ranges = actual_ranges
-    self.expected_domain = expected_domain
-    self.actual_domain = actual_domain
+    # Each triple gets its own lists (shared default lists would be modified for all triples at once)
+    self.actual_ranges = actual_ranges if actual_ranges is not None else []
+    self.expected_domain = expected_domain if expected_domain is not None else []
+    self.actual_domain = actual_domain if actual_domain is not None else []
 
-def get_triples_seen(results, subj_name, triple_source, list_properties, ignore_properties_list, dico_map_dbp_wkd = dico_map_dbp_wkd, entity_is_sbjORobj = 'Subj', triple_validation = False):
-  # Process and print the results
-  list_triple_objects = []
+def get_triples_namespace(triple_source):
+  if triple_source == 'Ontology':
+    return 'http://dbpedia.org/ontology/'
+  elif triple_source == 'Infobox':
+    return 'http://dbpedia.org/property/'
+  elif triple_source == 'Wikidata':
+    return 'http://www.wikidata.org/prop/direct/'
+  return ''
+
+def select_rows(results, subj_name, triple_source, list_properties, ignore_properties_list, dico_map_dbp_wkd = dico_map_dbp_wkd, entity_is_sbjORobj = 'Subj'):
+  """ Returns the [property, subject, object] lists of the result rows that are kept by get_triples_seen, processing the rows one by one. """
+  selected_rows = []
   for result in results:
     # property_uri is something like this: http://dbpedia.org/property/deathPlace
     property_uri = result["property"]["value"]
@@ -47,19 +225,13 @@ def get_triples_seen(results, subj_name, triple_source, list_properties, ignore_
     # print(f'TEST prop/value: {property_uri} {value}')
     # Get the strings for property and object
     if len(value) > 0:
-      url_triples = ''
-      if triple_source == 'Ontology':
-        url_triples = 'http://dbpedia.org/ontology/'
-      elif triple_source == 'Infobox':
-        url_triples = 'http://dbpedia.org/property/'
-      elif triple_source == 'Wikidata':
-        url_triples = 'http://www.wikidata.org/prop/direct/'
-      # Look for uris that contain the target url
-      if re.search(url_triples, property_uri):
+      url_triples = get_triples_namespace(triple_source)
+      # Look for uris in the target namespace
+      if property_uri.startswith(url_triples):
         # Get the property name, which is at the end of the uri, after the last forward slash
         prop_name = property_uri.rsplit('/', 1)[1]
         obj_name = value
-        if re.search('http://', value):
+        if 'http://' in value:
           obj_name = value.rsplit('/', 1)[1]
         obj_name_final = ''
         subj_name_final = ''
@@ -71,59 +243,565 @@ def get_triples_seen(results, subj_name, triple_source, list_properties, ignore_
           obj_name_final = subj_name
         # If we use Wikidata as source, we need to map the Wikidata property label to the DBpedia one
         if triple_source == 'Wikidata':
-          if prop_name in dico_map_dbp_wkd:
-            prop_name = dico_map_dbp_wkd[prop_name]
+          prop_name = get_mapped_property(prop_name, list_properties, ignore_properties_list, dico_map_dbp_wkd)
         # print(f'TEST prop_name: {prop_name}')
         if prop_name in list_properties and not prop_name in ignore_properties_list:
           # print(f"{prop_name}: {obj_name}")
-          if triple_validation == False:
-            triple_object = Triple(prop_name, subj_name_final, obj_name_final)
-            list_triple_objects.append(triple_object)
-          else:
-            expected_ranges = get_dbo_property_ranges(prop_name)
-            actual_ranges = get_resource_types(obj_name_final)
-            triple_object = CheckedTriple(prop_name, subj_name_final, obj_name_final, expected_ranges, actual_ranges)
-            list_triple_objects.append(triple_object)
+          selected_rows.append([prop_name, subj_name_final, obj_name_final])
+  return selected_rows
+
+def get_last_parts(strings, separator):
+  """ Vectorised equivalent of string.rsplit(separator, 1)[-1] on a NumPy string array. """
+  if strings.dtype.kind == 'U':
+    return numpy.char.rpartition(strings, separator)[..., 2]
+  # numpy.strings.rpartition needs a separator with the same dtype as the strings
+  return numpy.strings.rpartition(strings, numpy.array(separator, dtype=strings.dtype))[2]
+
+def select_rows_columnar(results, subj_name, triple_source, list_properties, ignore_properties_list, dico_map_dbp_wkd = dico_map_dbp_wkd, entity_is_sbjORobj = 'Subj'):
+  """
+  Same output as select_rows, computed on NumPy arrays: the property column is encoded as ids of its distinct URIs (a few hundred at most), on which
+  the namespace, property name, Wikidata mapping and list checks are done once; the values of the rows whose property is kept are then processed
+  as a string array.
+  """
+  if not (triple_source == 'Ontology' or triple_source == 'Infobox' or triple_source == 'Wikidata') or len(results) == 0:
+    return []
+  value_key = 'valueLabel' if triple_source == 'Wikidata' else 'value'
+  url_triples = get_triples_namespace(triple_source)
+  # Distinct property URI -> id, in order of first occurrence
+  distinct_property_uris = {}
+  property_uri_ids = numpy.fromiter((distinct_property_uris.setdefault(result["property"]["value"], len(distinct_property_uris)) for result in results), dtype=numpy.intp, count=len(results))
+  distinct_prop_names = []
+  distinct_keep = []
+  for property_uri in distinct_property_uris:
+    prop_name = property_uri.rsplit('/', 1)[1] if property_uri.startswith(url_triples) else None
+    if prop_name is not None and triple_source == 'Wikidata':
+      prop_name = get_mapped_property(prop_name, list_properties, ignore_properties_list, dico_map_dbp_wkd)
+    distinct_prop_names.append(prop_name)
+    distinct_keep.append(prop_name is not None and prop_name in list_properties and not prop_name in ignore_properties_list)
+  row_ids = numpy.flatnonzero(numpy.array(distinct_keep, dtype=bool)[property_uri_ids])
+  if row_ids.size == 0:
+    return []
+  # StringDType (NumPy 2) keeps strings as they are; the fixed-width str dtype drops trailing null characters
+  string_dtype = numpy.dtypes.StringDType() if hasattr(numpy.dtypes, 'StringDType') else str
+  values = numpy.array([results[row_id][value_key]["value"] for row_id in row_ids.tolist()], dtype=string_dtype)
+  non_empty = numpy.char.str_len(values) > 0
+  row_ids = row_ids[non_empty]
+  values = values[non_empty]
+  obj_names = numpy.where(numpy.char.find(values, 'http://') >= 0, get_last_parts(values, '/'), values).tolist()
+  prop_names = [distinct_prop_names[property_uri_id] for property_uri_id in property_uri_ids[row_ids].tolist()]
+  if entity_is_sbjORobj == 'Subj':
+    return [[prop_name, subj_name, obj_name] for prop_name, obj_name in zip(prop_names, obj_names)]
+  elif entity_is_sbjORobj == 'Obj':
+    return [[prop_name, obj_name, subj_name] for prop_name, obj_name in zip(prop_names, obj_names)]
+  return [[prop_name, '', ''] for prop_name in prop_names]
+
+# Number of result rows from which get_triples_seen uses select_rows_columnar by default (if NumPy is installed)
+COLUMNAR_MIN_ROWS = 5000
+
+def select_triple_rows(results, subj_name, triple_source, list_properties, ignore_properties_list, dico_map_dbp_wkd = dico_map_dbp_wkd, entity_is_sbjORobj = 'Subj', columnar = None):
+  if columnar is None:
+    columnar = numpy is not None and len(results) >= COLUMNAR_MIN_ROWS
+  if columnar:
+    return select_rows_columnar(results, subj_name, triple_source, list_properties, ignore_properties_list, dico_map_dbp_wkd, entity_is_sbjORobj)
+  return select_rows(results, subj_name, triple_source, list_properties, ignore_properties_list, dico_map_dbp_wkd, entity_is_sbjORobj)
+
+def get_triples_seen(results, subj_name, triple_source, list_properties, ignore_properties_list, dico_map_dbp_wkd = dico_map_dbp_wkd, entity_is_sbjORobj = 'Subj', triple_validation = False, batched_validation = True, validation_chunk_size = 50, columnar = None):
+  """
+  With triple_validation, batched_validation collects the distinct properties and objects of the selected triples and gets their ranges and types with a few VALUES queries (validation_chunk_size items per query) instead of 2 queries per triple.
+  columnar selects the rows with select_rows_columnar (True) or select_rows (False); by default, the columnar version is used for COLUMNAR_MIN_ROWS rows or more if NumPy is installed.
+  """
+  selected_rows = select_triple_rows(results, subj_name, triple_source, list_properties, ignore_properties_list, dico_map_dbp_wkd, entity_is_sbjORobj, columnar)
+  # Process and print the results
+  list_triple_objects = []
+  if triple_validation == False:
+    for prop_name, subj_name_final, obj_name_final in selected_rows:
+      list_triple_objects.append(Triple(prop_name, subj_name_final, obj_name_final))
+  elif batched_validation == True and len(selected_rows) > 0:
+    dico_prop_ranges = get_dbo_property_ranges_batch([triple[0] for triple in selected_rows], validation_chunk_size)
+    dico_resource_types = get_resource_types_batch([triple[2] for triple in selected_rows], validation_chunk_size)
+    for prop_name, subj_name_final, obj_name_final in selected_rows:
+      triple_object = CheckedTriple(prop_name, subj_name_final, obj_name_final, dico_prop_ranges[prop_name], dico_resource_types[obj_name_final])
+      list_triple_objects.append(triple_object)
+  elif batched_validation == False:
+    for prop_name, subj_name_final, obj_name_final in selected_rows:
+      expected_ranges = get_dbo_property_ranges(prop_name)
+      actual_ranges = get_resource_types(obj_name_final)
+      triple_object = CheckedTriple(prop_name, subj_name_final, obj_name_final, expected_ranges, actual_ranges)
+      list_triple_objects.append(triple_object)
   return list_triple_objects
 
-def get_resource_types(resource_name):
+# Time-to-live (in seconds) of cached results for each kind of query; the ontology changes much less often than the triples of an entity.
+DEFAULT_CACHE_TTLS = {'properties': 7*24*3600, 'wikidata_properties': 7*24*3600, 'wikidata_id': 30*24*3600, 'resource_types': 30*24*3600, 'property_ranges': 90*24*3600, 'generic': 7*24*3600}
+
+class SPARQLCache:
   """
-  Returns all rdf:type values under dbo: namespace for a resource.
+  Persistent on-disk cache of query results, stored in an SQLite file.
+  Results are keyed on a hash of the endpoint and the normalised query text (whitespace is collapsed), expire after the TTL of their query kind, and the least recently used entries are evicted when there are more than max_entries (checked every evict_interval new entries).
+  Access times are written by batches: call flush before closing a long run so that the last ones are kept.
+  hits and misses count the lookups served from the cache and the ones that had to go to the endpoint.
+  """
+  def __init__(self, db_path, ttls = None, max_entries = 200000, evict_interval = 1000, access_flush_size = 100):
+    self.db_path = db_path
+    self.ttls = dict(DEFAULT_CACHE_TTLS)
+    if ttls is not None:
+      self.ttls.update(ttls)
+    self.max_entries = max_entries
+    # Eviction runs at most once every evict_interval new entries, so the cache can hold up to max_entries + evict_interval entries in between
+    self.evict_interval = evict_interval
+    # Access times of cache hits are written by batches of access_flush_size, instead of one write (and commit) per hit
+    self.access_flush_size = access_flush_size
+    self.pending_accesses = {}
+    self.hits = 0
+    self.misses = 0
+    self.lock = threading.Lock()
+    folder = os.path.dirname(db_path)
+    if folder and not os.path.exists(folder):
+      os.makedirs(folder)
+    self.connection = sqlite3.connect(db_path, check_same_thread=False)
+    # With a write-ahead log, commits only append to the log and are not synced to disk one by one; readers are not blocked by writes
+    self.connection.execute('PRAGMA journal_mode=WAL')
+    self.connection.execute('PRAGMA synchronous=NORMAL')
+    self.connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, kind TEXT, expires REAL, last_access REAL, value TEXT)')
+    self.connection.execute('CREATE INDEX IF NOT EXISTS idx_last_access ON results (last_access)')
+    self.connection.commit()
+    # Running count of the entries (an upper bound, since set can replace an entry), so that set does not have to count them
+    self.num_entries = self.connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+  @staticmethod
+  def make_key(endpoint, query_string):
+    normalised_query = ' '.join(query_string.split())
+    return hashlib.sha256(f'{endpoint}\n{normalised_query}'.encode('utf-8')).hexdigest()
+
+  def get(self, endpoint, query_string):
+    """ Returns the cached result, or None if there is no valid entry for the query. """
+    key = self.make_key(endpoint, query_string)
+    now = time.time()
+    with self.lock:
+      row = self.connection.execute('SELECT expires, value FROM results WHERE key = ?', (key,)).fetchone()
+      if row is None or row[0] < now:
+        self.misses += 1
+        return None
+      self.pending_accesses[key] = now
+      if len(self.pending_accesses) >= self.access_flush_size:
+        self.write_accesses()
+        self.connection.commit()
+      self.hits += 1
+    return json.loads(row[1])
+
+  def set(self, endpoint, query_string, value, query_kind = 'generic'):
+    key = self.make_key(endpoint, query_string)
+    now = time.time()
+    expires = now + self.ttls.get(query_kind, self.ttls['generic'])
+    with self.lock:
+      self.connection.execute('INSERT OR REPLACE INTO results (key, kind, expires, last_access, value) VALUES (?, ?, ?, ?, ?)', (key, query_kind, expires, now, json.dumps(value)))
+      self.pending_accesses.pop(key, None)
+      self.num_entries += 1
+      if self.num_entries > self.max_entries + self.evict_interval:
+        self.evict(now)
+      self.connection.commit()
+
+  def write_accesses(self):
+    """ Writes the access times of the hits since the last write (the caller holds the lock and commits). """
+    if self.pending_accesses:
+      self.connection.executemany('UPDATE results SET last_access = ? WHERE key = ?', [(access, key) for key, access in self.pending_accesses.items()])
+      self.pending_accesses = {}
+
+  def flush(self):
+    """ Writes the pending access times; the least recently used entries are only known once they are written. """
+    with self.lock:
+      self.write_accesses()
+      self.connection.commit()
+
+  def evict(self, now):
+    """ Removes expired entries, then the least recently used ones until the cache holds max_entries. """
+    self.write_accesses()
+    self.connection.execute('DELETE FROM results WHERE expires < ?', (now,))
+    num_entries = self.connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+    if num_entries > self.max_entries:
+      self.connection.execute('DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_access ASC LIMIT ?)', (num_entries - self.max_entries,))
+      num_entries = self.max_entries
+    self.num_entries = num_entries
+
+  def clear(self):
+    with self.lock:
+      self.connection.execute('DELETE FROM results')
+      self.connection.commit()
+      self.pending_accesses = {}
+      self.num_entries = 0
+
+  def stats(self):
+    with self.lock:
+      self.write_accesses()
+      self.connection.commit()
+      num_entries = self.connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+    return {'hits': self.hits, 'misses': self.misses, 'entries': num_entries}
+
+# Cache used by all query functions; None means that every query goes to the endpoint.
+sparql_cache = None
+
+def configure_sparql_cache(db_path, ttls = None, max_entries = 200000, evict_interval = 1000):
+  """ Makes all query functions of this module go through a persistent cache stored in db_path. Returns the SPARQLCache object. """
+  global sparql_cache
+  if sparql_cache is not None:
+    sparql_cache.flush()
+  sparql_cache = SPARQLCache(db_path, ttls=ttls, max_entries=max_entries, evict_interval=evict_interval)
+  return sparql_cache
+
+def disable_sparql_cache():
+  global sparql_cache
+  if sparql_cache is not None:
+    sparql_cache.flush()
+  sparql_cache = None
+
+def run_sparql_query(endpoint, query_string, query_kind = 'generic'):
+  """
+  Sends a SPARQL query to an endpoint, or gets its result from sparql_cache if it was already run.
+  Returns the list of JSON bindings.
   """
-  query = f"""
+  if sparql_cache is not None:
+    cached_results = sparql_cache.get(endpoint, query_string)
+    if cached_results is not None:
+      return cached_results
+  results = http_transport.sparql_query(endpoint, query_string)
+  if sparql_cache is not None:
+    sparql_cache.set(endpoint, query_string, results, query_kind)
+  return results
+
+# N-Triples line: subject, property and object (URI, blank node or literal with optional language tag or datatype)
+NT_LINE = re.compile(r'^\s*(<[^>]*>|_:\S+)\s+<([^>]*)>\s+(<[^>]*>|_:\S+|"(?:[^"\\]|\\.)*"(?:@[A-Za-z0-9-]+|\^\^<[^>]*>)?)\s*\.\s*$')
+NT_LITERAL = re.compile(r'^"((?:[^"\\]|\\.)*)"(?:@([A-Za-z0-9-]+)|\^\^<([^>]*)>)?$')
+NT_ESCAPE = re.compile(r'\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)')
+NT_ESCAPED_CHARS = {'t': '\t', 'b': '\b', 'n': '\n', 'r': '\r', 'f': '\f', '"': '"', "'": "'", '\\': '\\'}
+
+def unescape_nt_string(text):
+  def replace_escape(match):
+    escape = match.group(1)
+    if escape[0] in 'uU' and len(escape) > 1:
+      return chr(int(escape[1:], 16))
+    return NT_ESCAPED_CHARS.get(escape, escape)
+  return NT_ESCAPE.sub(replace_escape, text)
+
+def parse_nt_term(term):
+  """ Returns the value of an N-Triples term (without brackets or quotes), its type (uri, bnode or literal) and its language tag. """
+  if term.startswith('<'):
+    return term[1:-1], 'uri', ''
+  if term.startswith('_:'):
+    return term, 'bnode', ''
+  match = NT_LITERAL.match(term)
+  return unescape_nt_string(match.group(1)), 'literal', match.group(2) or ''
+
+class LocalTripleStore:
+  """
+  Triple store built from DBpedia or Wikidata dumps, kept in an SQLite file indexed by subject and by object.
+  Once a dump is loaded (load_dump), it answers the same lookups as the live endpoints (see configure_triple_backend), with results in the same JSON binding format, so that triples can be retrieved with no network access.
+  """
+  label_property = 'http://www.w3.org/2000/01/rdf-schema#label'
+  type_property = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#type'
+  range_property = 'http://www.w3.org/2000/01/rdf-schema#range'
+
+  def __init__(self, db_path):
+    self.db_path = db_path
+    self.lock = threading.Lock()
+    self.connection = sqlite3.connect(db_path, check_same_thread=False)
+    columns = [row[1] for row in self.connection.execute('PRAGMA table_info(triples)')]
+    if len(columns) > 0 and 'dump' not in columns:
+      # Stores created before triples recorded their dump: the rows cannot be traced back to a dump, so everything is loaded again
+      self.connection.execute('DROP TABLE triples')
+      self.connection.execute('DROP TABLE IF EXISTS dumps')
+    # dump is the path of the file each triple comes from, so that the triples of a dump can be replaced when the file changes
+    self.connection.execute('CREATE TABLE IF NOT EXISTS triples (subj TEXT, prop TEXT, obj TEXT, obj_type TEXT, lang TEXT, dump TEXT)')
+    self.connection.execute('CREATE TABLE IF NOT EXISTS dumps (path TEXT PRIMARY KEY, mtime REAL, num_triples INTEGER)')
+    self.connection.commit()
+
+  def load_dump(self, dump_path, batch_size = 100000):
+    """
+    Loads an N-Triples dump (.nt, or line-based .ttl as distributed by DBpedia; can be .gz or .bz2 compressed) into the store; a dump that was already loaded and has not changed since is skipped.
+    Returns the number of triples loaded.
+    """
+    dump_key = os.path.abspath(dump_path)
+    mtime = os.path.getmtime(dump_path)
+    row = self.connection.execute('SELECT mtime, num_triples FROM dumps WHERE path = ?', (dump_key,)).fetchone()
+    if row is not None and row[0] == mtime:
+      return row[1]
+    if dump_path.endswith('.gz'):
+      import gzip
+      fd = gzip.open(dump_path, 'rt', encoding='utf-8')
+    elif dump_path.endswith('.bz2'):
+      import bz2
+      fd = bz2.open(dump_path, 'rt', encoding='utf-8')
+    else:
+      fd = codecs.open(dump_path, 'r', 'utf-8')
+    num_triples = 0
+    num_skipped_lines = 0
+    rows = []
+    with self.lock:
+      # The whole load is one transaction: if it fails half-way, the store is left as it was before (old triples and indexes included)
+      self.connection.execute('BEGIN')
+      try:
+        # Triples from a previous version of the same dump are replaced
+        self.connection.execute('DELETE FROM triples WHERE dump = ?', (dump_key,))
+        # Indexes are (re)built after the load, which is much faster than updating them for each row
+        self.connection.execute('DROP INDEX IF EXISTS idx_subj')
+        self.connection.execute('DROP INDEX IF EXISTS idx_obj')
+        for line in fd:
+          if line.strip() == '' or line.startswith('#'):
+            continue
+          match = NT_LINE.match(line)
+          if match is None:
+            num_skipped_lines += 1
+            continue
+          subj = parse_nt_term(match.group(1))[0]
+          obj, obj_type, lang = parse_nt_term(match.group(3))
+          rows.append((subj, match.group(2), obj, obj_type, lang, dump_key))
+          if len(rows) >= batch_size:
+            self.connection.executemany('INSERT INTO triples VALUES (?, ?, ?, ?, ?, ?)', rows)
+            num_triples += len(rows)
+            rows = []
+        self.connection.executemany('INSERT INTO triples VALUES (?, ?, ?, ?, ?, ?)', rows)
+        num_triples += len(rows)
+        self.connection.execute('CREATE INDEX idx_subj ON triples (subj, prop)')
+        self.connection.execute('CREATE INDEX idx_obj ON triples (obj, prop)')
+        self.connection.execute('INSERT OR REPLACE INTO dumps VALUES (?, ?, ?)', (dump_key, mtime, num_triples))
+        self.connection.commit()
+      except BaseException:
+        self.connection.rollback()
+        raise
+      finally:
+        fd.close()
+    if num_skipped_lines > 0:
+      print(f'  {num_skipped_lines} lines of {dump_path} could not be read as N-Triples and were skipped.')
+    return num_triples
+
+  def select(self, sql, parameters):
+    with self.lock:
+      return self.connection.execute(sql, parameters).fetchall()
+
+  def get_label(self, value, value_type):
+    """ Mimics Wikidata's label service: English label of an entity, or its ID if there is no label; literals are returned as they are. """
+    if value_type != 'uri':
+      return value
+    rows = self.select('SELECT obj FROM triples WHERE subj = ? AND prop = ? AND lang = ?', (value, self.label_property, 'en'))
+    if len(rows) > 0:
+      return rows[0][0]
+    return value.rsplit('/', 1)[-1]
+
+  def get_properties_of_entity(self, uri, look_for_entity_as_sbjORobj):
+    if look_for_entity_as_sbjORobj == 'Subj':
+      rows = self.select('SELECT prop, obj FROM triples WHERE subj = ?', (uri,))
+      return [{"property": {"value": prop}, "value": {"value": value}} for prop, value in rows]
+    elif look_for_entity_as_sbjORobj == 'Obj':
+      rows = self.select('SELECT subj, prop FROM triples WHERE obj = ? AND obj_type = ?', (uri, 'uri'))
+      return [{"value": {"value": value}, "property": {"value": prop}} for value, prop in rows]
+
+  def get_wikidata_properties_of_entity(self, wikidata_id, look_for_entity_as_sbjORobj):
+    uri = f'http://www.wikidata.org/entity/{wikidata_id}'
+    if look_for_entity_as_sbjORobj == 'Subj':
+      rows = self.select('SELECT prop, obj, obj_type FROM triples WHERE subj = ?', (uri,))
+      return [{"property": {"value": prop}, "valueLabel": {"value": self.get_label(value, value_type)}} for prop, value, value_type in rows]
+    elif look_for_entity_as_sbjORobj == 'Obj':
+      rows = self.select('SELECT subj, prop FROM triples WHERE obj = ? AND obj_type = ?', (uri, 'uri'))
+      return [{"valueLabel": {"value": self.get_label(value, 'uri')}, "property": {"value": prop}} for value, prop in rows]
+
+  def get_wikidata_id(self, entity_label):
+    for label in [entity_label, entity_label.replace('_', ' ')]:
+      rows = self.select('SELECT subj FROM triples WHERE obj = ? AND prop = ? AND subj LIKE ?', (label, self.label_property, 'http://www.wikidata.org/entity/%'))
+      if len(rows) > 0:
+        return rows[0][0].rsplit('/', 1)[1]
+    return None
+
+  def get_resource_types(self, resource_name):
+    rows = self.select('SELECT DISTINCT obj FROM triples WHERE subj = ? AND prop = ?', (f'http://dbpedia.org/resource/{resource_name}', self.type_property))
+    return [row[0] for row in rows if row[0].startswith('http://dbpedia.org/ontology/')]
+
+  def get_dbo_property_ranges(self, prop):
+    rows = self.select('SELECT DISTINCT obj FROM triples WHERE subj = ? AND prop = ?', (f'http://dbpedia.org/ontology/{prop}', self.range_property))
+    return [row[0] for row in rows]
+
+# Backend used to retrieve triples: None means the live DBpedia and Wikidata endpoints, otherwise a LocalTripleStore.
+triple_backend = None
+
+def configure_triple_backend(backend = 'remote', db_path = None, dump_paths = None):
+  """
+  Selects where get_properties_of_entity, get_wikidata_properties_of_entity, get_wikidata_id, get_resource_types and get_dbo_property_ranges get their results.
+  backend: 'remote' for the live endpoints, 'local' for a LocalTripleStore stored in db_path, into which the files in dump_paths are loaded (only once).
+  Returns the backend object (None for 'remote').
+  """
+  global triple_backend
+  if backend == 'remote':
+    triple_backend = None
+  elif backend == 'local':
+    triple_backend = LocalTripleStore(db_path)
+    for dump_path in dump_paths or []:
+      triple_backend.load_dump(dump_path)
+  else:
+    raise ValueError(f"Unknown triple backend {backend}, expected 'remote' or 'local'.")
+  return triple_backend
+
+# The query texts and result parsing below are shared by the sync functions and their async versions (see the end of the file)
+def make_resource_types_query(resource_name):
+  return f"""
   PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
   SELECT DISTINCT ?type WHERE {{
       <http://dbpedia.org/resource/{resource_name}> rdf:type ?type .
       FILTER(STRSTARTS(STR(?type), "http://dbpedia.org/ontology/"))
   }}
   """
-  return [r["type"]["value"] for r in sql_query(query)]
 
-def get_dbo_property_ranges(prop):
-  """Fetches rdfs:range for dbo:property."""
-  query = f"""
+def make_property_ranges_query(prop):
+  return f"""
   PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
   PREFIX dbo: <http://dbpedia.org/ontology/>
   SELECT DISTINCT ?range WHERE {{ dbo:{prop} rdfs:range ?range . }}
   """
-  return [r["range"]["value"] for r in sql_query(query)]
 
-def sql_query(query_string):
+def get_resource_types(resource_name):
+  """
+  Returns all rdf:type values under dbo: namespace for a resource.
+  """
+  if triple_backend is not None:
+    return triple_backend.get_resource_types(resource_name)
+  return [r["type"]["value"] for r in sql_query(make_resource_types_query(resource_name), 'resource_types')]
+
+def get_dbo_property_ranges(prop):
+  """Fetches rdfs:range for dbo:property."""
+  if triple_backend is not None:
+    return triple_backend.get_dbo_property_ranges(prop)
+  return [r["range"]["value"] for r in sql_query(make_property_ranges_query(prop), 'property_ranges')]
+
+# Characters that cannot appear in an IRI; names that contain one of them cannot be put in a VALUES clause (they are literals, not resources).
+invalid_IRI_chars = re.compile(r'[<>"{}|^`\\\s]')
+
+def chunk_list(items, chunk_size):
+  return [items[i:i+chunk_size] for i in range(0, len(items), chunk_size)]
+
+def get_resource_types_batch(resource_names, chunk_size = 50):
+  """
+  Batched version of get_resource_types: gets the dbo: types of many resources with one VALUES query per chunk_size distinct resources.
+  Returns a dictionary with each resource name as key and the list of its types as value.
+  """
+  if triple_backend is not None:
+    return {resource_name: triple_backend.get_resource_types(resource_name) for resource_name in resource_names}
+  dico_resource_types, distinct_names = get_distinct_IRI_names(resource_names)
+  for chunk in chunk_list(distinct_names, chunk_size):
+    add_resource_types(dico_resource_types, sql_query(make_resource_types_batch_query(chunk), 'resource_types'))
+  return dico_resource_types
+
+def get_distinct_IRI_names(names):
+  """ Returns a {name: []} dictionary with each distinct name, and the list of distinct names that can be put in a VALUES clause. """
+  dico_names = {}
+  distinct_names = []
+  for name in names:
+    if name not in dico_names:
+      dico_names[name] = []
+      if not invalid_IRI_chars.search(name):
+        distinct_names.append(name)
+  return dico_names, distinct_names
+
+def make_resource_types_batch_query(resource_names):
+  values = ' '.join([f'<http://dbpedia.org/resource/{resource_name}>' for resource_name in resource_names])
+  return f"""
+    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+    SELECT DISTINCT ?resource ?type WHERE {{
+        VALUES ?resource {{ {values} }}
+        ?resource rdf:type ?type .
+        FILTER(STRSTARTS(STR(?type), "http://dbpedia.org/ontology/"))
+    }}
+    """
+
+def add_resource_types(dico_resource_types, results):
+  for r in results:
+    resource_name = r["resource"]["value"][len('http://dbpedia.org/resource/'):]
+    if resource_name in dico_resource_types:
+      dico_resource_types[resource_name].append(r["type"]["value"])
+
+def get_dbo_property_ranges_batch(props, chunk_size = 50):
+  """
+  Batched version of get_dbo_property_ranges: gets the rdfs:range of many dbo: properties with one VALUES query per chunk_size distinct properties.
+  Returns a dictionary with each property as key and the list of its ranges as value.
+  """
+  if triple_backend is not None:
+    return {prop: triple_backend.get_dbo_property_ranges(prop) for prop in props}
+  dico_prop_ranges, distinct_props = get_distinct_IRI_names(props)
+  for chunk in chunk_list(distinct_props, chunk_size):
+    add_property_ranges(dico_prop_ranges, sql_query(make_property_ranges_batch_query(chunk), 'property_ranges'))
+  return dico_prop_ranges
+
+def make_property_ranges_batch_query(props):
+  values = ' '.join([f'<http://dbpedia.org/ontology/{prop}>' for prop in props])
+  return f"""
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    SELECT DISTINCT ?prop ?range WHERE {{
+        VALUES ?prop {{ {values} }}
+        ?prop rdfs:range ?range .
+    }}
+    """
+
+def add_property_ranges(dico_prop_ranges, results):
+  for r in results:
+    prop = r["prop"]["value"][len('http://dbpedia.org/ontology/'):]
+    if prop in dico_prop_ranges:
+      dico_prop_ranges[prop].append(r["range"]["value"])
+
+def sql_query(query_string, query_kind = 'generic'):
   """
   Executes SPARQL query with safe fallback.
   Returns JSON results list.
   """
   try:
-      sparql = SPARQLWrapper("http://dbpedia.org/sparql")
-      sparql.setReturnFormat(JSON)
-      sparql.setQuery(query_string)
-      return sparql.query().convert()["results"]["bindings"]
+      return run_sparql_query(DBPEDIA_SPARQL_ENDPOINT, query_string, query_kind)
   except:
       return []
 
-def get_properties_of_entity(uri, look_for_entity_as_sbjORobj):
+# Number of rows per request for the filtered property queries; the DBpedia endpoint returns at most 10000 rows per query
+PROPERTIES_PAGE_SIZE = 10000
+
+def get_properties_of_entity(uri, look_for_entity_as_sbjORobj, property_filter = None, page_size = PROPERTIES_PAGE_SIZE):
+  """
+  With a property_filter (see make_property_filter), only the rows of the properties that get_triples_seen can keep are requested, page_size rows
+  per request; without, all the rows of the entity are requested at once. If there are more than page_size filtered rows, they are returned ordered
+  by property and value, and if the paged requests fail, the unfiltered query is used instead.
+  """
+  if triple_backend is not None:
+    return triple_backend.get_properties_of_entity(uri, look_for_entity_as_sbjORobj)
   # Define the DBpedia SPARQL endpoint URL
-  sparql_endpoint = "https://dbpedia.org/sparql"
+  sparql_endpoint = DBPEDIA_SPARQL_ENDPOINT
+  sparql_query = make_properties_query(uri, look_for_entity_as_sbjORobj, property_filter)
+  # Execute the query (or get it from the cache) and parse the results
+  if property_filter is None:
+    return run_sparql_query(sparql_endpoint, sparql_query, 'properties')
+  results_final = run_sparql_query(sparql_endpoint, make_page_query(sparql_query, page_size), 'properties')
+  if len(results_final) < page_size:
+    return results_final
+  # More rows than fit in one page: get them all again in ordered pages, since pages of an unordered result are not guaranteed to be consistent
+  results_final = []
+  try:
+    while True:
+      page = run_sparql_query(sparql_endpoint, make_page_query(sparql_query, page_size, len(results_final)), 'properties')
+      results_final.extend(page)
+      if len(page) < page_size:
+        return results_final
+  except requests.exceptions.RequestException as e:
+    # Sorting and deep offsets can fail on the endpoint for entities with huge numbers of rows; fall back to the unfiltered query
+    print(f'Paged query failed for {uri}, falling back to the unfiltered query:', e)
+    return run_sparql_query(sparql_endpoint, make_properties_query(uri, look_for_entity_as_sbjORobj), 'properties')
+
+def make_property_filter(triple_source, list_properties, ignore_properties_list):
+  """
+  Returns the (namespace, property names) filter of the DBpedia property queries for a triple source (None for Wikidata, which has its own, see
+  make_wikidata_properties_query): the properties of list_properties that are not ignored, the only ones get_triples_seen keeps.
+  """
+  if not (triple_source == 'Ontology' or triple_source == 'Infobox'):
+    return None
+  return get_triples_namespace(triple_source), sorted([prop for prop in list_properties if not prop in ignore_properties_list and not invalid_IRI_chars.search(prop)])
+
+def make_properties_query(uri, look_for_entity_as_sbjORobj, property_filter = None):
+  # Optional filter on the server side: properties of the namespace that are in the list. As get_triples_seen keeps the last part of the URIs,
+  # properties with a longer path in the namespace (e.g. http://dbpedia.org/ontology/Person/height) are also returned, and checked afterwards.
+  filter_clause = ''
+  if property_filter is not None:
+    namespace, prop_names = property_filter
+    property_uris = ', '.join([f'<{namespace}{prop_name}>' for prop_name in prop_names])
+    filter_clause = f'FILTER(STRSTARTS(STR(?property), "{namespace}") && (?property IN ({property_uris}) || CONTAINS(STRAFTER(STR(?property), "{namespace}"), "/")))'
   sparql_query = None
   # Compose the SPARQL query
   if look_for_entity_as_sbjORobj == 'Subj':
@@ -131,6 +809,7 @@ def get_properties_of_entity(uri, look_for_entity_as_sbjORobj):
     SELECT ?property ?value
     WHERE {{
       <{uri}> ?property ?value.
+      {filter_clause}
     }}
     """
   elif look_for_entity_as_sbjORobj == 'Obj':
@@ -138,46 +817,178 @@ def get_properties_of_entity(uri, look_for_entity_as_sbjORobj):
     SELECT ?value ?property
     WHERE {{
       ?value ?property <{uri}>.
+      {filter_clause}
     }}
     """
-  # Create a SPARQLWrapper object and set the query
-  sparql = SPARQLWrapper(sparql_endpoint)
-  sparql.setQuery(sparql_query)
-  # Set the return format to JSON
-  sparql.setReturnFormat(JSON)
-  # Execute the query and parse the results
-  results = sparql.query().convert()
-  results_final = results["results"]["bindings"]
-  return results_final
+  return sparql_query
+
+def make_page_query(sparql_query, page_size, offset = None):
+  """ Adds a LIMIT to sparql_query; with an offset, the rows are also ordered, so that consecutive pages do not overlap. """
+  if offset is None:
+    return sparql_query + f'LIMIT {page_size}\n'
+  return sparql_query + f'ORDER BY ?property ?value\nLIMIT {page_size} OFFSET {offset}\n'
 
 def get_wikidata_id(entity_label):
-  # Define the Wikidata API endpoint
-  wikidata_api_url = "https://www.wikidata.org/w/api.php"
+  if triple_backend is not None:
+    return triple_backend.get_wikidata_id(entity_label)
+  # QIDs already found (in this process, or in previous runs if the map is persistent) need no request
+  wikidata_id = wikidata_id_map.get(entity_label)
+  if wikidata_id is None:
+    wikidata_id = search_wikidata_id(entity_label)
+    if wikidata_id is not None:
+      wikidata_id_map.set_many({entity_label: wikidata_id})
+  return wikidata_id
 
+def search_wikidata_id(entity_label):
+  """ Returns the first hit of a Wikidata search for entity_label (None if there is none or if the API cannot be reached). """
+  try:
+    return request_wikidata_id(entity_label)
+
+  except requests.exceptions.RequestException as e:
+    print("Error connecting to the Wikidata API:", e)
+    return None
+
+def request_wikidata_id(entity_label):
+  """ Same as search_wikidata_id, but errors of the request are raised (requests.exceptions.RequestException). """
+  wikidata_api_url = WIKIDATA_API_ENDPOINT
+  params = make_wikidata_id_params(entity_label)
+  # The API answer is cached like the SPARQL results, using the request parameters as query text
+  cache_query = json.dumps(params, sort_keys=True)
+  data = None
+  if sparql_cache is not None:
+    data = sparql_cache.get(wikidata_api_url, cache_query)
+  if data is None:
+    # Send a GET request to the Wikidata API and parse the JSON response
+    data = http_transport.get_json(wikidata_api_url, params)
+    if sparql_cache is not None:
+      sparql_cache.set(wikidata_api_url, cache_query, data, 'wikidata_id')
+  return parse_wikidata_id(data)
+
+def make_wikidata_id_params(entity_label):
   # Set the parameters for the API request
-  params = {
+  return {
     "action": "wbsearchentities",
     "format": "json",
     "language": "en",  # You can change the language if needed
     "search": entity_label,
   }
 
-  try:
-    # Send a GET request to the Wikidata API
-    response = requests.get(wikidata_api_url, params=params)
-    response.raise_for_status()
-    # Parse the JSON response
-    data = response.json()
-    # Check if any entities were found
-    if "search" in data and data["search"]:
-      # Get the first entity (assuming it's the most relevant)
-      entity_id = data["search"][0]["id"]
-      return entity_id
-    return None  # Entity not found
+class WikidataIdMap:
+  """
+  Entity name -> Wikidata QID map, in memory; with a db_path, the map is also stored in an SQLite file, so that QIDs found in previous runs are reused.
+  Only found QIDs are kept: names without a QID are looked up again next time.
+  """
+  def __init__(self, db_path = None):
+    self.qids = {}
+    self.lock = threading.Lock()
+    self.connection = None
+    if db_path is not None:
+      folder = os.path.dirname(db_path)
+      if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+      self.connection = sqlite3.connect(db_path, check_same_thread=False)
+      self.connection.execute('CREATE TABLE IF NOT EXISTS qids (name TEXT PRIMARY KEY, qid TEXT)')
+      self.connection.commit()
 
-  except requests.exceptions.RequestException as e:
-    print("Error connecting to the Wikidata API:", e)
-    return None
+  def get(self, entity_label):
+    return self.get_many([entity_label]).get(entity_label)
+
+  def get_many(self, entity_labels):
+    """ Returns a {name: QID} dictionary with the names of entity_labels that are in the map. """
+    found_qids = {}
+    with self.lock:
+      for entity_label in entity_labels:
+        if entity_label in self.qids:
+          found_qids[entity_label] = self.qids[entity_label]
+        elif self.connection is not None:
+          row = self.connection.execute('SELECT qid FROM qids WHERE name = ?', (entity_label,)).fetchone()
+          if row is not None:
+            found_qids[entity_label] = self.qids[entity_label] = row[0]
+    return found_qids
+
+  def set_many(self, dico_qids):
+    with self.lock:
+      self.qids.update(dico_qids)
+      if self.connection is not None:
+        self.connection.executemany('INSERT OR REPLACE INTO qids (name, qid) VALUES (?, ?)', list(dico_qids.items()))
+        self.connection.commit()
+
+# Map used by get_wikidata_id and resolve_wikidata_ids; in memory only unless configure_wikidata_id_map is called.
+wikidata_id_map = WikidataIdMap()
+
+def configure_wikidata_id_map(db_path):
+  """ Makes the entity name -> QID map persistent, stored in db_path. Returns the WikidataIdMap object. """
+  global wikidata_id_map
+  wikidata_id_map = WikidataIdMap(db_path)
+  return wikidata_id_map
+
+def get_enwiki_title(entity_label):
+  """ Wikipedia title of a DBpedia entity name: spaces instead of underscores, and an upper-case first letter as in MediaWiki. """
+  title = entity_label.replace('_', ' ').strip()
+  return title[:1].upper() + title[1:]
+
+def make_wikidata_ids_batch_params(titles):
+  return {
+    "action": "wbgetentities",
+    "format": "json",
+    "sites": "enwiki",
+    "titles": '|'.join(titles),
+    "props": "sitelinks",
+    "sitefilter": "enwiki",
+  }
+
+def get_wikidata_ids_by_title(titles):
+  """ Returns a {title: QID} dictionary for the English Wikipedia titles that have a Wikidata item, with one wbgetentities request for all titles. """
+  params = make_wikidata_ids_batch_params(titles)
+  cache_query = json.dumps(params, sort_keys=True)
+  data = None
+  if sparql_cache is not None:
+    data = sparql_cache.get(WIKIDATA_API_ENDPOINT, cache_query)
+  if data is None:
+    data = http_transport.get_json(WIKIDATA_API_ENDPOINT, params)
+    if sparql_cache is not None:
+      sparql_cache.set(WIKIDATA_API_ENDPOINT, cache_query, data, 'wikidata_id')
+  dico_title_qids = {}
+  # Missing titles come back as entities with negative ids and no sitelinks; redirected titles come back with the title of the target page, and are
+  # therefore not found in dico_title_qids (they are then looked up with a search)
+  for entity_id, entity in data.get('entities', {}).items():
+    sitelink = entity.get('sitelinks', {}).get('enwiki')
+    if 'missing' not in entity and sitelink is not None:
+      dico_title_qids[sitelink['title']] = entity_id
+  return dico_title_qids
+
+def resolve_wikidata_ids(entity_labels, chunk_size = 50, search_misses = True):
+  """
+  Returns a {name: QID or None} dictionary for the entity names (DBpedia resource names) in entity_labels.
+  Names already in wikidata_id_map need no request; the others are resolved through their English Wikipedia titles, chunk_size titles per
+  wbgetentities request (50 at most), and with search_misses, the names that are still not resolved are looked up one by one as in get_wikidata_id.
+  """
+  if triple_backend is not None:
+    return {entity_label: triple_backend.get_wikidata_id(entity_label) for entity_label in entity_labels}
+  dico_qids = wikidata_id_map.get_many(entity_labels)
+  missing_labels = [entity_label for entity_label in dict.fromkeys(entity_labels) if entity_label not in dico_qids]
+  # The API accepts at most 50 titles per request
+  for chunk in chunk_list(missing_labels, min(chunk_size, 50)):
+    try:
+      dico_title_qids = get_wikidata_ids_by_title(list(dict.fromkeys([get_enwiki_title(entity_label) for entity_label in chunk])))
+    except requests.exceptions.RequestException as e:
+      print("Error connecting to the Wikidata API:", e)
+      continue
+    found_qids = {entity_label: dico_title_qids[get_enwiki_title(entity_label)] for entity_label in chunk if get_enwiki_title(entity_label) in dico_title_qids}
+    wikidata_id_map.set_many(found_qids)
+    dico_qids.update(found_qids)
+  for entity_label in entity_labels:
+    if entity_label not in dico_qids:
+      dico_qids[entity_label] = get_wikidata_id(entity_label) if search_misses else None
+  return dico_qids
+
+def parse_wikidata_id(data):
+  # Check if any entities were found
+  if "search" in data and data["search"]:
+    # Get the first entity (assuming it's the most relevant)
+    entity_id = data["search"][0]["id"]
+    return entity_id
+  return None  # Entity not found
 
 def get_wikidata_properties_of_entity(wikidata_id, look_for_entity_as_sbjORobj):
   """
@@ -187,12 +998,27 @@ def get_wikidata_properties_of_entity(wikidata_id, look_for_entity_as_sbjORobj):
   Returns:
     A list of dictionaries, where each dictionary represents a property and its value.
   """
-  sparql_endpoint = "https://query.wikidata.org/sparql"
+  if triple_backend is not None:
+    return triple_backend.get_wikidata_properties_of_entity(wikidata_id, look_for_entity_as_sbjORobj)
+  sparql_endpoint = WIKIDATA_SPARQL_ENDPOINT
+  results_final = run_sparql_query(sparql_endpoint, make_wikidata_properties_query(wikidata_id, look_for_entity_as_sbjORobj), 'wikidata_properties')
+  # properties = []
+  # for result in results_final:
+  #   property_uri = result["property"]["value"]
+  #   value_label = result["valueLabel"]["value"]
+  #   properties.append({"property": property_uri, "value": value_label})
+  # print(properties)
+  return results_final
+
+def make_wikidata_properties_query(wikidata_id, look_for_entity_as_sbjORobj):
+  # Only the statements of mapped properties are requested; the others would be discarded by get_triples_seen
+  mapped_properties = ' '.join([f'wdt:{pid}' for pid in dico_map_dbp_wkd])
   sparql_query = None
   if look_for_entity_as_sbjORobj == 'Subj':
     sparql_query = f"""
       SELECT ?property ?valueLabel
       WHERE {{
+        VALUES ?property {{ {mapped_properties} }}
         wd:{wikidata_id} ?property ?value .
         SERVICE wikibase:label {{ bd:serviceParam wikibase:language "en". }}
       }}
@@ -201,22 +1027,12 @@ def get_wikidata_properties_of_entity(wikidata_id, look_for_entity_as_sbjORobj):
     sparql_query = f"""
       SELECT ?valueLabel ?property
       WHERE {{
+        VALUES ?property {{ {mapped_properties} }}
         ?value ?property wd:{wikidata_id}.
         SERVICE wikibase:label {{ bd:serviceParam wikibase:language "en". }}
       }}
     """
-  sparql = SPARQLWrapper(sparql_endpoint)
-  sparql.setQuery(sparql_query)
-  sparql.setReturnFormat(JSON)
-  results = sparql.query().convert()
-  # properties = []
-  # for result in results["results"]["bindings"]:
-  #   property_uri = result["property"]["value"]
-  #   value_label = result["valueLabel"]["value"]
-  #   properties.append({"property": property_uri, "value": value_label})
-  # print(properties)
-  results_final = results["results"]["bindings"]
-  return results_final
+  return sparql_query
 
   # if __name__ == "__main__":
   #   props_list_path = sys.argv[1]
@@ -225,12 +1041,11 @@ def get_wikidata_properties_of_entity(wikidata_id, look_for_entity_as_sbjORobj):
   #   ignore_properties_str = sys.argv[4]
   #   out_folder = sys.argv[5]
 
-def get_dbpedia_properties(props_list_path, entity_name, triple_source, ignore_properties_str, get_triples_where_entity_is_subj = True, get_triples_where_entity_is_obj = False, triple_Validation = False):
-  ignore_properties_input = ignore_properties_str.split(',')
-  ignore_properties_list = []
-  for ignored_property in ignore_properties_input:
-    ignore_properties_list.append(ignored_property.strip())
+def parse_ignore_properties(ignore_properties_str):
+  """ Returns the set of property labels in a comma-separated string. """
+  return {ignored_property.strip() for ignored_property in ignore_properties_str.split(',')}
 
+def read_properties_list(props_list_path):
   # Read file with all covered properties
   fd = codecs.open(props_list_path, 'r', 'utf-8')
   lines_properties = fd.readlines()
@@ -239,44 +1054,63 @@ def get_dbpedia_properties(props_list_path, entity_name, triple_source, ignore_p
     line_prop_list = line_properties.strip().split('-')
     for prop in line_prop_list:
       list_properties.append(prop)
+  return list_properties
 
-  selected_uri = "http://dbpedia.org/resource/"+entity_name
-  # selected_uri = "http://dbpedia.org/resource/Olga_Bondareva"
-  subj_name = selected_uri.rsplit('/', 1)[1]
-  # Get all properties for entity
-  results_subj = ''
-  results_obj = ''
-  if triple_source == 'Ontology' or triple_source == 'Infobox':
-    if get_triples_where_entity_is_subj == True:
-      results_subj = get_properties_of_entity(selected_uri, 'Subj')
-    if get_triples_where_entity_is_obj == True:
-      results_obj = get_properties_of_entity(selected_uri, 'Obj')
-  elif triple_source == 'Wikidata':
-    wikidata_id = get_wikidata_id(entity_name)
-    # print(wikidata_id)
-    if get_triples_where_entity_is_subj == True:
-      results_subj = get_wikidata_properties_of_entity(wikidata_id, 'Subj')
-    if get_triples_where_entity_is_obj == True:
-      results_obj = get_wikidata_properties_of_entity(wikidata_id, 'Obj')
-      
+# Property indexes loaded by load_properties_index, shared by all calls in the process: {path: (file stamp, frozenset of property labels)}
+properties_indexes = {}
+properties_indexes_lock = threading.Lock()
+
+def get_file_stamp(path):
+  """ Modification time and size of a file, used to notice that it changed. """
+  file_stat = os.stat(path)
+  return [file_stat.st_mtime_ns, file_stat.st_size]
+
+def compile_properties_index(props_list_path, compiled_path):
+  """ Saves the property labels of props_list_path as a pickled frozenset in compiled_path, with the stamp of the text file. Returns the frozenset. """
+  properties_index = frozenset(read_properties_list(props_list_path))
+  with open(compiled_path, 'wb') as fh:
+    pickle.dump({'source_stamp': get_file_stamp(props_list_path), 'properties': properties_index}, fh)
+  return properties_index
+
+def load_properties_index(props_list_path, compiled_path = None):
+  """
+  Returns the frozenset of property labels in props_list_path. The file is read once per process (and again if it changes), so batch callers can
+  call this for every entity. With compiled_path, the index is loaded from that binary file when it is up to date, and (re)compiled otherwise.
+  """
+  stamp = get_file_stamp(props_list_path)
+  with properties_indexes_lock:
+    if props_list_path in properties_indexes and properties_indexes[props_list_path][0] == stamp:
+      return properties_indexes[props_list_path][1]
+    properties_index = None
+    if compiled_path is not None and os.path.exists(compiled_path):
+      with open(compiled_path, 'rb') as fh:
+        compiled = pickle.load(fh)
+      if compiled['source_stamp'] == stamp:
+        properties_index = compiled['properties']
+    if properties_index is None:
+      if compiled_path is not None:
+        properties_index = compile_properties_index(props_list_path, compiled_path)
+      else:
+        properties_index = frozenset(read_properties_list(props_list_path))
+    properties_indexes[props_list_path] = (stamp, properties_index)
+    return properties_index
+
+def build_triple_lists(results_subj, results_obj, subj_name, triple_source, list_properties, ignore_properties_list, get_triples_where_entity_is_subj = True, get_triples_where_entity_is_obj = False, triple_Validation = False):
+  """ Turns the query results of an entity into the 3 lists returned by get_dbpedia_properties. """
   # Get properties covered by the generator and their respective objets
   list_triple_objects = []
-  if triple_Validation == True:
-    if get_triples_where_entity_is_subj == True:
-      list_triple_objects.extend(get_triples_seen(results_subj, subj_name, triple_source, list_properties, ignore_properties_list, entity_is_sbjORobj = 'Subj', triple_validation=True))
-    if get_triples_where_entity_is_obj == True:
-      list_triple_objects.extend(get_triples_seen(results_obj, subj_name, triple_source, list_properties, ignore_properties_list, entity_is_sbjORobj = 'Obj', triple_validation=True))
-  else:
-    if get_triples_where_entity_is_subj == True:
-      list_triple_objects.extend(get_triples_seen(results_subj, subj_name, triple_source, list_properties, ignore_properties_list, entity_is_sbjORobj = 'Subj', triple_validation=False))
-    if get_triples_where_entity_is_obj == True:
-      list_triple_objects.extend(get_triples_seen(results_obj, subj_name, triple_source, list_properties, ignore_properties_list, entity_is_sbjORobj = 'Obj', triple_validation=False))
+  if get_triples_where_entity_is_subj == True:
+    list_triple_objects.extend(get_triples_seen(results_subj, subj_name, triple_source, list_properties, ignore_properties_list, entity_is_sbjORobj = 'Subj', triple_validation=triple_Validation))
+  if get_triples_where_entity_is_obj == True:
+    list_triple_objects.extend(get_triples_seen(results_obj, subj_name, triple_source, list_properties, ignore_properties_list, entity_is_sbjORobj = 'Obj', triple_validation=triple_Validation))
 
   # Check
   # print('Subject: '+subj_name)
   # for triple_object in list_triple_objects:
   #   print(triple_object.DBprop+' : '+triple_object.DBobj)
+  return make_triple_lists(list_triple_objects)
 
+def make_triple_lists(list_triple_objects):
   list_prop = []
   list_obj = []
   list_propObj =[]
@@ -289,6 +1123,38 @@ def get_dbpedia_properties(props_list_path, entity_name, triple_source, ignore_p
   # print(list_propObj)
   return list_triple_objects, list_propObj, list_obj
 
+def get_dbpedia_properties(props_list_path, entity_name, triple_source, ignore_properties_str, get_triples_where_entity_is_subj = True, get_triples_where_entity_is_obj = False, triple_Validation = False, compiled_props_list_path = None, server_side_filtering = False):
+  """
+  The properties list is loaded with load_properties_index (once per process); compiled_props_list_path is its optional binary form.
+  With server_side_filtering (off by default), the DBpedia queries only return the rows of the properties in the list that are not ignored (see
+  make_property_filter). This downloads fewer rows, but the queries carry the whole list of properties, and for entities with more rows than
+  PROPERTIES_PAGE_SIZE the rows (and so the triples) come ordered by property and value (see get_properties_of_entity).
+  """
+  ignore_properties_list = parse_ignore_properties(ignore_properties_str)
+  list_properties = load_properties_index(props_list_path, compiled_props_list_path)
+  property_filter = make_property_filter(triple_source, list_properties, ignore_properties_list) if server_side_filtering else None
+
+  selected_uri = "http://dbpedia.org/resource/"+entity_name
+  # selected_uri = "http://dbpedia.org/resource/Olga_Bondareva"
+  subj_name = selected_uri.rsplit('/', 1)[1]
+  # Get all properties for entity
+  results_subj = ''
+  results_obj = ''
+  if triple_source == 'Ontology' or triple_source == 'Infobox':
+    if get_triples_where_entity_is_subj == True:
+      results_subj = get_properties_of_entity(selected_uri, 'Subj', property_filter)
+    if get_triples_where_entity_is_obj == True:
+      results_obj = get_properties_of_entity(selected_uri, 'Obj', property_filter)
+  elif triple_source == 'Wikidata':
+    wikidata_id = get_wikidata_id(entity_name)
+    # print(wikidata_id)
+    if get_triples_where_entity_is_subj == True:
+      results_subj = get_wikidata_properties_of_entity(wikidata_id, 'Subj')
+    if get_triples_where_entity_is_obj == True:
+      results_obj = get_wikidata_properties_of_entity(wikidata_id, 'Obj')
+
+  return build_triple_lists(results_subj, results_obj, subj_name, triple_source, list_properties, ignore_properties_list, get_triples_where_entity_is_subj, get_triples_where_entity_is_obj, triple_Validation)
+
   # with open(os.path.join(out_folder, 'list_PropObj'), 'wb') as fh:
   #   pickle.dump(list_propObj, fh)
     
@@ -297,3 +1163,404 @@ def get_dbpedia_properties(props_list_path, entity_name, triple_source, ignore_p
     
   # with open(os.path.join(out_folder, 'list_obj'), 'wb') as fh:
   #   pickle.dump(list_obj, fh)
+
+def get_host(url):
+  return urllib.parse.urlsplit(url).netloc
+
+class HostRateLimiter:
+  """ Thread-safe limiter that spaces out the requests sent to each host so that there are at most requests_per_second per host. """
+  def __init__(self, requests_per_second):
+    self.min_interval = 1.0 / requests_per_second if requests_per_second else 0
+    self.next_slot = {}
+    self.lock = threading.Lock()
+
+  def wait(self, host):
+    with self.lock:
+      now = time.monotonic()
+      slot = max(now, self.next_slot.get(host, now))
+      self.next_slot[host] = slot + self.min_interval
+    if slot > now:
+      time.sleep(slot - now)
+
+def is_transient_error(error):
+  """ True for the request errors that can succeed if the request is sent again: connection errors, timeouts, and HTTP 429 (too many requests) and 5xx answers. """
+  if isinstance(error, requests.exceptions.HTTPError):
+    status_code = error.response.status_code if error.response is not None else None
+    return status_code is None or status_code == 429 or status_code >= 500
+  return isinstance(error, requests.exceptions.RequestException)
+
+def get_retry_after(error):
+  """ Number of seconds to wait given by the Retry-After header of an HTTP error (in seconds or as an HTTP date), or None if there is none. """
+  response = getattr(error, 'response', None)
+  if not isinstance(error, requests.exceptions.HTTPError) or response is None:
+    return None
+  retry_after = response.headers.get('Retry-After')
+  if retry_after is None:
+    return None
+  try:
+    return max(0.0, float(retry_after))
+  except ValueError:
+    pass
+  try:
+    return max(0.0, email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time())
+  except (TypeError, ValueError):
+    return None
+
+def call_with_retries(function, args, host, rate_limiter, max_retries = 3, backoff_seconds = 1.0):
+  """
+  Calls function(*args) after waiting for a slot for host; calls that fail with a transient error (see is_transient_error) are retried max_retries times, waiting backoff_seconds, then twice as long, etc.
+  If the server asks to wait longer with a Retry-After header (e.g. with HTTP 429), that delay is used instead.
+  Other errors (e.g. an entity that is not found, or an HTTP 400 answer) are raised at once.
+  """
+  attempt = 0
+  while True:
+    rate_limiter.wait(host)
+    try:
+      return function(*args)
+    except Exception as e:
+      if attempt >= max_retries or not is_transient_error(e):
+        raise
+      time.sleep(max(get_retry_after(e) or 0, backoff_seconds * (2 ** attempt)))
+      attempt += 1
+
+def iter_with_resolved_wikidata_ids(entity_names, rate_limiter, chunk_size = 50):
+  """ Yields the names of entity_names, after resolving the QIDs of each chunk of chunk_size names in one request (see resolve_wikidata_ids); misses are left to get_wikidata_id. """
+  entity_names = iter(entity_names)
+  while True:
+    chunk = list(itertools.islice(entity_names, chunk_size))
+    if len(chunk) == 0:
+      return
+    rate_limiter.wait(get_host(WIKIDATA_API_ENDPOINT))
+    try:
+      resolve_wikidata_ids(chunk, chunk_size, search_misses=False)
+    except Exception as e:
+      # Resolving by batch only saves requests: if it fails (e.g. unexpected answer), the names of the chunk are looked up one by one
+      print("Error resolving Wikidata IDs by batch:", repr(e))
+    yield from chunk
+
+def get_wikidata_id_or_fail(entity_label):
+  """ Same as get_wikidata_id, but request errors are raised so that the call is retried, and an entity that is not found raises LookupError (not retried). """
+  if triple_backend is not None:
+    wikidata_id = triple_backend.get_wikidata_id(entity_label)
+  else:
+    wikidata_id = wikidata_id_map.get(entity_label)
+    if wikidata_id is None:
+      wikidata_id = request_wikidata_id(entity_label)
+      if wikidata_id is not None:
+        wikidata_id_map.set_many({entity_label: wikidata_id})
+  if wikidata_id is None:
+    raise LookupError(f'No Wikidata ID found for {entity_label}')
+  return wikidata_id
+
+class EntityResult:
+  """ Result of get_dbpedia_properties_bulk for one entity; error is None if the triples were retrieved, otherwise it is the exception raised. """
+  def __init__(self, entity_name, list_triple_objects = None, list_propObj = None, list_obj = None, error = None):
+    self.entity_name = entity_name
+    self.list_triple_objects = list_triple_objects
+    self.list_propObj = list_propObj
+    self.list_obj = list_obj
+    self.error = error
+
+def get_dbpedia_properties_bulk(props_list_path, entity_names, triple_source, ignore_properties_str, get_triples_where_entity_is_subj = True, get_triples_where_entity_is_obj = False, triple_Validation = False, max_in_flight = 8, requests_per_second_per_host = 5, max_retries = 3, backoff_seconds = 1.0, compiled_props_list_path = None, server_side_filtering = False):
+  """
+  Same as get_dbpedia_properties for many entities: the subject, object and Wikidata ID lookups of all entities are run concurrently, with at most max_in_flight requests at the same time and at most requests_per_second_per_host requests per second to each host.
+  Failed requests are retried with exponential backoff; an entity whose requests still fail is reported with its error, the others are not affected.
+  Yields EntityResult objects in the order in which the entities are completed.
+  """
+  ignore_properties_list = parse_ignore_properties(ignore_properties_str)
+  list_properties = load_properties_index(props_list_path, compiled_props_list_path)
+  property_filter = make_property_filter(triple_source, list_properties, ignore_properties_list) if server_side_filtering else None
+  rate_limiter = HostRateLimiter(requests_per_second_per_host)
+  entity_names_iterator = iter(entity_names)
+  if triple_source == 'Wikidata' and triple_backend is None:
+    # The QIDs are resolved by batches as the entities are started, so that the wikidata_id stage of most entities finds them in wikidata_id_map
+    entity_names_iterator = iter_with_resolved_wikidata_ids(entity_names_iterator, rate_limiter)
+  # Each running future is mapped to the entity number and the stage (wikidata_id, Subj, Obj or triples) it corresponds to
+  running_futures = {}
+  # For each entity being processed (the same name can appear twice in the input, so entities are numbered): name, results of the queries and number of queries still running
+  dico_entity_state = {}
+  entity_counter = [0]
+
+  def submit(executor, entity_id, stage, function, args, host):
+    future = executor.submit(call_with_retries, function, args, host, rate_limiter, max_retries, backoff_seconds)
+    running_futures[future] = (entity_id, stage)
+
+  def submit_triple_queries(executor, entity_id, wikidata_id = None):
+    state = dico_entity_state[entity_id]
+    entity_name = state['name']
+    for stage, requested in [['Subj', get_triples_where_entity_is_subj], ['Obj', get_triples_where_entity_is_obj]]:
+      if requested == True:
+        state['remaining'] += 1
+        if triple_source == 'Wikidata':
+          submit(executor, entity_id, stage, get_wikidata_properties_of_entity, (wikidata_id, stage), get_host(WIKIDATA_SPARQL_ENDPOINT))
+        else:
+          submit(executor, entity_id, stage, get_properties_of_entity, ("http://dbpedia.org/resource/"+entity_name, stage, property_filter), get_host(DBPEDIA_SPARQL_ENDPOINT))
+    if state['remaining'] == 0:
+      submit_build(executor, entity_id)
+
+  def submit_build(executor, entity_id):
+    state = dico_entity_state[entity_id]
+    future = executor.submit(build_triple_lists, state['Subj'], state['Obj'], state['name'], triple_source, list_properties, ignore_properties_list, get_triples_where_entity_is_subj, get_triples_where_entity_is_obj, triple_Validation)
+    running_futures[future] = (entity_id, 'triples')
+
+  def start_next_entity(executor):
+    entity_name = next(entity_names_iterator, None)
+    if entity_name is None:
+      return False
+    entity_id = entity_counter[0]
+    entity_counter[0] += 1
+    dico_entity_state[entity_id] = {'name': entity_name, 'Subj': '', 'Obj': '', 'remaining': 0}
+    if triple_source == 'Wikidata':
+      # QIDs resolved by batch (or in previous runs) need no request, and no rate-limiter slot
+      wikidata_id = wikidata_id_map.get(entity_name) if triple_backend is None else None
+      if wikidata_id is not None:
+        submit_triple_queries(executor, entity_id, wikidata_id)
+      else:
+        submit(executor, entity_id, 'wikidata_id', get_wikidata_id_or_fail, (entity_name,), get_host(WIKIDATA_API_ENDPOINT))
+    else:
+      submit_triple_queries(executor, entity_id)
+    return True
+
+  with concurrent.futures.ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+    # Keep a bounded number of entities in progress so that huge inputs are not all queued at once
+    while len(dico_entity_state) < max_in_flight and start_next_entity(executor):
+      pass
+    while running_futures:
+      done_futures, _ = concurrent.futures.wait(list(running_futures), return_when=concurrent.futures.FIRST_COMPLETED)
+      for future in done_futures:
+        entity_id, stage = running_futures.pop(future)
+        # The entity may already have been reported as failed by another of its queries
+        if entity_id not in dico_entity_state:
+          continue
+        state = dico_entity_state[entity_id]
+        error = future.exception()
+        if error is not None:
+          del dico_entity_state[entity_id]
+          yield EntityResult(state['name'], error=error)
+        elif stage == 'wikidata_id':
+          submit_triple_queries(executor, entity_id, future.result())
+        elif stage == 'triples':
+          del dico_entity_state[entity_id]
+          list_triple_objects, list_propObj, list_obj = future.result()
+          yield EntityResult(state['name'], list_triple_objects, list_propObj, list_obj)
+        else:
+          state[stage] = future.result()
+          state['remaining'] -= 1
+          if state['remaining'] == 0:
+            submit_build(executor, entity_id)
+      while len(dico_entity_state) < max_in_flight and start_next_entity(executor):
+        pass
+
+# Async versions of the query functions, e.g. for a web server running an event loop; they use the same queries, cache and triple backend as the
+# sync functions. The sync functions do not call them: asyncio.run cannot be used in a thread that already runs an event loop, as in Jupyter notebooks.
+
+class AsyncHTTPTransport(HostStatsRecorder):
+  """
+  Async counterpart of HTTPTransport, built on an aiohttp session (one per event loop) that keeps connections alive, with at most limit_per_host
+  connections per host. Without aiohttp, requests go through the shared sync transport, in worker threads.
+  """
+  def __init__(self, user_agent = HTTP_USER_AGENT, connect_timeout = 10, read_timeout = 120, limit_per_host = 16):
+    super().__init__()
+    self.user_agent = user_agent
+    self.connect_timeout = connect_timeout
+    self.read_timeout = read_timeout
+    self.limit_per_host = limit_per_host
+    self.session = None
+    self.session_loop = None
+
+  def get_session(self):
+    # An aiohttp session can only be used in the event loop in which it was created
+    loop = asyncio.get_running_loop()
+    if self.session is None or self.session.closed or self.session_loop is not loop:
+      connector = aiohttp.TCPConnector(limit_per_host=self.limit_per_host)
+      timeout = aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=self.read_timeout)
+      self.session = aiohttp.ClientSession(connector=connector, timeout=timeout, headers={'User-Agent': self.user_agent})
+      self.session_loop = loop
+    return self.session
+
+  async def request_json(self, method, url, **kwargs):
+    """ Sends a request and returns its JSON answer; HTTP errors are raised as aiohttp.ClientResponseError (requests.HTTPError without aiohttp). """
+    if aiohttp is None:
+      return await asyncio.to_thread(lambda: http_transport.request(method, url, **kwargs).json())
+    session = self.get_session()
+    start = time.perf_counter()
+    is_error = True
+    try:
+      async with session.request(method, url, **kwargs) as response:
+        is_error = response.status >= 400
+        response.raise_for_status()
+        return await response.json(content_type=None)
+    finally:
+      self.record(get_host(url), time.perf_counter() - start, is_error)
+
+  async def get_json(self, url, params = None):
+    return await self.request_json('GET', url, params=params)
+
+  async def sparql_query(self, endpoint, query_string):
+    method, request_arguments = get_sparql_request(query_string)
+    return (await self.request_json(method, endpoint, **request_arguments))["results"]["bindings"]
+
+  async def close(self):
+    if self.session is not None:
+      await self.session.close()
+
+async_http_transport = AsyncHTTPTransport()
+
+def configure_async_http_transport(user_agent = HTTP_USER_AGENT, connect_timeout = 10, read_timeout = 120, limit_per_host = 16):
+  """ Replaces the transport of the async functions; the previous one should be closed with 'await transport.close()'. Returns the new AsyncHTTPTransport. """
+  global async_http_transport
+  async_http_transport = AsyncHTTPTransport(user_agent, connect_timeout, read_timeout, limit_per_host)
+  return async_http_transport
+
+# Exceptions raised by a failed request, caught by async_get_wikidata_id like requests.exceptions.RequestException in get_wikidata_id
+ASYNC_HTTP_ERRORS = (requests.exceptions.RequestException,) + ((aiohttp.ClientError,) if aiohttp is not None else ())
+
+async def run_with_deadline(coroutine, deadline):
+  """ Awaits coroutine, cancelling it and raising TimeoutError (asyncio.TimeoutError before Python 3.11) if it takes more than deadline seconds. """
+  if deadline is None:
+    return await coroutine
+  return await asyncio.wait_for(coroutine, deadline)
+
+async def gather_or_cancel(*coroutines):
+  """ Same as asyncio.gather, except that the other coroutines are cancelled when one of them fails instead of being left running. """
+  tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+  try:
+    return await asyncio.gather(*tasks)
+  except BaseException:
+    for task in tasks:
+      task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    raise
+
+async def async_run_sparql_query(endpoint, query_string, query_kind = 'generic'):
+  # The cache reads and writes an SQLite file: it is used from a worker thread so that the event loop is not blocked on disk I/O
+  if sparql_cache is not None:
+    cached_results = await asyncio.to_thread(sparql_cache.get, endpoint, query_string)
+    if cached_results is not None:
+      return cached_results
+  results = await async_http_transport.sparql_query(endpoint, query_string)
+  if sparql_cache is not None:
+    await asyncio.to_thread(sparql_cache.set, endpoint, query_string, results, query_kind)
+  return results
+
+async def async_sql_query(query_string, query_kind = 'generic'):
+  """ Same as sql_query: failed queries return an empty list (cancellation and deadlines are not caught). """
+  try:
+    return await async_run_sparql_query(DBPEDIA_SPARQL_ENDPOINT, query_string, query_kind)
+  except Exception:
+    return []
+
+async def async_get_properties_of_entity(uri, look_for_entity_as_sbjORobj, property_filter = None, page_size = PROPERTIES_PAGE_SIZE, deadline = None):
+  if triple_backend is not None:
+    return triple_backend.get_properties_of_entity(uri, look_for_entity_as_sbjORobj)
+  return await run_with_deadline(async_get_properties_of_entity_remote(uri, look_for_entity_as_sbjORobj, property_filter, page_size), deadline)
+
+async def async_get_properties_of_entity_remote(uri, look_for_entity_as_sbjORobj, property_filter, page_size):
+  # Same requests as get_properties_of_entity
+  sparql_query = make_properties_query(uri, look_for_entity_as_sbjORobj, property_filter)
+  if property_filter is None:
+    return await async_run_sparql_query(DBPEDIA_SPARQL_ENDPOINT, sparql_query, 'properties')
+  results = await async_run_sparql_query(DBPEDIA_SPARQL_ENDPOINT, make_page_query(sparql_query, page_size), 'properties')
+  if len(results) < page_size:
+    return results
+  results = []
+  try:
+    while True:
+      page = await async_run_sparql_query(DBPEDIA_SPARQL_ENDPOINT, make_page_query(sparql_query, page_size, len(results)), 'properties')
+      results.extend(page)
+      if len(page) < page_size:
+        return results
+  except ASYNC_HTTP_ERRORS as e:
+    print(f'Paged query failed for {uri}, falling back to the unfiltered query:', e)
+    return await async_run_sparql_query(DBPEDIA_SPARQL_ENDPOINT, make_properties_query(uri, look_for_entity_as_sbjORobj), 'properties')
+
+async def async_get_wikidata_id(entity_label, deadline = None):
+  if triple_backend is not None:
+    return triple_backend.get_wikidata_id(entity_label)
+  wikidata_id = wikidata_id_map.get(entity_label)
+  if wikidata_id is None:
+    wikidata_id = await run_with_deadline(async_get_wikidata_id_remote(entity_label), deadline)
+    if wikidata_id is not None:
+      wikidata_id_map.set_many({entity_label: wikidata_id})
+  return wikidata_id
+
+async def async_get_wikidata_id_remote(entity_label):
+  params = make_wikidata_id_params(entity_label)
+  cache_query = json.dumps(params, sort_keys=True)
+  try:
+    data = None
+    if sparql_cache is not None:
+      data = await asyncio.to_thread(sparql_cache.get, WIKIDATA_API_ENDPOINT, cache_query)
+    if data is None:
+      data = await async_http_transport.get_json(WIKIDATA_API_ENDPOINT, params)
+      if sparql_cache is not None:
+        await asyncio.to_thread(sparql_cache.set, WIKIDATA_API_ENDPOINT, cache_query, data, 'wikidata_id')
+    return parse_wikidata_id(data)
+  except ASYNC_HTTP_ERRORS as e:
+    print("Error connecting to the Wikidata API:", e)
+    return None
+
+async def async_get_wikidata_properties_of_entity(wikidata_id, look_for_entity_as_sbjORobj, deadline = None):
+  if triple_backend is not None:
+    return triple_backend.get_wikidata_properties_of_entity(wikidata_id, look_for_entity_as_sbjORobj)
+  return await run_with_deadline(async_run_sparql_query(WIKIDATA_SPARQL_ENDPOINT, make_wikidata_properties_query(wikidata_id, look_for_entity_as_sbjORobj), 'wikidata_properties'), deadline)
+
+async def async_get_resource_types(resource_name, deadline = None):
+  if triple_backend is not None:
+    return triple_backend.get_resource_types(resource_name)
+  return [r["type"]["value"] for r in await run_with_deadline(async_sql_query(make_resource_types_query(resource_name), 'resource_types'), deadline)]
+
+async def async_get_dbo_property_ranges(prop, deadline = None):
+  if triple_backend is not None:
+    return triple_backend.get_dbo_property_ranges(prop)
+  return [r["range"]["value"] for r in await run_with_deadline(async_sql_query(make_property_ranges_query(prop), 'property_ranges'), deadline)]
+
+async def async_get_resource_types_batch(resource_names, chunk_size = 50):
+  """ Same as get_resource_types_batch, with the queries of all chunks sent concurrently. """
+  if triple_backend is not None:
+    return get_resource_types_batch(resource_names, chunk_size)
+  dico_resource_types, distinct_names = get_distinct_IRI_names(resource_names)
+  for results in await gather_or_cancel(*[async_sql_query(make_resource_types_batch_query(chunk), 'resource_types') for chunk in chunk_list(distinct_names, chunk_size)]):
+    add_resource_types(dico_resource_types, results)
+  return dico_resource_types
+
+async def async_get_dbo_property_ranges_batch(props, chunk_size = 50):
+  """ Same as get_dbo_property_ranges_batch, with the queries of all chunks sent concurrently. """
+  if triple_backend is not None:
+    return get_dbo_property_ranges_batch(props, chunk_size)
+  dico_prop_ranges, distinct_props = get_distinct_IRI_names(props)
+  for results in await gather_or_cancel(*[async_sql_query(make_property_ranges_batch_query(chunk), 'property_ranges') for chunk in chunk_list(distinct_props, chunk_size)]):
+    add_property_ranges(dico_prop_ranges, results)
+  return dico_prop_ranges
+
+async def async_get_dbpedia_properties(props_list_path, entity_name, triple_source, ignore_properties_str, get_triples_where_entity_is_subj = True, get_triples_where_entity_is_obj = False, triple_Validation = False, compiled_props_list_path = None, server_side_filtering = False, deadline = None):
+  """
+  Same as get_dbpedia_properties; the subject and object queries are sent concurrently, then the range and type lookups of all the selected triples.
+  deadline (in seconds) applies to the whole call; if it is exceeded or the call is cancelled, the queries still running are cancelled.
+  """
+  return await run_with_deadline(async_get_dbpedia_properties_no_deadline(props_list_path, entity_name, triple_source, ignore_properties_str, get_triples_where_entity_is_subj, get_triples_where_entity_is_obj, triple_Validation, compiled_props_list_path, server_side_filtering), deadline)
+
+async def async_get_dbpedia_properties_no_deadline(props_list_path, entity_name, triple_source, ignore_properties_str, get_triples_where_entity_is_subj, get_triples_where_entity_is_obj, triple_Validation, compiled_props_list_path, server_side_filtering):
+  ignore_properties_list = parse_ignore_properties(ignore_properties_str)
+  list_properties = load_properties_index(props_list_path, compiled_props_list_path)
+  property_filter = make_property_filter(triple_source, list_properties, ignore_properties_list) if server_side_filtering else None
+  selected_uri = "http://dbpedia.org/resource/"+entity_name
+  subj_name = selected_uri.rsplit('/', 1)[1]
+  directions = [direction for direction, requested in [['Subj', get_triples_where_entity_is_subj], ['Obj', get_triples_where_entity_is_obj]] if requested == True]
+  list_results = [[] for _ in directions]
+  if triple_source == 'Ontology' or triple_source == 'Infobox':
+    list_results = await gather_or_cancel(*[async_get_properties_of_entity(selected_uri, direction, property_filter) for direction in directions])
+  elif triple_source == 'Wikidata':
+    wikidata_id = await async_get_wikidata_id(entity_name)
+    list_results = await gather_or_cancel(*[async_get_wikidata_properties_of_entity(wikidata_id, direction) for direction in directions])
+  list_selected_rows = [select_triple_rows(results, subj_name, triple_source, list_properties, ignore_properties_list, entity_is_sbjORobj=direction) for results, direction in zip(list_results, directions)]
+  all_selected_rows = [row for selected_rows in list_selected_rows for row in selected_rows]
+  list_triple_objects = []
+  if triple_Validation == False:
+    for prop_name, subj_name_final, obj_name_final in all_selected_rows:
+      list_triple_objects.append(Triple(prop_name, subj_name_final, obj_name_final))
+  elif len(all_selected_rows) > 0:
+    dico_prop_ranges, dico_resource_types = await gather_or_cancel(async_get_dbo_property_ranges_batch([row[0] for row in all_selected_rows]), async_get_resource_types_batch([row[2] for row in all_selected_rows]))
+    for prop_name, subj_name_final, obj_name_final in all_selected_rows:
+      list_triple_objects.append(CheckedTriple(prop_name, subj_name_final, obj_name_final, dico_prop_ranges[prop_name], dico_resource_types[obj_name_final]))
+  return make_triple_lists(list_triple_objects)
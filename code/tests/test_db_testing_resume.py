@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Checks that resuming an interrupted run of code/3.1/Scripts/db-testing.py writes the same CSVs as one uninterrupted run.
+# Run from the root of the repository: python -m pytest code/tests
+import os
+import io
+import tempfile
+import unittest
+import contextlib
+import importlib.util
+
+script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '3.1', 'Scripts', 'db-testing.py')
+spec = importlib.util.spec_from_file_location('db_testing', script_path)
+db_testing = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(db_testing)
+
+class Interrupted(Exception):
+  pass
+
+class FakeValidator(db_testing.DBpediaValidator):
+  """ Validator with made-up results (no queries), which stops before the page named interrupt_at. """
+  interrupt_at = None
+
+  def validate_page(self, page, verbose=True):
+    if page == self.interrupt_at:
+      raise Interrupted(page)
+    number = int(page.split('_')[1])
+    invalid_instances = [{'page_name': page, 'property': f'prop{i}', 'target_resource': f'Target_{i}', 'direction': 'outgoing', 'expected_ranges': 'dbo:Place', 'actual_types': ''} for i in range(number % 3)]
+    scores = (f'{number / 10:.2f}', number, 1.0, number, 0.5, 2)
+    return scores, invalid_instances
+
+def read_file(path):
+  with open(path, 'r', encoding='utf-8') as f:
+    return f.read()
+
+class TestResume(unittest.TestCase):
+  pages = [f'Page_{i}' for i in range(8)]
+
+  def run_validator(self, folder, interrupt_at = None, resume = False):
+    validator = FakeValidator('dbo')
+    validator.interrupt_at = interrupt_at
+    output = os.path.join(folder, 'scores.csv')
+    invalid = os.path.join(folder, 'invalid.csv')
+    with contextlib.redirect_stdout(io.StringIO()):
+      try:
+        validator.write_to_file(output, invalid, list(self.pages), resume=resume)
+      except Interrupted:
+        pass
+    return output, invalid
+
+  def test_interrupted_then_resumed(self):
+    with tempfile.TemporaryDirectory() as full_folder, tempfile.TemporaryDirectory() as resumed_folder:
+      full_output, full_invalid = self.run_validator(full_folder)
+      self.run_validator(resumed_folder, interrupt_at='Page_5')
+      resumed_output, resumed_invalid = self.run_validator(resumed_folder, resume=True)
+      self.assertEqual(read_file(resumed_output), read_file(full_output))
+      self.assertEqual(read_file(resumed_invalid), read_file(full_invalid))
+
+  def test_resumed_without_fails_csv(self):
+    with tempfile.TemporaryDirectory() as folder:
+      output, invalid = self.run_validator(folder, interrupt_at='Page_5')
+      os.remove(invalid)
+      self.run_validator(folder, resume=True)
+      self.assertTrue(read_file(invalid).startswith(','.join(db_testing.INVALID_FIELDNAMES)))
+
+if __name__ == '__main__':
+  unittest.main()
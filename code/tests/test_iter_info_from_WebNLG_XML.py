@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Checks that the streaming WebNLG XML reader reads the triples as the previous xmltodict-based reader did.
+# Run from the root of the repository: python -m pytest code/tests
+import os
+import sys
+import io
+import tempfile
+import unittest
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils import iter_info_from_WebNLG_XML
+
+XML_WITH_WHITESPACE = """<?xml version="1.0" ?>
+<benchmark>
+  <entries>
+    <entry category="Person" eid="Id1" shape="" shape-type="" size="2">
+      <modifiedtripleset>
+        <mtriple>
+          Adam_West | birthPlace | Walla_Walla
+        </mtriple>
+        <mtriple> Adam_West | occupation | Actor </mtriple>
+      </modifiedtripleset>
+    </entry>
+  </entries>
+</benchmark>
+"""
+
+class TestIterInfoFromWebNLGXML(unittest.TestCase):
+  def test_whitespace_around_triples(self):
+    with tempfile.TemporaryDirectory() as work_folder:
+      path_XML = os.path.join(work_folder, 'input.xml')
+      with open(path_XML, 'w') as f:
+        f.write(XML_WITH_WHITESPACE)
+      with contextlib.redirect_stdout(io.StringIO()):
+        triple_sets = list(iter_info_from_WebNLG_XML(path_XML))
+    self.assertEqual([[triple.DBsubj, triple.DBprop, triple.DBobj] for triple in triple_sets[0].triples], [['Adam_West', 'birthPlace', 'Walla_Walla'], ['Adam_West', 'occupation', 'Actor']])
+
+if __name__ == '__main__':
+  unittest.main()
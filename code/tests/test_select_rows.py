@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Checks that select_rows_columnar selects the same rows as select_rows, with and without the NumPy 2 StringDType.
+# Run from the root of the repository: python -m pytest code/tests
+import os
+import sys
+import types
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import queryDBpediaProps
+from queryDBpediaProps import select_rows, select_rows_columnar, select_triple_rows, COLUMNAR_MIN_ROWS
+
+def make_results(num_rows, prop_names):
+  """ DBpedia-like result rows: ontology properties taken in turn from prop_names, and a mix of resource, literal and empty values. """
+  results = []
+  for i in range(num_rows):
+    value = ['http://dbpedia.org/resource/Place_%d' % i, 'literal %d' % i, ''][i % 3]
+    results.append({"property": {"value": 'http://dbpedia.org/ontology/' + prop_names[i % len(prop_names)]}, "value": {"value": value}})
+  return results
+
+@unittest.skipIf(queryDBpediaProps.numpy is None, 'NumPy is not installed')
+class TestSelectRowsColumnar(unittest.TestCase):
+  def assert_same_rows(self, results, list_properties, ignore_properties_list):
+    for entity_is_sbjORobj in ['Subj', 'Obj']:
+      expected_rows = select_rows(results, 'Entity', 'Ontology', list_properties, ignore_properties_list, entity_is_sbjORobj=entity_is_sbjORobj)
+      self.assertEqual(select_rows_columnar(results, 'Entity', 'Ontology', list_properties, ignore_properties_list, entity_is_sbjORobj=entity_is_sbjORobj), expected_rows)
+      self.assertEqual(select_triple_rows(results, 'Entity', 'Ontology', list_properties, ignore_properties_list, entity_is_sbjORobj=entity_is_sbjORobj), expected_rows)
+
+  def test_some_rows_kept(self):
+    results = make_results(COLUMNAR_MIN_ROWS, ['birthPlace', 'deathPlace', 'abstract'])
+    self.assert_same_rows(results, ['birthPlace', 'abstract'], ['abstract'])
+
+  def test_no_row_kept(self):
+    results = make_results(COLUMNAR_MIN_ROWS, ['birthPlace', 'deathPlace'])
+    self.assert_same_rows(results, ['nationality'], [])
+    self.assertEqual(select_rows_columnar(results, 'Entity', 'Ontology', ['birthPlace'], ['birthPlace']), [])
+
+  def test_without_string_dtype(self):
+    # NumPy < 2 has no StringDType: the fixed-width str dtype is used instead
+    with mock.patch.object(queryDBpediaProps.numpy, 'dtypes', types.SimpleNamespace()):
+      self.assert_same_rows(make_results(COLUMNAR_MIN_ROWS, ['birthPlace', 'deathPlace']), ['birthPlace'], [])
+      self.assert_same_rows(make_results(COLUMNAR_MIN_ROWS, ['birthPlace', 'deathPlace']), ['nationality'], [])
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Checks that sort_triple_set orders the triples as the original version, which searched the whole triple set for each entity.
+# Run from the root of the repository: python -m pytest code/tests
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils import TripleSet, Triple_withID, sort_triple_set
+
+def sort_triple_set_reference(triple_set, dico_count_occurrences_dbp_props):
+  """ Original (quadratic) version of sort_triple_set; returns the ids of the triples in their sorted order. """
+  list_triple_indices = []
+  for entity_name in triple_set.entities_by_frequency:
+    list_keys_Subj = [[f'http://dbpedia.org/ontology/{triple.DBprop}', triple.id] for triple in triple_set.triples if triple.DBsubj == entity_name]
+    list_keys_Obj = [[f'http://dbpedia.org/ontology/{triple.DBprop}', triple.id] for triple in triple_set.triples if triple.DBobj == entity_name]
+    sorted_list_keys_Subj = sorted(list_keys_Subj, key=lambda x: dico_count_occurrences_dbp_props[x[0]], reverse=True)
+    sorted_list_keys_Obj = sorted(list_keys_Obj, key=lambda x: dico_count_occurrences_dbp_props[x[0]], reverse=True)
+    for key_Subj in sorted_list_keys_Subj:
+      if key_Subj[1] not in list_triple_indices:
+        list_triple_indices.append(key_Subj[1])
+    for key_Obj in sorted_list_keys_Obj:
+      if key_Obj[1] not in list_triple_indices:
+        list_triple_indices.append(key_Obj[1])
+  return list_triple_indices
+
+def make_random_triple_set(rng, num_triples, num_entities, props):
+  """ Random triple set in which some triples are repeated, and entities can be subject of one triple and object of another. """
+  entities = [f'Entity_{i}' for i in range(num_entities)]
+  triples = []
+  for triple_id in range(num_triples):
+    if len(triples) > 0 and rng.random() < 0.2:
+      # Duplicate of a previous triple, with its own id
+      previous_triple = rng.choice(triples)
+      triples.append(Triple_withID(previous_triple.DBprop, previous_triple.DBsubj, previous_triple.DBobj, triple_id))
+    else:
+      triples.append(Triple_withID(rng.choice(props), rng.choice(entities), rng.choice(entities), triple_id))
+  return TripleSet(triples, 'Cat', 'Id1', '', '')
+
+class TestSortTripleSet(unittest.TestCase):
+  def test_same_order_as_reference(self):
+    rng = random.Random(6)
+    props = [f'prop{i}' for i in range(8)]
+    for _ in range(300):
+      # Few distinct counts, so that many properties are tied
+      dico_count = {f'http://dbpedia.org/ontology/{prop}': rng.choice([1, 5, 5, 20]) for prop in props}
+      triple_set = make_random_triple_set(rng, rng.randint(1, 40), rng.randint(1, 8), props)
+      new_triple_set = sort_triple_set(triple_set, dico_count)
+      self.assertEqual([triple.id for triple in new_triple_set.triples], sort_triple_set_reference(triple_set, dico_count))
+      self.assertEqual(new_triple_set.size, triple_set.size)
+
+  def test_all_counts_tied(self):
+    triples = [Triple_withID('b', 'Hub', 'X', 0), Triple_withID('a', 'Hub', 'Y', 1), Triple_withID('b', 'Hub', 'X', 2), Triple_withID('c', 'Z', 'Hub', 3)]
+    triple_set = TripleSet(triples, 'Cat', 'Id1', '', '')
+    dico_count = {f'http://dbpedia.org/ontology/{prop}': 1 for prop in ['a', 'b', 'c']}
+    new_triple_set = sort_triple_set(triple_set, dico_count)
+    self.assertEqual([triple.id for triple in new_triple_set.triples], sort_triple_set_reference(triple_set, dico_count))
+    self.assertEqual([triple.id for triple in new_triple_set.triples], [0, 1, 2, 3])
+
+if __name__ == '__main__':
+  unittest.main()
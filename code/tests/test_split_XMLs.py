@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Checks that split_XMLs writes the same files with a pool of processes as with the sequential loop.
+# Run from the root of the repository: python -m pytest code/tests
+import os
+import sys
+import io
+import tempfile
+import unittest
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils import split_XMLs
+from benchmark_utils import make_triple_sets, write_WebNLG_XML, path_DBprops_count
+
+def read_tree(folder):
+  """ Returns {relative path: contents} for all the files under folder. """
+  tree = {}
+  for root, _, file_names in os.walk(folder):
+    for file_name in file_names:
+      path = os.path.join(root, file_name)
+      with open(path, 'r') as f:
+        tree[os.path.relpath(path, folder)] = f.read()
+  return tree
+
+class TestSplitXMLsParallel(unittest.TestCase):
+  def run_split(self, triple_sets, max_num_triples, num_workers, single_XML = False):
+    with tempfile.TemporaryDirectory() as work_folder:
+      path_XML = os.path.join(work_folder, 'input.xml')
+      write_WebNLG_XML(triple_sets, path_XML)
+      path_save_XMLs = os.path.join(work_folder, 'split')
+      with contextlib.redirect_stdout(io.StringIO()):
+        split_XMLs(path_XML, path_DBprops_count, max_num_triples, path_save_XMLs, single_XML=single_XML, num_workers=num_workers, chunk_size=2)
+      return read_tree(path_save_XMLs)
+
+  def assert_same_output(self, triple_sets, max_num_triples):
+    for single_XML in [False, True]:
+      sequential_tree = self.run_split(triple_sets, max_num_triples, 1, single_XML)
+      parallel_tree = self.run_split(triple_sets, max_num_triples, 2, single_XML)
+      self.assertEqual(sorted(sequential_tree), sorted(parallel_tree))
+      self.assertEqual(sequential_tree, parallel_tree)
+
+  def test_random_triple_sets(self):
+    for shape in ['hub', 'small']:
+      self.assert_same_output(make_triple_sets(300, shape, seed=3), 10)
+
+  def test_empty_slice(self):
+    # 1 subject triple and 29 incoming starring triples: get_split_boundaries gives an empty slice, written as Ukn.xml in both modes
+    triple_sets = [[['Hub', 'birthPlace', 'Dublin']] + [[f'Film_{i}', 'starring', 'Hub'] for i in range(29)]]
+    sequential_tree = self.run_split(triple_sets, 10, 1)
+    self.assertIn(os.path.join('Cat0_max10', 'Ukn.xml'), sequential_tree)
+    self.assert_same_output(triple_sets, 10)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -1,13 +1,17 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import os
+import sys
 import shutil
 import codecs
 import json
-from xml.dom import minidom
+import hashlib
+from xml.etree import ElementTree
 import re
 import glob
-import xmltodict
+import io
+import itertools
+import concurrent.futures
 from colored import Fore, Back, Style
 # from google.colab import files
 
@@ -36,10 +40,13 @@ class TripleSet:
     # print(self.entities_by_frequency)
 
 class Triple_withID:
+  __slots__ = ('DBprop', 'DBsubj', 'DBobj', 'id')
+
   def __init__(self, prop, subj_value, obj_value, triple_id):
-    self.DBprop = prop
-    self.DBsubj = subj_value
-    self.DBobj = obj_value
+    # The same properties and entities occur in many triples of a WebNLG file; interning stores each name once
+    self.DBprop = sys.intern(prop) if type(prop) is str else prop
+    self.DBsubj = sys.intern(subj_value) if type(subj_value) is str else subj_value
+    self.DBobj = sys.intern(obj_value) if type(obj_value) is str else obj_value
     self.id = triple_id
     
 def clear_files(folder):
@@ -130,66 +137,96 @@ def removeReservedCharsFileName(entityName):
     newEntityName = re.sub(r'[#%&\{\}\\<>\*\?/ \$!\'":@\+`\|=]', "", newEntityName)
   return newEntityName
 
-def create_xml(triple_objects, properties_selected_by_user, input_category, triple2predArgPath, entity_name = None, eid = 1):
-  """ Create the XML file with the triples to be converted to PredArg. """
+# Beginning and end of the XML files, around the entries
+XML_HEADER = '<?xml version="1.0" ?>\n<benchmark>\n  <entries>\n'
+XML_FOOTER = '  </entries>\n</benchmark>\n'
+
+def escape_xml_data(text):
+  """ Escapes text and attribute values the same way as xml.dom.minidom. """
+  return text.replace("&", "&amp;").replace("<", "&lt;").replace("\"", "&quot;").replace(">", "&gt;")
+
+def get_selected_triples_text(triple_objects, properties_selected_by_user):
+  """ Returns the selected triples in text format, as listed by create_xml. """
+  selected_indices = set(properties_selected_by_user)
+  return [f'{triple_object.DBsubj} | {triple_object.DBprop} | {triple_object.DBobj}' for x, triple_object in enumerate(triple_objects) if x in selected_indices]
+
+def write_xml_entry(fo, triple_objects, properties_selected_by_user, input_category, eid = 1):
+  """
+  Writes an entry element with the selected triples to fo, laid out as minidom's toprettyxml(indent="  ") would inside a benchmark document.
+  properties_selected_by_user can be a list, a set or any container of triple indices.
+  Returns the list of triples in text format.
+  """
   n = len(properties_selected_by_user)
-  list_triples_text = []
-  # Create nodes
-  root = minidom.Document()
-  xml = root.createElement('benchmark')
-  entries = root.createElement('entries')
-  entry = root.createElement('entry')
-  original_ts = root.createElement('originaltripleset')
-  modified_ts = root.createElement('modifiedtripleset')
-  lex = root.createElement('lex')
-  # Create structure between nodes
-  root.appendChild(xml)
-  xml.appendChild(entries)
-  entries.appendChild(entry)
-  entry.appendChild(original_ts)
-  entry.appendChild(modified_ts)
-  entry.appendChild(lex)
-  # Create main attributes
-  entry.setAttribute('category', str(input_category))
-  entry.setAttribute('eid', str(eid))
-  entry.setAttribute('shape', '(X (X) (X) (X) (X))')
-  entry.setAttribute('shape-type', 'sibling')
-  entry.setAttribute('size', str(n))
-  # Create lex attributes
-  lex.setAttribute('comment', '')
-  lex.setAttribute('lid', 'id1')
-  lex.setAttribute('lang', 'ga')
-  fake_text = root.createTextNode('Some Irish text.')
-  lex.appendChild(fake_text)
-  # Fill in otriple and mtriple fields with the same info
-  x = 0
+  list_triples_text = get_selected_triples_text(triple_objects, properties_selected_by_user)
+  fo.write(f'    <entry category="{escape_xml_data(str(input_category))}" eid="{escape_xml_data(str(eid))}" shape="(X (X) (X) (X) (X))" shape-type="sibling" size="{n}">\n')
+  for tripleset_tag, triple_tag in [['originaltripleset', 'otriple'], ['modifiedtripleset', 'mtriple']]:
+    if len(list_triples_text) == 0:
+      fo.write(f'      <{tripleset_tag}/>\n')
+    else:
+      fo.write(f'      <{tripleset_tag}>\n')
+      for triple_text in list_triples_text:
+        fo.write(f'        <{triple_tag}>{escape_xml_data(triple_text)}</{triple_tag}>\n')
+      fo.write(f'      </{tripleset_tag}>\n')
+  fo.write('      <lex comment="" lid="id1" lang="ga">Some Irish text.</lex>\n')
+  fo.write('    </entry>\n')
+  return list_triples_text
+
+def get_xml_file_name(triple_objects, entity_name = None):
+  """ Name of the file written by create_xml (also used by the parallel mode of split_XMLs, so that both name their files the same way). """
+  # If there is no info about the entity, use the first triple's subject as filename; with no triples at all, the name is Ukn
   dbsubj = 'Ukn'
-  while x < len(triple_objects):
-  # for triple_object in triple_objects:
-    triple_object = triple_objects[x]
-    # If there is no info about the entity, use the first triple's subject as filename
-    if x == 0:
-      if entity_name == None:
-        dbsubj = str(triple_object.DBsubj)
-      else:
-        dbsubj = entity_name
-    if x in properties_selected_by_user:
-      text1 = root.createTextNode(triple_object.DBsubj+' | '+triple_object.DBprop+' | '+triple_object.DBobj)
-      list_triples_text.append(f'{triple_object.DBsubj} | {triple_object.DBprop} | {triple_object.DBobj}')
-      otriple = root.createElement('otriple')
-      original_ts.appendChild(otriple)
-      otriple.appendChild(text1)
-      text2 = root.createTextNode(triple_object.DBsubj+' | '+triple_object.DBprop+' | '+triple_object.DBobj)
-      mtriple = root.createElement('mtriple')
-      modified_ts.appendChild(mtriple)
-      mtriple.appendChild(text2)
-    x += 1
-  xml_str = root.toprettyxml(indent ="  ")
-  save_path_file = os.path.join(triple2predArgPath, str(removeReservedCharsFileName(dbsubj))+".xml")
+  if len(triple_objects) > 0:
+    if entity_name == None:
+      dbsubj = str(triple_objects[0].DBsubj)
+    else:
+      dbsubj = entity_name
+  return str(removeReservedCharsFileName(dbsubj))+".xml"
+
+def create_xml(triple_objects, properties_selected_by_user, input_category, triple2predArgPath, entity_name = None, eid = 1):
+  """ Create the XML file with the triples to be converted to PredArg. """
+  save_path_file = os.path.join(triple2predArgPath, get_xml_file_name(triple_objects, entity_name))
+  # The file is written directly, with the same layout as minidom's toprettyxml
   with open(save_path_file, "w") as f:
-      f.write(xml_str)
+    f.write(XML_HEADER)
+    list_triples_text = write_xml_entry(f, triple_objects, properties_selected_by_user, input_category, eid)
+    f.write(XML_FOOTER)
   return list_triples_text 
 
+def create_xml_batch(entries, save_path_file):
+  """
+  Writes many entries in a single benchmark XML file, in one pass.
+  entries: iterable of (triple_objects, properties_selected_by_user, input_category, eid) tuples, as passed to create_xml.
+  Returns the number of entries and the number of triples written.
+  """
+  number_of_entries = 0
+  number_of_triples = 0
+  with open(save_path_file, "w") as f:
+    f.write(XML_HEADER)
+    for triple_objects, properties_selected_by_user, input_category, eid in entries:
+      list_triples_text = write_xml_entry(f, triple_objects, properties_selected_by_user, input_category, eid)
+      number_of_entries += 1
+      number_of_triples += len(list_triples_text)
+    f.write(XML_FOOTER)
+  return number_of_entries, number_of_triples
+
+def get_file_version(path):
+  """ Returns the sha256 of a file's contents, or None if the file does not exist. """
+  if not os.path.isfile(path):
+    return None
+  file_hash = hashlib.sha256()
+  with open(path, 'rb') as f:
+    for block in iter(lambda: f.read(1 << 20), b''):
+      file_hash.update(block)
+  return file_hash.hexdigest()
+
+def get_generation_fingerprint(list_triples_text, language, input_category, resource_versions):
+  """
+  Returns a fingerprint (sha256) of everything a generated text depends on: the selected triples in text format (in order), the language, the category,
+  and resource_versions, a dict {resource name: version} (e.g. from get_file_version) for the grammars, templates and tools used.
+  """
+  contents = {'triples': list(list_triples_text), 'language': language, 'category': input_category, 'resources': resource_versions}
+  return hashlib.sha256(json.dumps(contents, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
 def create_GPT_Prompt(entity_name, language, list_triples_text, dest_folder):
   language_map = {'EN': 'English', 'GA': 'Irish', 'ES': 'Spanish'}
   if not os.path.exists(dest_folder):
@@ -356,192 +393,279 @@ def balanced_split_with_max(N1, N2):
       result = [base + 1] * remainder + [base] * (k - remainder)
       return result
 
+def iter_info_from_WebNLG_XML (path_input_XML):
+  """
+  path_input_XML: Path to an XML file that contains triple sets, e.g. as provided in the WebNLG shared tasks.
+  Generator that yields one TripleSet object per entry of the file. Each object contains as attributes: triples (a list of Triple objects), category, eid, size, shape, main_entity
+  The file is parsed incrementally and each entry is discarded once read, so memory use does not depend on the number of entries.
+  """
+  print(f'    Reading file {path_input_XML}..')
+  number_of_inputs = 0
+  total_number_of_triples = 0
+  entries_element = None
+  for event, element in ElementTree.iterparse(path_input_XML, events=('start', 'end')):
+    if event == 'start':
+      if element.tag == 'entries':
+        entries_element = element
+      continue
+    if element.tag != 'entry':
+      continue
+    category = element.get('category')
+    eid = element.get('eid')
+    size = element.get('size')
+    shape = element.get('shape')
+    shape_type = element.get('shape-type')
+    # mtriples_list will be a list of objects of class Triple
+    mtriples_list = []
+    # Get modified triples
+    for triple_id, mtriple_element in enumerate(element.findall('modifiedtripleset/mtriple')):
+      # Surrounding whitespace is dropped, as xmltodict did
+      mtriple = (mtriple_element.text or '').strip()
+      triple_object = Triple_withID(mtriple.split(' | ')[1], mtriple.split(' | ')[0], mtriple.split(' | ')[2], triple_id)
+      mtriples_list.append(triple_object)
+    assert int(size) == len(mtriples_list), f'Error: found size {size} but found {len(mtriples_list)} triples.'
+    number_of_inputs += 1
+    total_number_of_triples += len(mtriples_list)
+    # Free the entries read so far before passing on the triple set
+    if entries_element is not None:
+      entries_element.clear()
+    else:
+      element.clear()
+    # Create object of class TripleSet
+    yield TripleSet(mtriples_list, category, eid, shape, shape_type)
+
+  print(f"      There are {number_of_inputs} inputs in the original XML file.")
+  print(f"      There are {total_number_of_triples} input triples in the original XML file.")
+
 def extract_info_from_WebNLG_XML (path_input_XML):
   """
   path_input_XML: Path to an XML file that contains triple sets, e.g. as provided in the WebNLG shared tasks.
   returns a list of TripleSet objects. Each object contains as attributes: triples (a list of Triple objects), category, eid, size, shape, main_entity
   """
-  with codecs.open(path_input_XML, 'r', 'utf-8') as file:
-    XML_file = file.read()
-    XML_dict = xmltodict.parse(XML_file)
-    print(f'    Reading file {path_input_XML}..')
-    # triple_sets_list will be a list of objects of class TripleSet
-    total_number_of_triples = 0
-    triple_sets_list = []    
-    if isinstance(XML_dict['benchmark']['entries']['entry'], list):
-      print(f"      There are {len(XML_dict['benchmark']['entries']['entry'])} inputs in the original XML file.")
-      for entry in XML_dict['benchmark']['entries']['entry']:
-        category = entry['@category']
-        eid = entry['@eid']
-        size = entry['@size']
-        shape = entry['@shape']
-        shape_type = entry['@shape-type']
-        # mtriples_list will be a list of objects of class Triple
-        mtriples_list = []
-        # Get modified triples
-        if isinstance(entry['modifiedtripleset']['mtriple'], list):
-          for triple_id, mtriple in enumerate(entry['modifiedtripleset']['mtriple']):
-            triple_object = Triple_withID(mtriple.split(' | ')[1], mtriple.split(' | ')[0], mtriple.split(' | ')[2], triple_id)
-            mtriples_list.append(triple_object)
-        else:
-          mtriples_list.append(entry['modifiedtripleset']['mtriple'])
-        assert int(size) == len(mtriples_list), f'Error: found size {size} but found {len(mtriples_list)} triples.'
-        total_number_of_triples += len(mtriples_list)
-        # Create object of class TripleSet
-        tripleSet_object = TripleSet(mtriples_list, category, eid, shape, shape_type)
-        triple_sets_list.append(tripleSet_object)
-    else:
-      print(f"      There is 1 input in the original XML file.")
-      category = XML_dict['benchmark']['entries']['entry']['@category']
-      eid = XML_dict['benchmark']['entries']['entry']['@eid']
-      size = XML_dict['benchmark']['entries']['entry']['@size']
-      shape = XML_dict['benchmark']['entries']['entry']['@shape']
-      shape_type = XML_dict['benchmark']['entries']['entry']['@shape-type']
-      # Block repeated from above
-      # mtriples_list will be a list of objects of class Triple
-      mtriples_list = []
-      # Get modified triples
-      if isinstance(XML_dict['benchmark']['entries']['entry']['modifiedtripleset']['mtriple'], list):
-        for triple_id, mtriple in enumerate(XML_dict['benchmark']['entries']['entry']['modifiedtripleset']['mtriple']):
-          triple_object = Triple_withID(mtriple.split(' | ')[1], mtriple.split(' | ')[0], mtriple.split(' | ')[2], triple_id)
-          mtriples_list.append(triple_object)
-      else:
-        mtriples_list.append(XML_dict['benchmark']['entries']['entry']['modifiedtripleset']['mtriple'])
-      assert int(size) == len(mtriples_list), f'Error: found size {size} but found {len(mtriples_list)} triples.'
-      total_number_of_triples += len(mtriples_list)
-      # Create object of class TripleSet
-      tripleSet_object = TripleSet(mtriples_list, category, eid, shape, shape_type)
-      triple_sets_list.append(tripleSet_object)
+  return list(iter_info_from_WebNLG_XML(path_input_XML))
 
-    print(f"      There are {total_number_of_triples} input triples in the original XML file.")
+def sort_triple_set(triple_set, dico_count_occurrences_dbp_props):
+  """ Returns a new TripleSet in which the triples of triple_set are sorted by frequency of entity in the triple set, and by frequency of property on DBpedia. """
+  # print(triple_set.eid, triple_set.category, triple_set.size, triple_set.entities_by_frequency[0])
+  # Make a list where we will store the order of the triples using their index in the triple_set list
+  # E.g. list_triple_indices = [0, 4, 5, 2, 3, 1]
+  list_triple_indices = []
+  # Set with the same indices, to avoid duplicated triples without searching the list
+  seen_triple_indices = set()
+  # Index the triples by subject and by object once, as lists of [property label with the http://dbpedia.org/ontology/ prefix, triple id], in the order of the triple set
+  dico_triples_by_Subj = {}
+  dico_triples_by_Obj = {}
+  for triple in triple_set.triples:
+    dico_triples_by_Subj.setdefault(triple.DBsubj, []).append([f'http://dbpedia.org/ontology/{triple.DBprop}', triple.id])
+    dico_triples_by_Obj.setdefault(triple.DBobj, []).append([f'http://dbpedia.org/ontology/{triple.DBprop}', triple.id])
+  # Process entities by their respective importance in the triple set, so the most frequently found entity will go first, the second most frequently found will go second, and so on.
+  for entity_name in triple_set.entities_by_frequency:
+    # print(f'  {entity_name}')
+    # Get the list of properties where the entity is subject, and the one with the properties where the entity is object
+    # The properties in the ..._Subj list will go first, the properties in the ..._Obj list will go after. 
+    list_dico_count_occurrences_dbp_props_keys_Subj = dico_triples_by_Subj.get(entity_name, [])
+    list_dico_count_occurrences_dbp_props_keys_Obj = dico_triples_by_Obj.get(entity_name, [])
+    # Order that list according to the count in path_DBprops_count
+    sorted_list_dico_count_occurrences_dbp_props_keys_Subj = sorted(list_dico_count_occurrences_dbp_props_keys_Subj, key=lambda x: dico_count_occurrences_dbp_props[x[0]], reverse=True)
+    sorted_list_dico_count_occurrences_dbp_props_keys_Obj = sorted(list_dico_count_occurrences_dbp_props_keys_Obj, key=lambda x: dico_count_occurrences_dbp_props[x[0]], reverse=True)
+    # print(f'    {sorted_list_dico_count_occurrences_dbp_props_keys_Subj}')
+    # print(f'    {sorted_list_dico_count_occurrences_dbp_props_keys_Obj}')
+    # Now put all the triple indices for the current entity in list_triple_indices, starting with the triples in which the entity is subject
+    for list_triple_indices_Subj in sorted_list_dico_count_occurrences_dbp_props_keys_Subj:
+      # To avoid duplicated triples:
+      if list_triple_indices_Subj[1] not in seen_triple_indices:
+        seen_triple_indices.add(list_triple_indices_Subj[1])
+        list_triple_indices.append(list_triple_indices_Subj[1])
+    for list_triple_indices_Obj in sorted_list_dico_count_occurrences_dbp_props_keys_Obj:
+      if list_triple_indices_Obj[1] not in seen_triple_indices:
+        seen_triple_indices.add(list_triple_indices_Obj[1])
+        list_triple_indices.append(list_triple_indices_Obj[1])
 
-  return triple_sets_list
+  #Now add the triples in a list, ordering the triples as defined in list_triple_indices (the create_xml function expects the triples ordered already)
+  new_triples_list = [triple_set.triples[i] for i in list_triple_indices]
+  assert len(new_triples_list) == len(triple_set.triples), f'Expected {len(triple_set.triples)} triples, found {len(new_triples_list)}'
+  # print(len(new_triples_list), [new_triples_list[x].id for x in range(len(new_triples_list))])
+  return TripleSet(new_triples_list, triple_set.category, triple_set.eid, triple_set.shape, triple_set.shape_type)
 
-def sort_WebNLG_XMLs (path_input_XML, path_DBprops_count):
+def iter_sorted_WebNLG_XMLs (path_input_XML, path_DBprops_count):
   """
-  path_input_XML: Path to an XML file that contains triple sets, e.g. as provided in the WebNLG shared tasks. The code expects that all triples mention the same entity, as subject or object.
-  path_DBprops_count: Path to a json file that contains DBpedia properties as keys (e.g. "http://dbpedia.org/ontology/birthPlace") and number of occurrences on DBpedia as values (e.g 1486579).
-  This function returns a list of TripleSets objects. TripleSet.triples contains Triple objects; in each triple set, Triple objects are sorted by "importance" (i.e. sorted by frequency of entity in the triple set, and by frequency of property on DBpedia)
+  Generator version of sort_WebNLG_XMLs: reads the triple sets one at a time from path_input_XML and yields them sorted.
   """
   print('  Sorting triples sets by frequency of entity in the triple set, and by frequency of respective properties on DBpedia...')
   dico_count_occurrences_dbp_props = json.loads(codecs.open(path_DBprops_count, 'r', 'utf-8').read())
-  triple_sets_list = extract_info_from_WebNLG_XML (path_input_XML)
-  new_triple_set_Objects_list = []
+  number_of_triple_sets = 0
   total_number_of_triples = 0
-  for triple_set in triple_sets_list:
-    # print(triple_set.eid, triple_set.category, triple_set.size, triple_set.entities_by_frequency[0])
-    # Make a list where we will store the order of the triples using their index in the triple_set list
-    # E.g. list_triple_indices = [0, 4, 5, 2, 3, 1]
-    list_triple_indices = []
-    # Process entities by their respective importance in the triple set, so the most frequently found entity will go first, the second most frequently found will go second, and so on.
-    for entity_name in triple_set.entities_by_frequency:
-      # print(f'  {entity_name}')
-      # Make a list of property labels with the http://dbpedia.org/ontology/ prefix, one with the properties where the entity is subject, and one with the properties where the entity is object
-      # The properties in the ..._Subj list will go first, the properties in the ..._Obj list will go after. 
-      list_dico_count_occurrences_dbp_props_keys_Subj = [[f'http://dbpedia.org/ontology/{triple.DBprop}', triple.id] for triple in triple_set.triples if triple.DBsubj == entity_name]
-      list_dico_count_occurrences_dbp_props_keys_Obj = [[f'http://dbpedia.org/ontology/{triple.DBprop}', triple.id] for triple in triple_set.triples if triple.DBobj == entity_name]
-      # Order that list according to the count in path_DBprops_count
-      sorted_list_dico_count_occurrences_dbp_props_keys_Subj = sorted(list_dico_count_occurrences_dbp_props_keys_Subj, key=lambda x: dico_count_occurrences_dbp_props[x[0]], reverse=True)
-      sorted_list_dico_count_occurrences_dbp_props_keys_Obj = sorted(list_dico_count_occurrences_dbp_props_keys_Obj, key=lambda x: dico_count_occurrences_dbp_props[x[0]], reverse=True)
-      # print(f'    {sorted_list_dico_count_occurrences_dbp_props_keys_Subj}')
-      # print(f'    {sorted_list_dico_count_occurrences_dbp_props_keys_Obj}')
-      # Now put all the triple indices for the current entity in list_triple_indices, starting with the triples in which the entity is subject
-      for list_triple_indices_Subj in sorted_list_dico_count_occurrences_dbp_props_keys_Subj:
-        # To avoid duplicated triples:
-        if list_triple_indices_Subj[1] not in list_triple_indices:
-          list_triple_indices.append(list_triple_indices_Subj[1])
-      for list_triple_indices_Obj in sorted_list_dico_count_occurrences_dbp_props_keys_Obj:
-        if list_triple_indices_Obj[1] not in list_triple_indices:
-          list_triple_indices.append(list_triple_indices_Obj[1])
-
-    #Now add the triples in a list, ordering the triples as defined in list_triple_indices (the create_xml function expects the triples ordered already)
-    new_triples_list = [triple_set.triples[i] for i in list_triple_indices]
-    assert len(new_triples_list) == len(triple_set.triples), f'Expected {len(triple_set.triples)} triples, found {len(new_triples_list)}'
-    total_number_of_triples += len(new_triples_list)
-    # print(len(new_triples_list), [new_triples_list[x].id for x in range(len(new_triples_list))])
-    new_triple_set_Objects_list.append(TripleSet(new_triples_list, triple_set.category, triple_set.eid, triple_set.shape, triple_set.shape_type))
-  assert len(new_triple_set_Objects_list) == len(triple_sets_list), f'Expected {len(triple_sets_list)} triple sets, found {len(new_triple_set_Objects_list)}'
-  print(f'    There are {len(new_triple_set_Objects_list)} sorted triple sets...')
+  for triple_set in iter_info_from_WebNLG_XML(path_input_XML):
+    new_triple_set = sort_triple_set(triple_set, dico_count_occurrences_dbp_props)
+    number_of_triple_sets += 1
+    total_number_of_triples += new_triple_set.size
+    yield new_triple_set
+  print(f'    There are {number_of_triple_sets} sorted triple sets...')
   print(f'    There are {total_number_of_triples} input triples in the sorted XML file.')
 
-  return new_triple_set_Objects_list
-
-def split_XMLs (path_input_XML, path_DBprops_count, max_num_triples, path_save_XMLs, DEBUG = False):
+def sort_WebNLG_XMLs (path_input_XML, path_DBprops_count):
   """
   path_input_XML: Path to an XML file that contains triple sets, e.g. as provided in the WebNLG shared tasks. The code expects that all triples mention the same entity, as subject or object.
   path_DBprops_count: Path to a json file that contains DBpedia properties as keys (e.g. "http://dbpedia.org/ontology/birthPlace") and number of occurrences on DBpedia as values (e.g 1486579).
-  max_num_triples: the maximum number of triples desired in an XML
-  path_save_XMLs: the path where the output XMLs should be created
-  This function creates individual XML files for each split triple set.
+  This function returns a list of TripleSets objects. TripleSet.triples contains Triple objects; in each triple set, Triple objects are sorted by "importance" (i.e. sorted by frequency of entity in the triple set, and by frequency of property on DBpedia)
   """
-  print('Splitting XML file...')
-  clear_folder(path_save_XMLs)
-  os.makedirs(path_save_XMLs)
-  # Get the list of TripleSet objects with the triples re-ordered. The object contains the following:
-  # self.triples, self.category, self.eid, self.size, self.shape, self.shape_type, self.entities_by_frequency
-  new_triple_set_Objects_list = sort_WebNLG_XMLs(path_input_XML, path_DBprops_count)
-  total_number_of_XMLs = 0
-  total_number_of_triples = 0
-  for new_triple_set in new_triple_set_Objects_list:
-    if DEBUG:
-      print(new_triple_set.size, new_triple_set.entities_by_frequency[0])
-    # Get "ideal" triple set split (see balanced_split_with_max function)
-    even_slices = None
-    if new_triple_set.size > max_num_triples:
-      # balanced_split_with_max returns a sequence of numbers that stand for a number of properties.
-      groups = balanced_split_with_max(new_triple_set.size, max_num_triples)
-      # Let's convert that to a sequence of numbers that correspond to list slices: [10, 10, 5] becomes [10, 20, 25]
-      even_slices = [sum(groups[:i]) for i in range(len(groups)+1)]
-    else:
-      even_slices = [0] + [new_triple_set.size]
-    if DEBUG:
-      print(f'  Before: {even_slices}')
-
-    # Initialise new list
-    new_slices = [0]
-    # Now we need to check if the split happened between two occurrences of the same property, which we'd like to avoid
-    # even_slices has at least 2 numbers, 0 and the end of the first or only slice.
-    if len(even_slices) > 2:
-      # Check for intermediate group boundaries (i.e. exclude the first boundary, which is 0, and the last one, because there is no property after it)
-      for boundary in even_slices[1:-1]:
-        previous_same_property = 0
-        # Since in the way even_slices is built, the last slices are the smallest ones, it's better to move boundaries to the left.
-        while new_triple_set.triples[boundary+previous_same_property].DBprop == new_triple_set.triples[boundary+previous_same_property-1].DBprop:
-          previous_same_property -= 1
-        if previous_same_property < 0:
-          new_slices.append(boundary+previous_same_property)
-          if DEBUG:
-            print(f'  {Fore.red}{Back.yellow}!!! Changed split {boundary}, {previous_same_property}!{Style.reset}')
-        else:
-          new_slices.append(boundary)
-      # Add last boundary
-      new_slices.append(even_slices[-1])
-    else:
-      # Add second and last boundary
-      new_slices.append(even_slices[1])
-    if DEBUG:
-      print(f'  After: {new_slices}')
+  return list(iter_sorted_WebNLG_XMLs(path_input_XML, path_DBprops_count))
 
-    # Create XMLs
+def get_split_boundaries(new_triple_set, max_num_triples, DEBUG = False):
+  """ Returns the list of boundaries (as list slice indices) of the chunks of at most about max_num_triples triples in which a sorted triple set is split, e.g. [0, 17, 34, 50]. """
+  if DEBUG:
+    print(new_triple_set.size, new_triple_set.entities_by_frequency[0])
+  # Get "ideal" triple set split (see balanced_split_with_max function)
+  even_slices = None
+  if new_triple_set.size > max_num_triples:
+    # balanced_split_with_max returns a sequence of numbers that stand for a number of properties.
+    groups = balanced_split_with_max(new_triple_set.size, max_num_triples)
+    # Let's convert that to a sequence of numbers that correspond to list slices: [10, 10, 5] becomes [10, 20, 25]
+    even_slices = [sum(groups[:i]) for i in range(len(groups)+1)]
+  else:
+    even_slices = [0] + [new_triple_set.size]
+  if DEBUG:
+    print(f'  Before: {even_slices}')
+
+  # Initialise new list
+  new_slices = [0]
+  # Now we need to check if the split happened between two occurrences of the same property, which we'd like to avoid
+  # even_slices has at least 2 numbers, 0 and the end of the first or only slice.
+  if len(even_slices) > 2:
+    # Check for intermediate group boundaries (i.e. exclude the first boundary, which is 0, and the last one, because there is no property after it)
+    for boundary in even_slices[1:-1]:
+      previous_same_property = 0
+      # Since in the way even_slices is built, the last slices are the smallest ones, it's better to move boundaries to the left.
+      while new_triple_set.triples[boundary+previous_same_property].DBprop == new_triple_set.triples[boundary+previous_same_property-1].DBprop:
+        previous_same_property -= 1
+      if previous_same_property < 0:
+        new_slices.append(boundary+previous_same_property)
+        if DEBUG:
+          print(f'  {Fore.red}{Back.yellow}!!! Changed split {boundary}, {previous_same_property}!{Style.reset}')
+      else:
+        new_slices.append(boundary)
+    # Add last boundary
+    new_slices.append(even_slices[-1])
+  else:
+    # Add second and last boundary
+    new_slices.append(even_slices[1])
+  if DEBUG:
+    print(f'  After: {new_slices}')
+  return new_slices
+
+def iter_split_triple_sets(triple_sets, max_num_triples, DEBUG = False):
+  """
+  Splits each sorted triple set into chunks of at most about max_num_triples triples.
+  Yields, for each chunk: the name of the folder it goes to, its unique name, its list of triples, its category and its eid.
+  """
+  for new_triple_set in triple_sets:
+    new_slices = get_split_boundaries(new_triple_set, max_num_triples, DEBUG)
     # Set parameters for calling function that creates XMLs
     input_category = new_triple_set.category
     folder_name = input_category+'_max'+str(max_num_triples)
     entity_name = new_triple_set.entities_by_frequency[0]
     eid = new_triple_set.eid
-    # Clear/Create output folder
-    if not os.path.exists(os.path.join(path_save_XMLs, folder_name)):
-      os.makedirs(os.path.join(path_save_XMLs, folder_name))
-
-    # For each slice of the triple set, create an XML file
-    count_files_created = 0
     for count_files, i in enumerate(range(len(new_slices)-1)):
       list_triple_objects = new_triple_set.triples[new_slices[i]:new_slices[i+1]]
-      properties_selected_by_user = [i for i in range(len(list_triple_objects))] # Use all properties
       unique_entity_name = entity_name+'_'+str(count_files)
-      list_triples_text = create_xml(list_triple_objects, properties_selected_by_user, input_category, os.path.join(path_save_XMLs, folder_name), entity_name=unique_entity_name, eid = eid)  
-      count_files_created += 1
-      total_number_of_triples += len(list_triple_objects)
-    total_number_of_XMLs += count_files_created
+      yield folder_name, unique_entity_name, list_triple_objects, input_category, eid
+
+# Property counts used by the worker processes of split_XMLs, loaded once per process
+worker_dico_count_occurrences_dbp_props = None
+
+def load_worker_props_count(path_DBprops_count):
+  global worker_dico_count_occurrences_dbp_props
+  worker_dico_count_occurrences_dbp_props = json.loads(codecs.open(path_DBprops_count, 'r', 'utf-8').read())
+
+def render_split_triple_set(triple_set, max_num_triples, DEBUG = False):
+  """
+  Worker function of split_XMLs: sorts and splits a triple set, and returns for each chunk the folder name, the file name, the XML entry as text and the number of triples.
+  """
+  new_triple_set = sort_triple_set(triple_set, worker_dico_count_occurrences_dbp_props)
+  rendered_chunks = []
+  for folder_name, unique_entity_name, list_triple_objects, input_category, eid in iter_split_triple_sets([new_triple_set], max_num_triples, DEBUG):
+    entry_text = io.StringIO()
+    write_xml_entry(entry_text, list_triple_objects, range(len(list_triple_objects)), input_category, eid)
+    file_name = get_xml_file_name(list_triple_objects, unique_entity_name)
+    rendered_chunks.append([folder_name, file_name, entry_text.getvalue(), len(list_triple_objects)])
+  return rendered_chunks
 
-  print(f'  Created {total_number_of_XMLs} split XML files that contain up to approximately {max_num_triples} triples.')
+def iter_rendered_triple_sets_parallel(path_input_XML, path_DBprops_count, max_num_triples, num_workers, chunk_size, DEBUG = False):
+  """ Sorts, splits and renders the triple sets of path_input_XML on num_workers processes; yields the chunks of each triple set in the order of the input file. """
+  triple_sets = iter_info_from_WebNLG_XML(path_input_XML)
+  # Only a window of triple sets is sent to the pool at a time, so that the input file is not all loaded in memory
+  window_size = num_workers * chunk_size * 4
+  with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers, initializer=load_worker_props_count, initargs=(path_DBprops_count,)) as executor:
+    while True:
+      window = list(itertools.islice(triple_sets, window_size))
+      if len(window) == 0:
+        break
+      for rendered_chunks in executor.map(render_split_triple_set, window, itertools.repeat(max_num_triples), itertools.repeat(DEBUG), chunksize=chunk_size):
+        yield rendered_chunks
+
+def write_split_XMLs_parallel(path_input_XML, path_DBprops_count, max_num_triples, path_save_XMLs, single_XML, num_workers, chunk_size, DEBUG = False):
+  """ Parallel version of the loop of split_XMLs; the files are written by the main process, in the order of the input. Returns the number of split triple sets and of triples written. """
+  total_number_of_XMLs = 0
+  total_number_of_triples = 0
+  fo_single_XML = None
+  if single_XML:
+    fo_single_XML = open(os.path.join(path_save_XMLs, 'all_max'+str(max_num_triples)+'.xml'), "w")
+    fo_single_XML.write(XML_HEADER)
+  for rendered_chunks in iter_rendered_triple_sets_parallel(path_input_XML, path_DBprops_count, max_num_triples, num_workers, chunk_size, DEBUG):
+    for folder_name, file_name, entry_text, number_of_triples in rendered_chunks:
+      if single_XML:
+        fo_single_XML.write(entry_text)
+      else:
+        os.makedirs(os.path.join(path_save_XMLs, folder_name), exist_ok=True)
+        with open(os.path.join(path_save_XMLs, folder_name, file_name), "w") as f:
+          f.write(XML_HEADER + entry_text + XML_FOOTER)
+      total_number_of_XMLs += 1
+      total_number_of_triples += number_of_triples
+  if single_XML:
+    fo_single_XML.write(XML_FOOTER)
+    fo_single_XML.close()
+  return total_number_of_XMLs, total_number_of_triples
+
+def split_XMLs (path_input_XML, path_DBprops_count, max_num_triples, path_save_XMLs, DEBUG = False, single_XML = False, num_workers = 1, chunk_size = 16):
+  """
+  path_input_XML: Path to an XML file that contains triple sets, e.g. as provided in the WebNLG shared tasks. The code expects that all triples mention the same entity, as subject or object.
+  path_DBprops_count: Path to a json file that contains DBpedia properties as keys (e.g. "http://dbpedia.org/ontology/birthPlace") and number of occurrences on DBpedia as values (e.g 1486579).
+  max_num_triples: the maximum number of triples desired in an XML
+  path_save_XMLs: the path where the output XMLs should be created
+  single_XML: if True, all split triple sets are written as entries of one XML file (all_max{max_num_triples}.xml) instead of one file each.
+  num_workers: if more than 1, triple sets are sorted and split on a pool of num_workers processes, chunk_size triple sets at a time; files are still written in the order of the input, so the output is the same as with 1 worker.
+    The default is 1: the pool only pays off with several cores and large inputs (on a single core, it is slower than the sequential loop).
+  This function creates individual XML files for each split triple set.
+  """
+  print('Splitting XML file...')
+  clear_folder(path_save_XMLs)
+  os.makedirs(path_save_XMLs)
+  total_number_of_XMLs = 0
+  total_number_of_triples = 0
+  if num_workers > 1:
+    print(f'  Sorting and splitting triples sets on {num_workers} processes...')
+    total_number_of_XMLs, total_number_of_triples = write_split_XMLs_parallel(path_input_XML, path_DBprops_count, max_num_triples, path_save_XMLs, single_XML, num_workers, chunk_size, DEBUG)
+  else:
+    # Get the TripleSet objects with the triples re-ordered, one at a time. The object contains the following:
+    # self.triples, self.category, self.eid, self.size, self.shape, self.shape_type, self.entities_by_frequency
+    split_triple_sets = iter_split_triple_sets(iter_sorted_WebNLG_XMLs(path_input_XML, path_DBprops_count), max_num_triples, DEBUG)
+    if single_XML:
+      save_path_file = os.path.join(path_save_XMLs, 'all_max'+str(max_num_triples)+'.xml')
+      # Use all properties
+      entries = ((list_triple_objects, range(len(list_triple_objects)), input_category, eid) for folder_name, unique_entity_name, list_triple_objects, input_category, eid in split_triple_sets)
+      total_number_of_XMLs, total_number_of_triples = create_xml_batch(entries, save_path_file)
+    else:
+      # For each slice of each triple set, create an XML file
+      for folder_name, unique_entity_name, list_triple_objects, input_category, eid in split_triple_sets:
+        # Create output folder
+        if not os.path.exists(os.path.join(path_save_XMLs, folder_name)):
+          os.makedirs(os.path.join(path_save_XMLs, folder_name))
+        properties_selected_by_user = range(len(list_triple_objects)) # Use all properties
+        list_triples_text = create_xml(list_triple_objects, properties_selected_by_user, input_category, os.path.join(path_save_XMLs, folder_name), entity_name=unique_entity_name, eid = eid)
+        total_number_of_XMLs += 1
+        total_number_of_triples += len(list_triple_objects)
+  if single_XML:
+    print(f'  Created 1 XML file with {total_number_of_XMLs} split triple sets that contain up to approximately {max_num_triples} triples.')
+  else:
+    print(f'  Created {total_number_of_XMLs} split XML files that contain up to approximately {max_num_triples} triples.')
   print(f'  There are {total_number_of_triples} input triples in the split XML files.')